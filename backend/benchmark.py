@@ -0,0 +1,416 @@
+# backend/benchmark.py
+"""
+Banc d'essai du scanner sur une bibliothèque synthétique.
+
+    python benchmark.py run --files 100000 --output avant.json
+    python benchmark.py run --files 100000 --workers 4 --output apres.json
+    python benchmark.py compare avant.json apres.json
+
+La bibliothèque (téléchargements et médias, films et/ou séries) est générée une fois
+dans --root (tmpfs par défaut, --root sur un disque local pour mesurer le stockage) et
+réutilisée tant que ses paramètres ne changent pas. Chaque opération est mesurée dans
+un processus neuf : temps réel et CPU, fichiers par seconde, pic de mémoire résidente
+et, si strace est installé, appels système par type (passe séparée, non chronométrée).
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import resource
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+# Racine par défaut : en mémoire quand c'est possible, pour mesurer le CPU plutôt que le disque
+DEFAULT_ROOT = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "linkarr-bench")
+
+# Description de la bibliothèque générée, gardée à sa racine
+MANIFEST_NAME = "library.json"
+
+# Opérations mesurées, dans l'ordre d'exécution (la suppression modifie la bibliothèque, elle passe en dernier)
+OPERATIONS = ("count_files", "analyze_hardlinks", "analyze_hardlinks_by_folder", "delete_orphan_files")
+
+# Sous-dossiers créés par niveau de profondeur supplémentaire des téléchargements
+DEPTH_FANOUT = 16
+
+# Épisodes par saison et saisons par série de la disposition "series"
+EPISODES_PER_SEASON = 10
+SEASONS_PER_SHOW = 3
+
+# Appels système affichés dans le résumé (les plus fréquents)
+TOP_SYSCALLS = 15
+
+def _library_params(args) -> dict:
+    return {
+        "files": args.files,
+        "layout": args.layout,
+        "depth": args.depth,
+        "link_ratio": args.link_ratio,
+        "conflict_ratio": args.conflict_ratio,
+        "outside_ratio": args.outside_ratio,
+        "orphan_b_share": args.orphan_b_share,
+        "file_size": args.file_size,
+        "seed": args.seed,
+    }
+
+def _release_paths(i: int, layout: str, depth: int):
+    """Chemins relatifs (téléchargement, média) du fichier n° i, à la manière de Radarr et Sonarr."""
+    if layout == "series" or (layout == "mixed" and i % 2):
+        show = i // (EPISODES_PER_SEASON * SEASONS_PER_SHOW)
+        season = (i // EPISODES_PER_SEASON) % SEASONS_PER_SHOW + 1
+        episode = i % EPISODES_PER_SEASON + 1
+        release = f"Show.{show:06d}.S{season:02d}.1080p.WEB-DL"
+        download = os.path.join("series", release, f"Show.{show:06d}.S{season:02d}E{episode:02d}.1080p.WEB-DL.mkv")
+        media = os.path.join("series", f"Show {show:06d}", f"Season {season:02d}", f"Show {show:06d} - S{season:02d}E{episode:02d}.mkv")
+    else:
+        year = 1950 + i % 75
+        release = f"Movie.{i:07d}.{year}.1080p.BluRay"
+        download = os.path.join("movies", release, f"{release}.mkv")
+        media = os.path.join("movies", f"Movie {i:07d} ({year})", f"Movie {i:07d} ({year}).mkv")
+    # Niveaux intermédiaires (catégories du client de téléchargement)
+    buckets = [f"L{level}-{(i >> (4 * level)) % DEPTH_FANOUT:x}" for level in range(depth)]
+    head, tail = download.split(os.sep, 1)
+    return os.path.join(head, *buckets, tail), media
+
+def generate_library(root: str, params: dict) -> dict:
+    """
+    Génère la bibliothèque décrite par params dans root et retourne son manifeste.
+
+    params["files"] fichiers distincts (inodes) sont créés : link_ratio sont synchronisés
+    (un lien en A, un en B), conflict_ratio ont deux liens en B, outside_ratio ont un
+    second lien hors des racines (dossier "outside"), le reste est orphelin, en B pour
+    orphan_b_share d'entre eux et en A sinon. Les fichiers sont creux (file_size octets).
+    """
+    shutil.rmtree(root, ignore_errors=True)
+    downloads, media, outside = (os.path.join(root, name) for name in ("downloads", "media", "outside"))
+    os.makedirs(outside)
+    rng = random.Random(params["seed"])
+    created_dirs = set()
+    counts = {"synced": 0, "orphans_a": 0, "orphans_b": 0, "conflicts": 0, "linked_outside": 0}
+    paths = 0
+
+    def create(path: str):
+        parent = os.path.dirname(path)
+        if parent not in created_dirs:
+            os.makedirs(parent, exist_ok=True)
+            created_dirs.add(parent)
+        fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_EXCL, 0o644)
+        if params["file_size"]:
+            os.ftruncate(fd, params["file_size"])
+        os.close(fd)
+
+    def link(source: str, target: str):
+        parent = os.path.dirname(target)
+        if parent not in created_dirs:
+            os.makedirs(parent, exist_ok=True)
+            created_dirs.add(parent)
+        os.link(source, target)
+
+    started = time.perf_counter()
+    for i in range(params["files"]):
+        download, imported = _release_paths(i, params["layout"], params["depth"])
+        path_a, path_b = os.path.join(downloads, download), os.path.join(media, imported)
+        draw = rng.random()
+        if draw < params["conflict_ratio"]:
+            create(path_a)
+            link(path_a, path_b)
+            link(path_a, path_b[:-4] + ".copy.mkv")
+            counts["conflicts"] += 1
+            paths += 3
+        elif draw < params["conflict_ratio"] + params["outside_ratio"]:
+            create(path_a)
+            link(path_a, os.path.join(outside, f"{i}.mkv"))
+            counts["linked_outside"] += 1
+            paths += 1
+        elif draw < params["conflict_ratio"] + params["outside_ratio"] + params["link_ratio"]:
+            create(path_a)
+            link(path_a, path_b)
+            counts["synced"] += 1
+            paths += 2
+        elif rng.random() < params["orphan_b_share"]:
+            create(path_b)
+            counts["orphans_b"] += 1
+            paths += 1
+        else:
+            create(path_a)
+            counts["orphans_a"] += 1
+            paths += 1
+        if (i + 1) % 100000 == 0:
+            print(f"  {i + 1} / {params['files']} fichiers générés", file=sys.stderr)
+
+    manifest = {
+        "params": params,
+        "counts": counts,
+        "paths": paths,
+        "directories": len(created_dirs),
+        "generated_in_seconds": round(time.perf_counter() - started, 3),
+        "dirty": False,
+    }
+    _write_manifest(root, manifest)
+    return manifest
+
+def _read_manifest(root: str):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(root: str, manifest: dict):
+    with open(os.path.join(root, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def prepare_library(root: str, params: dict) -> dict:
+    """Réutilise la bibliothèque de root si elle correspond à params et n'a pas été modifiée, sinon la génère."""
+    manifest = _read_manifest(root)
+    if manifest is not None and manifest["params"] == params and not manifest["dirty"]:
+        return manifest
+    print(f"📁 Génération de la bibliothèque dans {root} ({params['files']} fichiers)...", file=sys.stderr)
+    manifest = generate_library(root, params)
+    print(f"📁 Bibliothèque générée en {manifest['generated_in_seconds']} s ({manifest['paths']} chemins)", file=sys.stderr)
+    return manifest
+
+def _proc_io() -> dict:
+    """Compteurs d'E/S du processus (appels read/write et octets), si /proc est disponible."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f.read().splitlines())}
+    except (OSError, ValueError):
+        return {}
+
+def run_operation(operation: str, root: str, workers: int, max_depth: int, delete_column: str) -> dict:
+    """Exécute une opération du scanner sur la bibliothèque de root et retourne ses mesures (processus courant)."""
+    from scanner import count_files, analyze_hardlinks, analyze_hardlinks_by_folder, delete_orphan_files
+    from inode_map import process_memory
+
+    paths_a, paths_b = [os.path.join(root, "downloads")], [os.path.join(root, "media")]
+    baseline_rss = process_memory().get("rss_bytes")
+    io_before = _proc_io()
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+
+    details = {}
+    if operation == "count_files":
+        details["files"] = count_files(paths_a + paths_b, max_depth)
+    elif operation == "analyze_hardlinks":
+        results, errors = analyze_hardlinks(paths_a, paths_b, max_depth=max_depth, workers=workers)
+        details = {**results["stats"], "errors": len(errors)}
+    elif operation == "analyze_hardlinks_by_folder":
+        results, errors = analyze_hardlinks_by_folder(paths_a, paths_b, "a", max_depth=max_depth, workers=workers)
+        details = {**results["stats"], "errors": len(errors)}
+    elif operation == "delete_orphan_files":
+        results = delete_orphan_files(paths_a, paths_b, delete_column, max_depth=max_depth, workers=workers)
+        details = {"deleted": results["total_deleted"], "errors": results["total_errors"]}
+    else:
+        raise ValueError(f"Opération inconnue : {operation}")
+
+    wall = time.perf_counter() - started
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    io_after = _proc_io()
+    for key in ("peak_rss_bytes", "rss_bytes", "map_bytes"):
+        details.pop(key, None)
+    return {
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round((cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime), 4),
+        "system_seconds": round(cpu_after.ru_stime - cpu_before.ru_stime, 4),
+        "peak_rss_bytes": cpu_after.ru_maxrss * 1024,
+        "baseline_rss_bytes": baseline_rss,
+        "io": {key: io_after[key] - io_before.get(key, 0) for key in ("syscr", "syscw") if key in io_after},
+        "details": details,
+    }
+
+def _operation_command(operation: str, args) -> list:
+    return [
+        sys.executable, os.path.abspath(__file__), "_operation", operation,
+        "--root", args.root, "--workers", str(args.workers), "--max-depth", str(args.max_depth),
+        "--delete-column", args.delete_column,
+    ]
+
+def _run_child(command: list) -> dict:
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Échec de {' '.join(command[2:4])} :\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def count_syscalls(operation: str, args) -> dict:
+    """Appels système de l'opération (strace -c), ou None si strace n'est pas installé."""
+    strace = shutil.which("strace")
+    if strace is None:
+        return None
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as summary:
+        command = [strace, "-f", "-c", "-o", summary.name] + _operation_command(operation, args)
+        _run_child(command)
+        calls = {}
+        for line in summary.read().splitlines():
+            fields = line.split()
+            # "% time  seconds  usecs/call  calls  [errors]  syscall"
+            if len(fields) >= 5 and fields[3].isdigit() and fields[-1] != "total":
+                calls[fields[-1]] = int(fields[3])
+    top = dict(sorted(calls.items(), key=lambda item: item[1], reverse=True)[:TOP_SYSCALLS])
+    return {"total": sum(calls.values()), "top": top}
+
+def _git_revision() -> dict:
+    """Commit mesuré, pour comparer les résultats d'un commit à l'autre."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here, capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def _filesystem(path: str):
+    """Type du système de fichiers qui porte path, lu dans /proc/mounts."""
+    best, fstype = "", None
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                fields = line.split()
+                mount = fields[1].replace("\\040", " ")
+                if (path == mount or path.startswith(mount.rstrip("/") + "/")) and len(mount) >= len(best):
+                    best, fstype = mount, fields[2]
+    except OSError:
+        pass
+    return fstype
+
+def run_benchmark(args) -> dict:
+    params = _library_params(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.root)), exist_ok=True)
+    manifest = prepare_library(args.root, params)
+    report = {
+        "meta": {
+            **_git_revision(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "root": os.path.abspath(args.root),
+            "filesystem": _filesystem(os.path.abspath(args.root)),
+            "workers": args.workers,
+            "max_depth": args.max_depth,
+            "repeat": args.repeat,
+        },
+        "library": manifest,
+        "results": [],
+    }
+
+    for operation in args.operations:
+        runs = []
+        for attempt in range(args.repeat):
+            if operation == "delete_orphan_files" and attempt:
+                manifest = prepare_library(args.root, params)
+            runs.append(_run_child(_operation_command(operation, args)))
+            if operation == "delete_orphan_files":
+                manifest["dirty"] = True
+                _write_manifest(args.root, manifest)
+        wall = statistics.median(run["wall_seconds"] for run in runs)
+        result = {
+            "operation": operation,
+            "wall_seconds": wall,
+            "cpu_seconds": statistics.median(run["cpu_seconds"] for run in runs),
+            # Chaque opération parcourt toute la bibliothèque
+            "files_per_second": round(manifest["paths"] / wall) if wall else None,
+            "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+            "runs": runs,
+        }
+        if args.syscalls:
+            if operation == "delete_orphan_files":
+                manifest = prepare_library(args.root, params)
+            result["syscalls"] = count_syscalls(operation, args)
+            if operation == "delete_orphan_files":
+                manifest["dirty"] = True
+                _write_manifest(args.root, manifest)
+        report["results"].append(result)
+        print(f"⏱️ {operation}: {wall:.3f} s, {result['files_per_second']} fichiers/s, pic {result['peak_rss_bytes'] / 1048576:.1f} Mo", file=sys.stderr)
+    return report
+
+def compare_reports(before: dict, after: dict) -> str:
+    """Tableau des écarts entre deux rapports (après / avant) pour les opérations communes."""
+    lines = [
+        f"Avant : {before['meta'].get('commit')} ({before['library']['paths']} chemins)  "
+        f"Après : {after['meta'].get('commit')} ({after['library']['paths']} chemins)",
+        f"{'opération':<30}{'avant (s)':>12}{'après (s)':>12}{'ratio':>8}{'pic avant':>12}{'pic après':>12}",
+    ]
+    previous = {result["operation"]: result for result in before["results"]}
+    for result in after["results"]:
+        old = previous.get(result["operation"])
+        if old is None:
+            continue
+        ratio = result["wall_seconds"] / old["wall_seconds"] if old["wall_seconds"] else float("nan")
+        lines.append(
+            f"{result['operation']:<30}{old['wall_seconds']:>12.3f}{result['wall_seconds']:>12.3f}{ratio:>8.2f}"
+            f"{old['peak_rss_bytes'] / 1048576:>10.1f}Mo{result['peak_rss_bytes'] / 1048576:>10.1f}Mo"
+        )
+    return "\n".join(lines)
+
+def _ratio(value: str) -> float:
+    ratio = float(value)
+    if not 0 <= ratio <= 1:
+        raise argparse.ArgumentTypeError("doit être compris entre 0 et 1")
+    return ratio
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du scanner de Linkarr sur une bibliothèque synthétique.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Génère la bibliothèque si besoin et mesure les opérations")
+    run.add_argument("--root", default=DEFAULT_ROOT, help=f"Dossier de la bibliothèque (par défaut : {DEFAULT_ROOT})")
+    run.add_argument("--files", type=int, default=10000, help="Fichiers distincts à générer, de 10 000 à 5 000 000 (par défaut : 10000)")
+    run.add_argument("--layout", choices=("movies", "series", "mixed"), default="mixed")
+    run.add_argument("--depth", type=int, default=1, help="Niveaux de dossiers supplémentaires dans les téléchargements")
+    run.add_argument("--link-ratio", type=_ratio, default=0.7, help="Part de fichiers synchronisés")
+    run.add_argument("--conflict-ratio", type=_ratio, default=0.01, help="Part de fichiers en conflit (deux liens en B)")
+    run.add_argument("--outside-ratio", type=_ratio, default=0.01, help="Part de fichiers liés hors des racines")
+    run.add_argument("--orphan-b-share", type=_ratio, default=0.2, help="Part des orphelins placés en B plutôt qu'en A")
+    run.add_argument("--file-size", type=int, default=0, help="Taille apparente des fichiers (creux), en octets")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--operations", type=lambda value: value.split(","), default=list(OPERATIONS),
+                     help=f"Opérations séparées par des virgules (par défaut : {','.join(OPERATIONS)})")
+    run.add_argument("--repeat", type=int, default=3, help="Mesures par opération, la médiane est retenue")
+    run.add_argument("--workers", type=int, default=1, help="Threads de listage des scans")
+    run.add_argument("--max-depth", type=int, default=-1)
+    run.add_argument("--delete-column", choices=("a", "b", "both"), default="a")
+    run.add_argument("--syscalls", action="store_true", help="Compte aussi les appels système avec strace (passe non chronométrée)")
+    run.add_argument("--output", help="Fichier JSON du rapport (par défaut : sortie standard)")
+
+    compare = commands.add_parser("compare", help="Compare deux rapports JSON")
+    compare.add_argument("before")
+    compare.add_argument("after")
+
+    # Mesure d'une opération dans un processus neuf, lancée par "run"
+    operation = commands.add_parser("_operation")
+    operation.add_argument("operation", choices=OPERATIONS)
+    operation.add_argument("--root", required=True)
+    operation.add_argument("--workers", type=int, default=1)
+    operation.add_argument("--max-depth", type=int, default=-1)
+    operation.add_argument("--delete-column", default="a")
+
+    args = parser.parse_args(argv)
+    if args.command == "_operation":
+        print(json.dumps(run_operation(args.operation, args.root, args.workers, args.max_depth, args.delete_column)))
+    elif args.command == "compare":
+        with open(args.before, "r", encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, "r", encoding="utf-8") as f:
+            after = json.load(f)
+        print(compare_reports(before, after))
+    else:
+        unknown = [name for name in args.operations if name not in OPERATIONS]
+        if unknown:
+            parser.error(f"opérations inconnues : {', '.join(unknown)}")
+        args.operations = [name for name in OPERATIONS if name in args.operations]
+        report = run_benchmark(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"📝 Rapport écrit dans {args.output}", file=sys.stderr)
+        else:
+            print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import json
 import os
 import logging
 import shutil
+import tempfile
+import threading
 from datetime import datetime
 from typing import Dict, Any
 
@@ -15,6 +17,11 @@ CONFIG_PATH = os.getenv("CONFIG_PATH", "/app/config/settings.json")
 if not os.path.exists(os.path.dirname(CONFIG_PATH)) and not CONFIG_PATH.startswith("/app"):
     CONFIG_PATH = os.getenv("CONFIG_PATH", "config/settings.json")
 
+# Dernière lecture du fichier, réutilisée tant qu'il n'a pas changé (voir config_signature) :
+# {"signature", "config", "tabs"}, remplacée d'un bloc à chaque relecture
+_cache = None
+_cache_lock = threading.Lock()
+
 def get_default_config() -> Dict[str, Any]:
     """Retourne la configuration par défaut."""
     return {
@@ -76,7 +83,71 @@ def backup_config():
         logger.error(f"Erreur lors de la sauvegarde : {e}")
         return None
 
+def config_signature():
+    """
+    Identité du fichier de configuration : appareil, inode, date de modification et taille,
+    ou None s'il n'existe pas. save_config remplace le fichier par renommage, donc change
+    l'inode : une écriture est vue même si la date de modification n'a pas bougé.
+    """
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+def tab_error(tab) -> str:
+    """Raison pour laquelle un onglet de la configuration est inutilisable, ou None."""
+    if not isinstance(tab, dict):
+        return "n'est pas un objet"
+    if not isinstance(tab.get("id"), str) or not tab["id"]:
+        return "identifiant manquant"
+    for field in ("paths_a", "paths_b"):
+        paths = tab.get(field, [])
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            return f"{field} doit être une liste de chemins"
+    for field in ("max_depth", "scan_workers"):
+        if field in tab and (not isinstance(tab[field], int) or isinstance(tab[field], bool)):
+            return f"{field} doit être un entier"
+    return None
+
+def _index_tabs(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Onglets valides par identifiant (le premier l'emporte en cas de doublon)."""
+    tabs = {}
+    entries = config.get("tabs", []) if isinstance(config, dict) else []
+    for tab in entries if isinstance(entries, list) else []:
+        error = tab_error(tab)
+        if error:
+            logger.error(f"Onglet ignoré dans {CONFIG_PATH} ({error}) : {tab}")
+            continue
+        tabs.setdefault(tab["id"], tab)
+    return tabs
+
+def _cached_config() -> Dict[str, Any]:
+    """Entrée du cache à jour : le fichier n'est relu et analysé que si sa signature a changé."""
+    global _cache
+    signature = config_signature()
+    cache = _cache
+    if cache is not None and cache["signature"] == signature:
+        return cache
+    # Signature relevée avant la lecture : un fichier remplacé entre-temps sera relu au prochain appel
+    config = _read_config()
+    cache = {"signature": signature, "config": config, "tabs": _index_tabs(config)}
+    with _cache_lock:
+        _cache = cache
+    return cache
+
 def load_config() -> Dict[str, Any]:
+    """
+    Retourne la configuration, depuis le cache tant que le fichier n'a pas changé.
+    Le dict est partagé entre les appels : il ne doit pas être modifié.
+    """
+    return _cached_config()["config"]
+
+def get_tab(tab_id: str):
+    """Onglet valide d'identifiant tab_id, ou None (même partage que load_config)."""
+    return _cached_config()["tabs"].get(tab_id)
+
+def _read_config() -> Dict[str, Any]:
     """Charge la configuration depuis le fichier JSON."""
     try:
         with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
@@ -103,21 +174,43 @@ def load_config() -> Dict[str, Any]:
         return get_default_config()
 
 def save_config(config: Dict[str, Any]):
-    """Sauvegarde la configuration dans le fichier JSON."""
+    """
+    Sauvegarde la configuration dans le fichier JSON.
+
+    Le contenu est écrit dans un fichier temporaire du même dossier puis renommé par-dessus
+    l'ancien : un lecteur (autre worker, autre thread) voit l'ancienne ou la nouvelle
+    configuration, jamais un fichier à moitié écrit.
+    """
+    tmp_path = None
     try:
         # Crée le répertoire parent s'il n'existe pas
-        config_dir = os.path.dirname(CONFIG_PATH)
+        config_dir = os.path.dirname(CONFIG_PATH) or "."
         os.makedirs(config_dir, exist_ok=True)
         
-        # Sauvegarde la configuration
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+        fd, tmp_path = tempfile.mkstemp(dir=config_dir, prefix=".settings-", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crée le fichier en 0600 : on garde les droits de l'ancien fichier
+        try:
+            os.chmod(tmp_path, os.stat(CONFIG_PATH).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, CONFIG_PATH)
+        tmp_path = None
         
         logger.debug(f"Configuration sauvegardée : {CONFIG_PATH}")
         
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde de la configuration : {e}")
         raise
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
 
 def validate_config(config: Dict[str, Any]) -> bool:
     """Valide la structure de la configuration."""
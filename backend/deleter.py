@@ -0,0 +1,130 @@
+# backend/deleter.py
+import os
+import stat
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+def _error_message(e: Exception) -> str:
+    """Message d'erreur d'une suppression, dans la forme des résultats de suppression."""
+    if isinstance(e, FileNotFoundError):
+        return "Fichier non trouvé lors de la suppression"
+    if isinstance(e, PermissionError):
+        return f"Permission refusée: {str(e)}"
+    return f"Erreur inattendue: {str(e)}"
+
+def _unlink_directory(dirpath: str, entries: list, remaining: dict, lock: threading.Lock) -> list:
+    """
+    Supprime les fichiers d'un même dossier, ouvert une seule fois par descripteur.
+
+    Juste avant chaque unlinkat, le fichier est relu par fstatat (sans suivre les liens
+    symboliques) : il doit toujours être le même inode (st_dev, st_ino) et ne pas avoir
+    plus de liens que ses candidats pas encore supprimés. Un lien créé depuis la
+    vérification, où que ce soit, suffit à épargner le fichier.
+
+    Retourne une liste de (chemin, taille, erreur) : erreur vaut None si le fichier est supprimé.
+    """
+    results = []
+    use_fd = os.unlink in os.supports_dir_fd and os.stat in os.supports_dir_fd
+    try:
+        fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY) if use_fd else None
+    except OSError as e:
+        return [(os.path.join(dirpath, name), 0, _error_message(e)) for name, _ in entries]
+
+    try:
+        for name, st in entries:
+            path = os.path.join(dirpath, name)
+            target = name if use_fd else path
+            key = (st.st_dev, st.st_ino)
+            try:
+                current = os.stat(target, dir_fd=fd, follow_symlinks=False)
+                if (current.st_dev, current.st_ino) != key or not stat.S_ISREG(current.st_mode):
+                    results.append((path, 0, "Fichier remplacé depuis le scan"))
+                    continue
+                with lock:
+                    expected = remaining[key]
+                if current.st_nlink > expected:
+                    results.append((path, 0, "Lié ailleurs depuis le scan"))
+                    continue
+                os.unlink(target, dir_fd=fd)
+                with lock:
+                    remaining[key] -= 1
+                results.append((path, current.st_size, None))
+            except OSError as e:
+                results.append((path, 0, _error_message(e)))
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return results
+
+def delete_files(candidates: list, workers: int = 1):
+    """
+    Supprime des fichiers vérifiés, regroupés par dossier.
+
+    Args:
+        candidates: Liste de (chemin, stat) issue de la vérification des orphelins ;
+            tous les liens d'un inode à plusieurs liens doivent y figurer
+        workers: Nombre de dossiers traités en parallèle
+
+    Yields:
+        (chemin, taille, erreur) pour chaque fichier, dossier par dossier au fil des
+        suppressions ; erreur vaut None si le fichier a été supprimé
+    """
+    by_directory = defaultdict(list)
+    remaining = defaultdict(int)
+    for path, st in candidates:
+        dirpath, name = os.path.split(path)
+        by_directory[dirpath].append((name, st))
+        remaining[(st.st_dev, st.st_ino)] += 1
+    lock = threading.Lock()
+
+    if workers <= 1:
+        for dirpath, entries in by_directory.items():
+            yield from _unlink_directory(dirpath, entries, remaining, lock)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="delete") as pool:
+        futures = [pool.submit(_unlink_directory, dirpath, entries, remaining, lock) for dirpath, entries in by_directory.items()]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def prune_empty_directories(dirs, roots: list[str]) -> list[str]:
+    """
+    Supprime les dossiers devenus vides, des plus profonds aux moins profonds.
+
+    Chaque dossier supprimé fait examiner son parent à son tour ; les racines scannées
+    et tout ce qui est en dehors ne sont jamais supprimés. Un dossier non vide est
+    simplement refusé par rmdir, sans le lister.
+
+    Retourne la liste des dossiers supprimés.
+    """
+    roots = [os.path.normpath(root) for root in roots]
+
+    def removable(dirpath: str) -> bool:
+        return any(dirpath.startswith(root + os.sep) for root in roots)
+
+    # Tas (-profondeur, dossier) : le plus profond d'abord, ses parents restent en attente
+    seen = {os.path.normpath(d) for d in dirs}
+    pending = [(-d.count(os.sep), d) for d in seen]
+    heapq.heapify(pending)
+    removed = []
+    while pending:
+        _, dirpath = heapq.heappop(pending)
+        if not removable(dirpath):
+            continue
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            # Le dossier n'est pas vide ou ne peut pas être supprimé
+            continue
+        removed.append(dirpath)
+        logger.info(f"📁 Dossier vide supprimé: {dirpath}")
+        parent = os.path.dirname(dirpath)
+        if parent not in seen:
+            seen.add(parent)
+            heapq.heappush(pending, (-parent.count(os.sep), parent))
+    return removed
@@ -0,0 +1,61 @@
+# backend/directory_listing.py
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Durée de vie d'un listage en cache, même si le dossier n'a pas changé
+BROWSE_CACHE_TTL = 30
+
+# Dossiers gardés en cache
+BROWSE_CACHE_SIZE = 32
+
+class DirectoryListings:
+    """
+    Listages triés des dossiers parcourus par l'explorateur de fichiers.
+
+    Un dossier est lu en un seul scandir : le type de chaque entrée vient de d_type, sans
+    stat, sauf pour les liens symboliques (suivis, comme isdir) et les systèmes de
+    fichiers qui ne renseignent pas d_type. Le listage trié est gardé BROWSE_CACHE_TTL
+    secondes, tant que le dossier garde le même inode et la même date de modification :
+    créer, supprimer ou renommer une entrée change cette date et invalide le cache.
+    """
+
+    def __init__(self, ttl: float = BROWSE_CACHE_TTL, size: int = BROWSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # chemin -> (signature, lu à, entrées, dossiers)
+
+    def list(self, path: str, dirs_only: bool = False) -> list:
+        """
+        Entrées (nom, est_un_dossier) du dossier, dossiers d'abord puis par nom sans
+        tenir compte de la casse. Lève les OSError de stat ou scandir.
+        """
+        st = os.stat(path)
+        signature = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(path)
+            if cached is not None and cached[0] == signature and now - cached[1] < self.ttl:
+                self.entries.move_to_end(path)
+                return cached[3] if dirs_only else cached[2]
+
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+        entries.sort(key=lambda item: (not item[1], item[0].lower()))
+        # Les dossiers sont en tête : la liste filtrée en est un préfixe
+        dirs = entries[:sum(1 for _, is_dir in entries if is_dir)]
+
+        with self.lock:
+            self.entries[path] = (signature, now, entries, dirs)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return dirs if dirs_only else entries
@@ -0,0 +1,185 @@
+# backend/inode_index.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from config_manager import CONFIG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Index persistant rangé à côté de settings.json
+INDEX_PATH = os.getenv("INDEX_PATH", os.path.join(os.path.dirname(CONFIG_PATH), "index.db"))
+
+# Un dossier modifié moins de RACY_SECONDS avant son listage peut encore changer
+# dans le même "tick" de mtime : on ne lui fait pas confiance au scan suivant.
+RACY_SECONDS = 2
+
+# Attente maximale (ms) du verrou d'écriture tenu par un autre scan utilisant l'index
+INDEX_BUSY_TIMEOUT_MS = int(os.getenv("INDEX_BUSY_TIMEOUT_MS", "30000"))
+
+# Stat minimal reconstruit depuis l'index, compatible avec os.stat_result pour le scanner
+# (st_nlink vaut 0 : le nombre de liens mémorisé a pu changer depuis)
+CachedStat = namedtuple("CachedStat", ["st_dev", "st_ino", "st_nlink", "st_size", "st_mtime", "st_blocks"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    dev INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    nlink INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    blocks INTEGER,
+    PRIMARY KEY (dir, name)
+) WITHOUT ROWID;
+"""
+
+class InodeIndex:
+    """
+    Index SQLite des listages de dossiers : (dev, ino, nlink, size, mtime, blocks) par fichier
+    et mtime par dossier.
+
+    Un dossier dont le mtime n'a pas changé depuis le dernier scan n'a pas pu gagner
+    ni perdre d'entrée : son listage est relu depuis l'index au lieu du disque.
+    Le nombre de liens d'un fichier, lui, change sans toucher à son dossier (lien créé
+    ou supprimé ailleurs) : un listage relu porte st_nlink à 0 (inconnu) et le scanner
+    relit nlink des seuls inodes dont le classement en dépend. size et mtime d'un
+    fichier modifié sur place peuvent être en retard jusqu'au prochain changement de son dossier.
+
+    La connexion est partagée entre les threads d'un scan parallèle, sous verrou.
+    Chaque dossier est écrit dans sa propre transaction, pour ne jamais bloquer longtemps
+    un autre scan qui utilise l'index. Toute erreur de l'index (base verrouillée,
+    corrompue...) est journalisée et le dossier est listé sur le disque, comme sans index.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=INDEX_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            self.conn.execute(f"PRAGMA busy_timeout={INDEX_BUSY_TIMEOUT_MS}")
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            # Index créé avant la colonne blocks : les anciennes lignes restent sans (NULL)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+            if "blocks" not in columns:
+                self.conn.execute("ALTER TABLE files ADD COLUMN blocks INTEGER")
+                self.conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            # Scan sans index plutôt que pas de scan du tout
+            logger.error(f"❌ Index {self.path} inutilisable, scan sans index: {e}")
+            self._close_connection()
+        return self
+
+    def _close_connection(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+
+    def close(self):
+        self._close_connection()
+        logger.info(f"🗂️ Index: {self.hits} dossiers relus depuis l'index, {self.misses} relistés")
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_directory(self, dirpath: str, dir_stat):
+        """
+        Retourne le listage mémorisé (fichiers, sous_dossiers) si le dossier n'a pas changé,
+        sinon None. Le format est celui de scanner._list_directory.
+        """
+        with self.lock:
+            if self.conn is None:
+                return None
+            try:
+                return self._get_directory(dirpath, dir_stat)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Lecture de l'index impossible pour {dirpath}, listage sur le disque: {e}")
+                self.misses += 1
+                return None
+
+    def _get_directory(self, dirpath: str, dir_stat):
+        row = self.conn.execute(
+            "SELECT dev, mtime_ns, subdirs FROM dirs WHERE path = ?", (dirpath,)
+        ).fetchone()
+        if row is None or row[0] != dir_stat.st_dev or row[1] != dir_stat.st_mtime_ns:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        files = [
+            (name, dev, ino, CachedStat(dev, ino, 0, size, mtime, blocks))
+            for name, dev, ino, size, mtime, blocks in self.conn.execute(
+                "SELECT name, dev, ino, size, mtime, blocks FROM files WHERE dir = ?", (dirpath,)
+            )
+        ]
+        subdirs = [(os.path.join(dirpath, name), dev) for name, dev in json.loads(row[2])]
+        return files, subdirs
+
+    def put_directory(self, dirpath: str, dir_stat, files: list, subdirs: list):
+        """Mémorise le listage complet d'un dossier (les fichiers doivent porter leur stat)."""
+        with self.lock:
+            if self.conn is None:
+                return
+            try:
+                # Transaction courte : validée (ou annulée) avant de rendre le verrou d'écriture
+                with self.conn:
+                    self._put_directory(dirpath, dir_stat, files, subdirs)
+            except sqlite3.Error as e:
+                # Le dossier sera simplement relisté au prochain scan
+                logger.warning(f"⚠️ Écriture dans l'index impossible pour {dirpath}: {e}")
+
+    def _put_directory(self, dirpath: str, dir_stat, files: list, subdirs: list):
+        mtime_ns = dir_stat.st_mtime_ns
+        if time.time_ns() - mtime_ns < RACY_SECONDS * 1_000_000_000:
+            # Dossier modifié à l'instant : forcer un nouveau listage la prochaine fois
+            mtime_ns = -1
+
+        subdir_names = [[os.path.basename(path), dev] for path, dev in subdirs]
+        old = self.conn.execute("SELECT subdirs FROM dirs WHERE path = ?", (dirpath,)).fetchone()
+        if old is not None:
+            # Oublier les sous-arborescences qui ont disparu de ce dossier
+            kept = {name for name, _ in subdir_names}
+            for name, _ in json.loads(old[0]):
+                if name not in kept:
+                    self._forget_tree(os.path.join(dirpath, name))
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, dev, mtime_ns, subdirs) VALUES (?, ?, ?, ?)",
+            (dirpath, dir_stat.st_dev, mtime_ns, json.dumps(subdir_names, ensure_ascii=False)),
+        )
+        self.conn.execute("DELETE FROM files WHERE dir = ?", (dirpath,))
+        self.conn.executemany(
+            "INSERT INTO files (dir, name, dev, ino, nlink, size, mtime, blocks) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(dirpath, name, dev, ino, st.st_nlink, st.st_size, st.st_mtime, st.st_blocks) for name, dev, ino, st in files],
+        )
+
+    def _forget_tree(self, dirpath: str):
+        """Supprime un dossier et toute sa descendance de l'index."""
+        # Intervalle [dossier/, dossier0[ : '0' suit immédiatement '/' dans l'ordre des caractères
+        lower, upper = dirpath + "/", dirpath + "0"
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (dirpath, lower, upper))
+        self.conn.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (dirpath, lower, upper))
@@ -0,0 +1,276 @@
+# backend/inode_map.py
+import os
+import sys
+import resource
+from array import array
+
+# Les clés (st_dev, st_ino) sont fusionnées en un seul entier : dev << 64 | ino
+INO_BITS = 64
+INO_MASK = (1 << INO_BITS) - 1
+
+COLUMNS = ("A", "B")
+
+def inode_key(dev: int, ino: int) -> int:
+    """Clé fusionnée d'un inode, comme les clés internes de l'InodeMap."""
+    return dev << INO_BITS | ino
+
+class InodeMap:
+    """
+    Map d'inodes compacte pour les scans de plusieurs millions de fichiers.
+
+    Chaque dossier n'est stocké qu'une fois (table d'internement) et chaque lien
+    n'est qu'un couple (n° de dossier, nom). Les liens d'un même inode sont chaînés
+    dans des tableaux array : aucun dict ni liste par inode, aucun chemin complet
+    pendant le scan. Les chemins sont reconstruits seulement au classement des résultats.
+
+    items() expose chaque inode sous la forme {"A": [...], "B": [...], "nlink": n, "size": t}
+    attendue par les fonctions de classement. Avec details, la map garde aussi l'espace
+    alloué et le mtime de chaque inode (entrée "detail").
+    Un inode déjà classé peut être retiré avec discard(), un seul lien avec remove()
+    (surveillance des onglets) : les liens retirés restent dans les tableaux, sans être
+    parcourus, jusqu'à compact().
+    """
+
+    __slots__ = (
+        "dirs", "dir_ids", "dir_roots", "slots", "nlinks", "sizes", "allocated", "mtimes", "heads",
+        "link_next", "link_dir", "link_name", "link_column", "files",
+    )
+
+    def __init__(self, details: bool = False):
+        self.dirs = []            # n° de dossier -> préfixe "dossier/"
+        self.dir_ids = {}         # préfixe -> n° de dossier
+        self.dir_roots = []       # n° de dossier -> racine scannée qui le contient
+        self.slots = {}           # clé fusionnée -> n° d'inode
+        self.nlinks = array("I")  # n° d'inode -> st_nlink
+        self.sizes = array("Q")   # n° d'inode -> st_size
+        self.allocated = array("Q") if details else None  # n° d'inode -> st_blocks x 512
+        self.mtimes = array("d") if details else None     # n° d'inode -> st_mtime
+        self.heads = array("i")   # n° d'inode -> dernier lien ajouté (-1 = aucun)
+        self.link_next = array("i")  # n° de lien -> lien précédent du même inode
+        self.link_dir = array("I")
+        self.link_name = []
+        self.link_column = bytearray()  # 0 = A, 1 = B
+        self.files = 0  # fichiers vus par le scan, y compris ceux classés sans passer par la map
+
+    def add_directory(self, dirpath: str, root: str = None) -> int:
+        """Interne un dossier, étiqueté avec sa racine, et retourne son numéro."""
+        prefix = os.path.join(dirpath, "")
+        dir_id = self.dir_ids.get(prefix)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(prefix)
+            self.dir_ids[prefix] = dir_id
+            self.dir_roots.append(root)
+        return dir_id
+
+    def root_of(self, prefix: str):
+        """Racine scannée d'un dossier interné (préfixe "dossier/"), None si inconnue."""
+        dir_id = self.dir_ids.get(prefix)
+        return self.dir_roots[dir_id] if dir_id is not None else None
+
+    def path(self, dir_id: int, name: str) -> str:
+        return self.dirs[dir_id] + name
+
+    def add(self, dir_id: int, name: str, column: str, dev: int, ino: int, nlink: int, size: int = 0, detail: tuple = None):
+        """Enregistre un lien trouvé dans la colonne "A" ou "B" ; detail vaut (alloué, mtime) avec details."""
+        key = dev << INO_BITS | ino
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.heads)
+            self.slots[key] = slot
+            self.heads.append(-1)
+            self.nlinks.append(nlink)
+            self.sizes.append(size)
+            if self.allocated is not None:
+                self.allocated.append(detail[0])
+                self.mtimes.append(detail[1])
+        else:
+            # Un listage relu de l'index ne connaît pas nlink (0) : garder celui déjà lu
+            if nlink:
+                self.nlinks[slot] = nlink
+            self.sizes[slot] = size
+            if self.allocated is not None:
+                self.allocated[slot], self.mtimes[slot] = detail
+
+        link = len(self.link_name)
+        self.link_next.append(self.heads[slot])
+        self.heads[slot] = link
+        self.link_dir.append(dir_id)
+        self.link_name.append(name)
+        self.link_column.append(0 if column == "A" else 1)
+
+    def lookup(self, dev: int, ino: int):
+        """Retourne le numéro de l'inode, ou None s'il n'a pas encore été vu."""
+        return self.slots.get(dev << INO_BITS | ino)
+
+    def links(self, slot: int) -> list:
+        """Liens d'un inode sous forme de (colonne, chemin), dans l'ordre de parcours."""
+        links = []
+        link = self.heads[slot]
+        while link >= 0:
+            links.append((COLUMNS[self.link_column[link]], self.dirs[self.link_dir[link]] + self.link_name[link]))
+            link = self.link_next[link]
+        links.reverse()
+        return links
+
+    def unknown_nlinks(self):
+        """Itère sur ((st_dev, st_ino), n° d'inode) des inodes dont nlink est inconnu (0)."""
+        for key, slot in self.slots.items():
+            if not self.nlinks[slot]:
+                yield (key >> INO_BITS, key & INO_MASK), slot
+
+    def set_nlink(self, slot: int, nlink: int):
+        self.nlinks[slot] = nlink
+
+    def remove(self, dir_id: int, name: str, dev: int, ino: int) -> int:
+        """
+        Retire un lien d'un inode et retourne le nombre de liens restants ; sans lien
+        restant, l'inode quitte la map.
+        """
+        key = dev << INO_BITS | ino
+        slot = self.slots.get(key)
+        if slot is None:
+            return 0
+        previous, link, remaining = -1, self.heads[slot], 0
+        while link >= 0:
+            following = self.link_next[link]
+            if self.link_dir[link] == dir_id and self.link_name[link] == name:
+                if previous < 0:
+                    self.heads[slot] = following
+                else:
+                    self.link_next[previous] = following
+                # Le nom n'est plus référencé par la chaîne : le libérer
+                self.link_name[link] = None
+                name = None
+            else:
+                remaining += 1
+                previous = link
+            link = following
+        if not remaining:
+            del self.slots[key]
+        return remaining
+
+    def discard(self, dev: int, ino: int):
+        """Retire un inode classé de la map."""
+        self.slots.pop(dev << INO_BITS | ino, None)
+
+    def compact(self):
+        """
+        Reconstruit les tableaux sans les inodes et liens retirés. Les numéros de dossier
+        sont conservés, les numéros d'inode et de lien changent.
+        """
+        nlinks, sizes, heads = array("I"), array("Q"), array("i")
+        allocated = array("Q") if self.allocated is not None else None
+        mtimes = array("d") if self.mtimes is not None else None
+        link_next, link_dir, link_name, link_column = array("i"), array("I"), [], bytearray()
+        for key, slot in self.slots.items():
+            chain = []
+            link = self.heads[slot]
+            while link >= 0:
+                chain.append(link)
+                link = self.link_next[link]
+            # Rechaîner dans l'ordre d'ajout : le dernier lien reste en tête
+            head = -1
+            for link in reversed(chain):
+                link_next.append(head)
+                head = len(link_name)
+                link_dir.append(self.link_dir[link])
+                link_name.append(self.link_name[link])
+                link_column.append(self.link_column[link])
+            self.slots[key] = len(heads)
+            heads.append(head)
+            nlinks.append(self.nlinks[slot])
+            sizes.append(self.sizes[slot])
+            if allocated is not None:
+                allocated.append(self.allocated[slot])
+                mtimes.append(self.mtimes[slot])
+        self.nlinks, self.sizes, self.heads = nlinks, sizes, heads
+        self.allocated, self.mtimes = allocated, mtimes
+        self.link_next, self.link_dir, self.link_name, self.link_column = link_next, link_dir, link_name, link_column
+
+    def __len__(self):
+        """Nombre d'inodes encore dans la map."""
+        return len(self.slots)
+
+    def detail(self, slot: int):
+        """(espace alloué, mtime) d'un inode, ou None si la map ne les garde pas."""
+        return None if self.allocated is None else (self.allocated[slot], self.mtimes[slot])
+
+    def entry(self, slot: int) -> dict:
+        """Vue d'un inode : {"A": [chemins], "B": [chemins], "nlink": n, "size": t, "detail": d}."""
+        dirs, names, columns = self.dirs, self.link_name, self.link_column
+        paths = ([], [])
+        link = self.heads[slot]
+        while link >= 0:
+            paths[columns[link]].append(dirs[self.link_dir[link]] + names[link])
+            link = self.link_next[link]
+        # La chaîne part du dernier lien : remettre l'ordre de parcours
+        paths[0].reverse()
+        paths[1].reverse()
+        return {"A": paths[0], "B": paths[1], "nlink": self.nlinks[slot], "size": self.sizes[slot], "detail": self.detail(slot)}
+
+    def get(self, dev: int, ino: int):
+        """Vue d'un inode (voir entry), ou None s'il n'est pas dans la map."""
+        slot = self.slots.get(dev << INO_BITS | ino)
+        return None if slot is None else self.entry(slot)
+
+    def items(self):
+        """Itère sur ((st_dev, st_ino), vue de l'inode (voir entry))."""
+        for key, slot in self.slots.items():
+            yield (key >> INO_BITS, key & INO_MASK), self.entry(slot)
+
+    def folder_items(self):
+        """
+        Comme items(), mais chaque lien est un couple (préfixe du dossier, nom) et l'inode
+        est donné par (clé, liens A, liens B, nlink, taille, detail). Les préfixes sont les chaînes
+        internées de la map : le dossier d'un lien est connu sans recalcul de chemin.
+        """
+        dirs, names, columns = self.dirs, self.link_name, self.link_column
+        for key, slot in self.slots.items():
+            links = ([], [])
+            link = self.heads[slot]
+            while link >= 0:
+                links[columns[link]].append((dirs[self.link_dir[link]], names[link]))
+                link = self.link_next[link]
+            links[0].reverse()
+            links[1].reverse()
+            yield key, links[0], links[1], self.nlinks[slot], self.sizes[slot], self.detail(slot)
+
+    def memory_usage(self) -> int:
+        """Estimation en octets de la mémoire occupée par la map (conteneurs et chaînes)."""
+        total = sys.getsizeof(self.dirs) + sys.getsizeof(self.dir_ids) + sys.getsizeof(self.dir_roots) + sys.getsizeof(self.slots)
+        total += sum(sys.getsizeof(prefix) for prefix in self.dirs)
+        # Clés fusionnées des inodes (les numéros d'inode sont de petits entiers)
+        total += sum(sys.getsizeof(key) + sys.getsizeof(slot) for key, slot in self.slots.items())
+        for buffer in (self.nlinks, self.sizes, self.allocated, self.mtimes, self.heads, self.link_next, self.link_dir, self.link_column):
+            if buffer is not None:
+                total += sys.getsizeof(buffer)
+        total += sys.getsizeof(self.link_name) + sum(sys.getsizeof(name) for name in self.link_name)
+        return total
+
+    def stats(self) -> dict:
+        """Volumétrie du scan et mémoire mesurée, pour les résultats et les logs."""
+        return {
+            "files": self.files,
+            "directories": len(self.dirs),
+            "paired_inodes": len(self),
+            "map_bytes": self.memory_usage(),
+            **process_memory(),
+        }
+
+def process_memory() -> dict:
+    """Mémoire résidente actuelle et maximale du processus, en octets."""
+    usage = {"peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open("/proc/self/statm", "r") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        pass
+    return usage
+
+def format_bytes(size: int) -> str:
+    """Taille lisible pour les logs (Ko, Mo, Go)."""
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if size < 1024 or unit == "Go":
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
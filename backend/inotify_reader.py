@@ -0,0 +1,156 @@
+# backend/inotify_reader.py
+import os
+import enum
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Drapeaux de <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Événements suivis dans chaque dossier, sans suivre les liens symboliques
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ATTRIB | IN_CLOSE_WRITE | IN_ONLYDIR | IN_DONT_FOLLOW
+
+# En-tête d'un événement : wd, mask, cookie, longueur du nom
+EVENT_HEADER = struct.Struct("iIII")
+
+# Un lot se termine après ce silence, ou au plus tard après INOTIFY_MAX_BATCH_MS (comme watchfiles)
+INOTIFY_STEP_MS = 50
+INOTIFY_MAX_BATCH_MS = 1600
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+class Change(enum.IntEnum):
+    """Nature d'un changement, aux mêmes valeurs que watchfiles.Change."""
+    added = 1
+    modified = 2
+    deleted = 3
+
+class InotifyOverflow(Exception):
+    """La file d'événements du noyau a débordé : des changements ont été perdus."""
+
+def _check(result: int, what: str) -> int:
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"{what}: {os.strerror(err)}")
+    return result
+
+class Inotify:
+    """
+    Lecteur inotify minimal : un watch par dossier, ajouté et retiré par l'appelant.
+
+    Contrairement à watchfiles, un débordement de la file du noyau (IN_Q_OVERFLOW) n'est
+    pas ignoré mais levé (InotifyOverflow), pour que l'appelant relise tout. Les
+    événements d'un lot sont rendus dans l'ordre où ils se sont produits.
+    """
+
+    def __init__(self):
+        self.fd = _check(_libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC), "inotify_init1")
+        self.paths = {}  # wd -> dossier surveillé
+        self.wds = {}    # dossier surveillé -> wd
+        self.selves = set()  # wd dont la suppression ou le déplacement est signalé
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add(self, dirpath: str, watch_self: bool = False):
+        """Surveille un dossier ; watch_self signale aussi sa propre suppression (racines)."""
+        dirpath = os.path.normpath(dirpath)
+        mask = WATCH_MASK | (IN_DELETE_SELF | IN_MOVE_SELF if watch_self else 0)
+        wd = _check(_libc.inotify_add_watch(self.fd, os.fsencode(dirpath), mask), f"inotify_add_watch {dirpath}")
+        # Un dossier déplacé garde son wd : il change seulement de chemin
+        previous = self.paths.get(wd)
+        if previous is not None and self.wds.get(previous) == wd:
+            del self.wds[previous]
+        self.paths[wd] = dirpath
+        self.wds[dirpath] = wd
+        if watch_self:
+            self.selves.add(wd)
+        else:
+            self.selves.discard(wd)
+
+    def remove(self, dirpath: str):
+        """Cesse de surveiller un dossier (sans erreur s'il a déjà disparu)."""
+        wd = self.wds.pop(os.path.normpath(dirpath), None)
+        if wd is None:
+            return
+        self.paths.pop(wd, None)
+        self.selves.discard(wd)
+        try:
+            _check(_libc.inotify_rm_watch(self.fd, wd), "inotify_rm_watch")
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+
+    def read(self, timeout: float) -> list:
+        """
+        Attend au plus timeout secondes un lot de changements [(Change, chemin), ...].
+        Lève InotifyOverflow si des événements ont été perdus, OSError si un dossier
+        surveillé a été démonté.
+        """
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        if not poller.poll(timeout * 1000):
+            return []
+        changes = []
+        deadline = time.monotonic() + INOTIFY_MAX_BATCH_MS / 1000
+        while True:
+            self._drain(changes)
+            if time.monotonic() >= deadline or not poller.poll(INOTIFY_STEP_MS):
+                return changes
+
+    def _drain(self, changes: list):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    raise InotifyOverflow("file d'événements inotify saturée")
+                dirpath = self.paths.get(wd)
+                if mask & IN_IGNORED:
+                    # Watch retiré (dossier supprimé, démonté ou remove())
+                    if dirpath is not None and self.wds.get(dirpath) == wd:
+                        del self.wds[dirpath]
+                    self.paths.pop(wd, None)
+                    self.selves.discard(wd)
+                    continue
+                if dirpath is None:
+                    # Watch déjà retiré : ses derniers événements ne concernent plus les racines
+                    continue
+                if mask & IN_UNMOUNT:
+                    raise OSError(errno.ENODEV, f"{dirpath} démonté")
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    if wd in self.selves:
+                        changes.append((Change.deleted, dirpath))
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.append((Change.added, os.path.join(dirpath, name)))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changes.append((Change.deleted, os.path.join(dirpath, name)))
+                elif mask & (IN_ATTRIB | IN_CLOSE_WRITE):
+                    changes.append((Change.modified, os.path.join(dirpath, name)))
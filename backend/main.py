@@ -1,15 +1,35 @@
 # backend/main.py
 import os
+import json
+import time
+import atexit
 import uuid
+import asyncio
 import logging
 import sys
 import traceback
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext, contextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from scanner import analyze_hardlinks, analyze_hardlinks_by_folder, count_files, delete_orphan_files
-from config_manager import load_config, save_config
+from scanner import delete_orphan_files, plan_orphan_deletion, space_by_folder, RESULT_CATEGORIES
+from config_manager import load_config, save_config, get_tab, config_signature
+from directory_listing import DirectoryListings
+from inode_index import InodeIndex
+from inode_map import process_memory
+from metrics import MetricsBuffer, render, label_key, estimate_results_bytes, SCAN_DURATION_BUCKETS, HTTP_DURATION_BUCKETS
+from progress import ProgressReporter
+from results_index import ResultsIndex, SORT_FIELDS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from scan_process import ScanProcess, ScanStopped, merge_partial
+from scan_schedule import ScanPlanner, ScheduleError, parse_schedule
+from scheduler import JobScheduler, job_key, job_devices, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from task_store import open_task_store, current_owner, LeaderLock, WATCH_TASK_PREFIX, LATEST_TASK_PREFIX
+from watcher import WatchManager
 
 # Configuration du logging pour Docker
 logging.basicConfig(
@@ -28,6 +48,9 @@ logger.info("🚀 Démarrage de l'application Linkarr Backend")
 # Dans Docker, ce sera le point de montage de vos données, ex: /data
 BROWSE_BASE_PATH = os.path.abspath(os.getenv("BROWSE_BASE_PATH", "."))
 
+# Entrées renvoyées par page de l'explorateur de fichiers
+BROWSE_PAGE_SIZE = 500
+
 app = FastAPI()
 
 # --- AJOUTS POUR CORS ---
@@ -46,49 +69,302 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dictionnaire pour garder en mémoire l'état des scans
+# Magasin des tâches partagé entre les workers (état, résultats, état des onglets, métriques)
+task_store = open_task_store()
+
+# Métriques de ce worker, versées dans le magasin à chaque tour du minuteur de leader
+metrics = MetricsBuffer()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Compte chaque requête et sa durée, par modèle de route (pas une série par tâche)."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "inconnue")
+    labels = {"method": request.method, "route": route}
+    metrics.inc("linkarr_http_requests_total", {**labels, "status": str(response.status_code)})
+    metrics.observe("linkarr_http_request_duration_seconds", labels, time.perf_counter() - started, HTTP_DURATION_BUCKETS)
+    return response
+
+# Tâches exécutées par ce worker, avec leurs résultats en mémoire
 scan_tasks = {}
 
+# Processus des scans en cours dans ce worker, pour pouvoir les arrêter sans attendre
+scan_processes = {}
+
+# Tâches terminées chargées depuis le magasin (autres workers, surveillance), les plus récentes en dernier
+loaded_tasks = OrderedDict()
+loaded_tasks_lock = threading.Lock()
+LOADED_TASKS_CACHE_SIZE = 8
+
+# Attente maximale du contenu de la surveillance demandé au leader par un autre worker
+WATCH_PAYLOAD_WAIT_SECONDS = 10
+
+# Contenu volumineux d'une tâche, servi par les endpoints de résultats et jamais par le statut
+TASK_PAYLOAD_KEYS = ("results", "results_index", "partial_results", "errors", "profile")
+
+# Flux d'événements de progression : au plus un événement "progress" par intervalle,
+# et un commentaire de maintien de connexion si rien n'a été envoyé depuis un moment
+PROGRESS_EVENT_INTERVAL = 0.5
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Derniers résultats (mode fichier) par onglet, réutilisés par la prévisualisation et
+# la suppression tant qu'ils sont frais : mêmes chemins et profondeur, moins de
+# RESULTS_CACHE_TTL secondes et aucune racine modifiée depuis le début du scan
+RESULTS_CACHE_TTL = int(os.getenv("RESULTS_CACHE_TTL", "900"))
+
 # Configuration des timeouts
 TASK_TIMEOUT_SECONDS = 3600  # 1 heure maximum par scan
+TASK_RETENTION_SECONDS = 1800  # Tâches terminées conservées 30 minutes
 TASK_CLEANUP_INTERVAL = 300   # Nettoyage toutes les 5 minutes
+LEADER_POLL_SECONDS = 5  # Tentative de reprise du rôle de leader et relecture de la configuration
 
-import time
-from datetime import datetime, timedelta
+def save_task(task_id: str):
+    """Écrit l'état courant d'une tâche de ce worker dans le magasin."""
+    task_store.save_state(task_id, task_status(scan_tasks[task_id]))
+
+def register_task(task_id: str, task: dict):
+    """Enregistre une nouvelle tâche de ce worker, visible aussitôt de tous les workers."""
+    scan_tasks[task_id] = task
+    save_task(task_id)
+
+@contextmanager
+def timed_stage(task: dict, stage: str):
+    """
+    Mesure une étape exécutée par le worker lui-même et l'ajoute à task["timings"],
+    à côté des étapes mesurées par le ProgressReporter du scan. Le temps CPU est celui
+    du thread : le worker en fait tourner d'autres en même temps.
+    """
+    wall, cpu = time.monotonic(), time.thread_time()
+    try:
+        yield
+    finally:
+        timing = {"wall_seconds": round(time.monotonic() - wall, 3), "cpu_seconds": round(time.thread_time() - cpu, 3)}
+        task["timings"] = {**task.get("timings", {}), stage: timing}
+
+def complete_task(task_id: str, results: dict, errors: list = None, index: bool = True, blob: bytes = None):
+    """
+    Termine une tâche : le contenu est écrit dans le magasin avant d'annoncer la tâche
+    terminée, pour qu'aucun worker ne voie "completed" sans résultats.
+    blob est le contenu déjà compressé par le processus de scan (profil compris).
+    """
+    task = scan_tasks[task_id]
+    if index:
+        # Index de pagination construit une fois, avant d'annoncer la tâche terminée
+        task["stage"] = "index"
+        with timed_stage(task, "index"):
+            task["results_index"] = ResultsIndex(results)
+    payload = {"results": results, "errors": errors}
+    if task.get("profile") is not None:
+        payload["profile"] = task["profile"]
+    with timed_stage(task, "store"):
+        task_store.save_payload(task_id, payload, blob)
+    task.pop("partial_results", None)
+    task["results"] = results
+    task["results_bytes"] = estimate_results_bytes(results)
+    task["errors"] = errors
+    task["completed_at"] = time.time()
+    # Une tâche terminée n'a plus d'étape en cours (la durée de chacune reste dans timings)
+    task["stage"] = None
+    task["status"] = "completed"
+    save_task(task_id)
+
+def fail_task(task_id: str, error: str, status: str = "error"):
+    task = scan_tasks[task_id]
+    task.pop("partial_results", None)
+    task["stage"] = None
+    task["status"] = status
+    task["error"] = error
+    task["completed_at"] = time.time()
+    save_task(task_id)
+
+# Message d'une tâche arrêtée, selon la raison de l'arrêt
+STOP_MESSAGES = {
+    "cancelled": "Scan annulé",
+    "timeout": "Timeout: Le scan a dépassé la limite de temps autorisée",
+}
+
+def set_queue_position(task_id: str, position):
+    """Publie la position d'une tâche de ce worker dans la file d'attente des jobs."""
+    task = scan_tasks.get(task_id)
+    if task is not None:
+        task["queue_position"] = position
+        save_task(task_id)
+
+# File d'attente des scans et suppressions : limites globale et par disque, partagées par les workers
+job_scheduler = JobScheduler(task_store, on_position=set_queue_position)
+
+def queue_task(task_id: str, perform, args: tuple, paths: list, key: str = None, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """
+    Confie une tâche enregistrée (étape "queued") à la file d'attente des jobs.
+
+    Retourne le task_id à renvoyer au client : si un job de même clé est déjà en attente
+    ou en cours, la demande lui est rattachée et la nouvelle tâche est oubliée. Un job
+    encore en attente (scan planifié, par exemple) prend alors la priorité de la demande.
+    """
+    def run():
+        if task_store.cancel_requested(task_id):
+            stop_task(task_id, "cancelled")
+            return
+        task = scan_tasks[task_id]
+        task["stage"] = None
+        task["queue_position"] = None
+        task["started_at"] = time.time()
+        save_task(task_id)
+        perform(task_id, *args)
+
+    existing = job_scheduler.submit(task_id, run, key, job_devices(paths), priority)
+    if existing is not None:
+        scan_tasks.pop(task_id, None)
+        task_store.delete(task_id)
+        return existing
+    return task_id
+
+def stop_task(task_id: str, reason: str):
+    """Termine une tâche dont le scan a été arrêté (annulation ou timeout)."""
+    fail_task(task_id, STOP_MESSAGES[reason], status=reason)
+    task_store.clear_cancel(task_id)
+    if reason == "timeout":
+        logger.warning(f"⏰ Timeout de la tâche {task_id} après {TASK_TIMEOUT_SECONDS} secondes, scan arrêté")
+    else:
+        logger.info(f"🛑 Scan de la tâche {task_id} annulé")
+
+def find_task(task_id: str, with_results: bool = False):
+    """
+    Retourne une tâche de ce worker, ou l'état d'une tâche du magasin (None si inconnue).
+    with_results charge aussi le contenu d'une tâche terminée ailleurs ; il est gardé
+    en cache tant que la tâche n'a pas été republiée (instantanés de la surveillance).
+    Pour une tâche en cours ailleurs, with_results charge ses résultats partiels.
+    """
+    task = scan_tasks.get(task_id)
+    if task is not None:
+        return task
+    state = task_store.get(task_id)
+    if state is None or not with_results:
+        return state
+    if state.get("status") == "running" and state.get("has_partial_results"):
+        return load_partial_task(task_id, state)
+    if state.get("status") != "completed":
+        return state
+
+    if state.get("source") == "watch":
+        task = local_watch_task(task_id, state)
+        if task is not None:
+            return task
+        state = await_watch_payload(task_id, state)
+
+    with loaded_tasks_lock:
+        task = loaded_tasks.get(task_id)
+        if (task is not None and task.get("completed_at") == state.get("completed_at")
+                and task.get("payload_updated_at") == state.get("payload_updated_at")):
+            loaded_tasks.move_to_end(task_id)
+            return task
+    payload = task_store.load_payload(task_id)
+    if payload is None:
+        return state
+    task = {**state, **payload}
+    if state.get("action") != "delete_orphans" and payload.get("results") is not None:
+        task["results_index"] = ResultsIndex(payload["results"])
+    return cache_loaded_task(task_id, task)
+
+def cache_loaded_task(task_id: str, task: dict) -> dict:
+    """Garde une tâche chargée dans loaded_tasks, en oubliant les plus anciennes."""
+    with loaded_tasks_lock:
+        loaded_tasks[task_id] = task
+        loaded_tasks.move_to_end(task_id)
+        while len(loaded_tasks) > LOADED_TASKS_CACHE_SIZE:
+            loaded_tasks.popitem(last=False)
+    return task
+
+def local_watch_task(task_id: str, state: dict):
+    """
+    Tâche d'une surveillance tenue par ce worker (le leader), servie depuis sa mémoire
+    sans passer par le magasin ; None si la surveillance tourne ailleurs ou n'est pas prête.
+    """
+    snapshot = watch_manager.get_results(state.get("tab_id"), state.get("check_column"), state.get("watch_id"))
+    if snapshot is None:
+        return None
+    with loaded_tasks_lock:
+        task = loaded_tasks.get(task_id)
+        if task is not None and task.get("snapshot_at") == snapshot["updated_at"]:
+            loaded_tasks.move_to_end(task_id)
+            return task
+    task = {**state, "results": snapshot["results"], "errors": snapshot["errors"], "snapshot_at": snapshot["updated_at"]}
+    task["results_index"] = ResultsIndex(snapshot["results"])
+    return cache_loaded_task(task_id, task)
+
+def await_watch_payload(task_id: str, state: dict) -> dict:
+    """
+    Le leader n'écrit le contenu d'une surveillance dans le magasin que sur demande :
+    s'il est plus ancien que l'état publié, le demander et l'attendre au plus
+    WATCH_PAYLOAD_WAIT_SECONDS. Retourne le dernier état lu.
+    """
+    if (state.get("payload_updated_at") or 0) >= (state.get("updated_at") or 0):
+        return state
+    task_store.set_tab_state(state.get("tab_id"), watch_payload_requested=time.time())
+    deadline = time.monotonic() + WATCH_PAYLOAD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        current = task_store.get(task_id)
+        if current is None or current.get("watch_id") != state.get("watch_id"):
+            return state
+        state = current
+        if (state.get("payload_updated_at") or 0) >= (state.get("updated_at") or 0):
+            return state
+    logger.warning(f"⌛ Contenu de la surveillance {task_id} pas encore transmis, dernier contenu servi")
+    return state
+
+def load_partial_task(task_id: str, state: dict) -> dict:
+    """
+    Tâche en cours dans un autre worker, avec ses résultats partiels relus du magasin.
+    Seuls les envois publiés depuis la lecture précédente sont chargés et cumulés.
+    """
+    with loaded_tasks_lock:
+        cached = loaded_tasks.get(task_id)
+        if cached is None or cached.get("status") != "running":
+            cached = {"partial_results": {}, "partials_seq": 0}
+        partial, seq = cached["partial_results"], cached["partials_seq"]
+        for seq, delta in task_store.load_partials(task_id, seq):
+            merge_partial(partial, delta)
+        task = {**state, "partial_results": partial, "partials_seq": seq}
+    return cache_loaded_task(task_id, task)
 
 def cleanup_old_tasks():
-    """Nettoie les tâches anciennes ou expirées."""
+    """
+    Nettoie les tâches anciennes ou expirées.
+
+    Chaque worker passe en timeout ses propres tâches démarrées depuis trop longtemps
+    qui ne tournent pas dans un processus de scan (celui-ci est arrêté par
+    run_scan_process) et oublie ses tâches terminées ; le leader expire le magasin (tâches terminées depuis plus de
+    TASK_RETENTION_SECONDS, tâches en cours d'un worker arrêté).
+    """
     current_time = time.time()
     tasks_to_remove = []
     
-    for task_id, task_data in scan_tasks.items():
-        # Vérifier si la tâche a un timestamp de création
-        if 'created_at' not in task_data:
-            task_data['created_at'] = current_time
-            continue
-            
-        # Supprimer les tâches qui sont terminées depuis plus de 30 minutes
-        if task_data.get('status') in ['completed', 'error']:
-            if current_time - task_data.get('completed_at', task_data['created_at']) > 1800:  # 30 minutes
+    for task_id, task_data in list(scan_tasks.items()):
+        # Oublier les tâches qui sont terminées depuis plus de 30 minutes
+        if task_data.get('status') in ['completed', 'error', 'timeout', 'cancelled']:
+            if current_time - task_data.get('completed_at', task_data['created_at']) > TASK_RETENTION_SECONDS:
                 tasks_to_remove.append(task_id)
                 
-        # Supprimer les tâches qui tournent depuis plus de TASK_TIMEOUT_SECONDS
-        elif task_data.get('status') == 'running':
-            if current_time - task_data['created_at'] > TASK_TIMEOUT_SECONDS:
+        # Passer en timeout les tâches qui tournent depuis plus de TASK_TIMEOUT_SECONDS
+        elif task_data.get('status') == 'running' and task_id not in scan_processes and 'started_at' in task_data:
+            if current_time - task_data['started_at'] > TASK_TIMEOUT_SECONDS:
                 task_data['status'] = 'timeout'
                 task_data['error'] = 'Timeout: Le scan a dépassé la limite de temps autorisée'
                 task_data['completed_at'] = current_time
+                save_task(task_id)
                 logger.warning(f"⏰ Timeout de la tâche {task_id} après {TASK_TIMEOUT_SECONDS} secondes")
     
     for task_id in tasks_to_remove:
-        logger.info(f"🗑️ Suppression de la tâche expirée: {task_id}")
         del scan_tasks[task_id]
-    
-    if tasks_to_remove:
-        logger.info(f"🧹 Nettoyage terminé: {len(tasks_to_remove)} tâche(s) supprimée(s)")
 
-import threading
-import atexit
+    if leader.held:
+        removed, stopped = task_store.expire(TASK_RETENTION_SECONDS, current_time)
+        if stopped:
+            logger.warning(f"⚠️ {stopped} tâche(s) interrompue(s) par l'arrêt de leur worker")
+        if removed:
+            logger.info(f"🧹 Nettoyage terminé: {removed} tâche(s) supprimée(s)")
 
 # Démarrer le nettoyage automatique des tâches
 def start_cleanup_timer():
@@ -98,11 +374,6 @@ def start_cleanup_timer():
     timer.start()
     return timer
 
-cleanup_timer = start_cleanup_timer()
-atexit.register(cleanup_timer.cancel)
-
-logger.info(f"🧹 Système de nettoyage automatique des tâches démarré (intervalle: {TASK_CLEANUP_INTERVAL}s)")
-
 # --- Modèles Pydantic pour la validation ---
 class TabConfig(BaseModel):
     id: str
@@ -110,6 +381,10 @@ class TabConfig(BaseModel):
     scan_mode: str = "file"  # "file" ou "folder"
     check_column: str = "a"  # "a", "b" ou "both" (utilisé seulement si scan_mode = "folder")
     max_depth: int = -1  # Profondeur maximale de scan (-1 = illimitée)
+    use_index: bool = False  # Index persistant : ne reliste que les dossiers modifiés depuis le dernier scan
+    watch: bool = False  # Surveillance inotify : les résultats sont tenus à jour en continu
+    scan_workers: int = Field(1, ge=1, le=64)  # Threads de listage des dossiers pendant un scan
+    schedule: Optional[str] = None  # Scans planifiés : intervalle ("6h") ou expression cron ("0 3 * * *")
     paths_a: List[str]
     paths_b: List[str]
     name_a: str = "Downloads"
@@ -118,6 +393,117 @@ class TabConfig(BaseModel):
 class AppConfig(BaseModel):
     tabs: List[TabConfig]
 
+def watch_task_id(tab_id: str) -> str:
+    """Tâche du magasin qui porte le dernier état de la surveillance d'un onglet."""
+    return f"{WATCH_TASK_PREFIX}{tab_id}"
+
+def publish_watch_snapshot(watcher, status):
+    """
+    Écrit l'état léger d'une surveillance (compteurs, horodatages) dans le magasin,
+    ou le retire (status None). Le contenu n'est écrit que sur demande (write_watch_payload).
+    """
+    tab_id = watcher.tab_id
+    task_id = watch_task_id(tab_id)
+    state = task_store.get(task_id)
+    if status is None:
+        # Une surveillance qui s'arrête ne retire pas l'état publié par celle qui la remplace
+        if state is not None and state.get("watch_id") == watcher.watch_id:
+            task_store.delete(task_id)
+        return
+    if state is None or state.get("watch_id") != watcher.watch_id:
+        # Le contenu éventuel d'une surveillance précédente ne doit pas être servi pour celle-ci
+        task_store.delete(task_id)
+        created_at = time.time()
+    else:
+        created_at = state.get("created_at")
+    task_store.save_state(task_id, {
+        "status": "completed",
+        "progress": status["files"],
+        "total": status["files"],
+        "total_source": "exact",
+        "current_file": "",
+        "created_at": created_at,
+        "completed_at": status["updated_at"],
+        "tab_id": tab_id,
+        "source": "watch",
+        "check_column": watcher.check_column,
+        "watch_id": watcher.watch_id,
+        "updated_at": status["updated_at"],
+        "payload_updated_at": status["payload_updated_at"],
+        "errors_count": status["errors_count"],
+        "has_partial_results": False
+    })
+
+def write_watch_payload(watcher, snapshot):
+    """Écrit le contenu d'une surveillance dans le magasin, à la demande d'un lecteur."""
+    task_store.save_payload(watch_task_id(watcher.tab_id), {"results": snapshot["results"], "errors": snapshot["errors"]})
+
+def watch_payload_wanted(watcher) -> bool:
+    """Un lecteur a-t-il demandé le contenu de la surveillance depuis sa dernière écriture ?"""
+    requested = task_store.get_tab_state(watcher.tab_id).get("watch_payload_requested") or 0
+    return requested > watcher.payload_sent_at
+
+# Un seul worker, le leader, surveille les onglets configurés avec "watch", lance les scans
+# planifiés et expire le magasin ; les autres servent les états qu'il publie dans le magasin
+leader = LeaderLock(task_store.lock_path)
+watch_manager = WatchManager(
+    on_publish=publish_watch_snapshot, on_payload=write_watch_payload, payload_wanted=watch_payload_wanted
+)
+leader_config = None  # Signature de la configuration appliquée par le leader
+
+def sync_leader(tabs: list):
+    """Aligne les surveillances et les planifications du leader sur la configuration."""
+    global leader_config
+    leader_config = config_signature()
+    watch_manager.sync(tabs)
+    scan_planner.sync(tabs)
+
+def leader_tick():
+    """
+    Reprend le rôle de leader s'il est libre, suit les changements de configuration et
+    lance les scans planifiés arrivés à échéance.
+    """
+    if not leader.held:
+        if not leader.acquire():
+            return
+        logger.info(f"👑 Worker {os.getpid()} leader : surveillances et expiration des tâches")
+        # États laissés par un ancien leader : ils ne sont plus tenus à jour
+        for tab in load_config().get("tabs", []):
+            task_store.delete(watch_task_id(tab["id"]))
+    if config_signature() != leader_config:
+        # La configuration a pu être modifiée par un autre worker
+        sync_leader(load_config().get("tabs", []))
+    scan_planner.tick()
+
+def flush_metrics():
+    """Verse les métriques de ce worker dans le magasin, avec ses jauges propres (mémoire, tâches)."""
+    worker = str(os.getpid())
+    with loaded_tasks_lock:
+        held = {"tasks": list(scan_tasks.values()), "loaded": list(loaded_tasks.values())}
+    gauges = [("linkarr_worker_rss_bytes", label_key({"worker": worker}), process_memory().get("rss_bytes", 0))]
+    for cache, tasks in held.items():
+        labels = label_key({"worker": worker, "cache": cache})
+        gauges.append(("linkarr_worker_tasks", labels, len(tasks)))
+        gauges.append(("linkarr_worker_results_bytes", labels, sum(task.get("results_bytes", 0) for task in tasks if task.get("results") is not None)))
+    task_store.update_metrics(gauges=gauges, owner=current_owner())
+    metrics.flush(task_store)
+
+def start_leader_timer():
+    leader_tick()
+    try:
+        flush_metrics()
+    except Exception as e:
+        logger.error(f"❌ Écriture des métriques impossible: {e}")
+    timer = threading.Timer(LEADER_POLL_SECONDS, start_leader_timer)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+cleanup_timer = start_cleanup_timer()
+atexit.register(cleanup_timer.cancel)
+
+logger.info(f"🧹 Système de nettoyage automatique des tâches démarré (intervalle: {TASK_CLEANUP_INTERVAL}s)")
+
 # --- Endpoints pour la Configuration ---
 
 @app.get("/api/config", response_model=AppConfig)
@@ -128,17 +514,40 @@ def get_config():
 @app.post("/api/config")
 def update_config(config: AppConfig):
     """Met à jour et sauvegarde la configuration."""
+    for tab in config.tabs:
+        if tab.schedule:
+            try:
+                parse_schedule(tab.schedule)
+            except ScheduleError as e:
+                raise HTTPException(status_code=400, detail=f"Planification invalide pour l'onglet '{tab.name}' : {e}")
     save_config(config.dict())
+    if leader.held:
+        sync_leader(config.dict()["tabs"])
     return {"message": "Configuration sauvegardée avec succès."}
 
+def get_tab_or_404(tab_id: str) -> dict:
+    """Onglet de la configuration (depuis le cache de config_manager), ou erreur 404."""
+    tab = get_tab(tab_id)
+    if not tab:
+        logger.error(f"❌ Onglet non trouvé: {tab_id}")
+        raise HTTPException(status_code=404, detail=f"L'onglet '{tab_id}' n'existe pas.")
+    return tab
+
 # --- Endpoint pour l'Explorateur de fichiers ---
 
+# Listages récents de l'explorateur : naviguer dans un même dossier ne le relit pas
+directory_listings = DirectoryListings()
+
 @app.get("/api/browse")
-def browse_path(path: str = '/'):
+def browse_path(path: str = '/', cursor: int = 0, limit: int = BROWSE_PAGE_SIZE, dirs_only: bool = False):
     """
-    Liste le contenu d'un répertoire.
+    Liste le contenu d'un répertoire par pages, dossiers d'abord puis par nom.
     Pour la sécurité, ne permet de naviguer que dans BROWSE_BASE_PATH.
+    dirs_only ne renvoie que les sous-dossiers ; next_cursor vaut None à la dernière page.
     """
+    if cursor < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Le curseur doit être positif et la limite entre 1 et {MAX_PAGE_SIZE}.")
+
     if path == '/':
         # Si le chemin est la racine, on le redirige vers notre base
         target_path = BROWSE_BASE_PATH
@@ -153,31 +562,226 @@ def browse_path(path: str = '/'):
         if not os.path.isdir(target_path):
             raise HTTPException(status_code=400, detail="Le chemin n'est pas un répertoire.")
 
-        content = os.listdir(target_path)
-        results = []
-        for item in content:
-            item_path = os.path.join(target_path, item)
-            # On retourne un chemin relatif à la base pour le frontend
-            relative_item_path = os.path.relpath(item_path, BROWSE_BASE_PATH)
-            if relative_item_path == '.':
-                relative_item_path = '/'
-
-            results.append({
-                "name": item,
-                "path": relative_item_path,
-                "is_dir": os.path.isdir(item_path)
-            })
-        return sorted(results, key=lambda x: (not x['is_dir'], x['name'].lower()))
-
+        entries = directory_listings.list(target_path, dirs_only)
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Chemin non trouvé.")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Lecture de ce dossier refusée.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # On retourne des chemins relatifs à la base pour le frontend, pour la page seulement
+    relative_path = os.path.relpath(target_path, BROWSE_BASE_PATH)
+    prefix = "" if relative_path == "." else f"{relative_path}/"
+    page = entries[cursor:cursor + limit]
+    next_cursor = cursor + limit if cursor + limit < len(entries) else None
+    return {
+        "path": "/" if relative_path == "." else relative_path,
+        "items": [{"name": name, "path": f"{prefix}{name}", "is_dir": is_dir} for name, is_dir in page],
+        "total": len(entries),
+        "next_cursor": next_cursor,
+    }
+
 
 # --- Endpoint pour le Scan (mis à jour) ---
 
-def perform_scan_task(task_id: str, paths_a: list, paths_b: list, max_depth: int = -1):
+def _scan_key(paths_a: list, paths_b: list, max_depth: int) -> list:
+    """Clé d'un comptage ou d'un scan mémorisé : il n'est valable que pour les mêmes chemins et la même profondeur."""
+    return [list(paths_a), list(paths_b), max_depth]
+
+def initial_total(tab_id: str, paths_a: list, paths_b: list, max_depth: int) -> dict:
+    """
+    Retourne le total annoncé au démarrage d'une tâche.
+
+    Le scan se fait en une seule passe : on reprend le nombre de fichiers du dernier
+    scan de l'onglet, sinon le scanner affine une estimation pendant le parcours.
+    """
+    last_count = task_store.get_tab_state(tab_id).get("file_count")
+    if last_count is not None and last_count["key"] == _scan_key(paths_a, paths_b, max_depth):
+        return {"total": last_count["files"], "total_source": "last_scan"}
+    return {"total": 0, "total_source": "estimate"}
+
+def record_file_count(task_id: str, paths_a: list, paths_b: list, max_depth: int):
+    """Fige le total d'une tâche de scan terminée et le mémorise pour les prochains scans."""
+    task = scan_tasks[task_id]
+    task["total"] = task["progress"]
+    task["total_source"] = "exact"
+    task_store.set_tab_state(task.get("tab_id"), file_count={"key": _scan_key(paths_a, paths_b, max_depth), "files": task["progress"]})
+
+def root_mtimes(paths: list) -> dict:
+    """mtime de chaque racine (None si illisible), pour détecter une modification depuis un scan."""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+def tab_check_column(tab: dict):
+    """Colonne vérifiée par les scans de l'onglet : None en mode fichier."""
+    return tab.get("check_column", "a") if tab.get("scan_mode") == "folder" else None
+
+def _results_key(paths_a: list, paths_b: list, max_depth: int, check_column: str = None) -> list:
+    """Clé d'un scan réutilisable : mêmes chemins, même profondeur et même mode (colonne vérifiée)."""
+    return _scan_key(paths_a, paths_b, max_depth) + [check_column]
+
+def remember_tab_results(tab_id: str, paths_a: list, paths_b: list, max_depth: int, task_id: str, mtimes: dict, check_column: str = None):
+    """
+    Mémorise la tâche qui porte le dernier scan de l'onglet ; mtimes est relevé avant le scan.
+    check_column vaut None pour un scan de fichiers.
+    """
+    task_store.set_tab_state(tab_id, last_scan={
+        "key": _results_key(paths_a, paths_b, max_depth, check_column),
+        "task_id": task_id,
+        "mtimes": mtimes,
+        "scanned_at": time.time(),
+    })
+
+def task_payload(task_id: str):
+    """Retourne (results, errors) d'une tâche terminée, ou None."""
+    task = find_task(task_id, with_results=True)
+    if task is None or task.get("results") is None:
+        return None
+    return task["results"], task.get("errors") or []
+
+def fresh_tab_results(tab: dict):
+    """
+    Retourne (results, errors) d'un scan encore frais de l'onglet, ou None.
+    La surveillance, quand elle est active, fait toujours foi.
+    """
+    tab_id = tab.get("id")
+    check_column = tab_check_column(tab)
+    if live_task_id(tab_id, check_column) is not None:
+        live = task_payload(watch_task_id(tab_id))
+        if live is not None:
+            return live
+
+    cached = task_store.get_tab_state(tab_id).get("last_scan")
+    if cached is None:
+        return None
+    paths_a, paths_b = tab.get("paths_a", []), tab.get("paths_b", [])
+    if cached["key"] != _results_key(paths_a, paths_b, tab.get("max_depth", -1), check_column):
+        return None
+    age = time.time() - cached["scanned_at"]
+    if age > RESULTS_CACHE_TTL:
+        logger.info(f"⌛ Résultats de l'onglet {tab_id} trop anciens ({age:.0f}s), nouveau scan")
+        return None
+    if root_mtimes(paths_a + paths_b) != cached["mtimes"]:
+        logger.info(f"📝 Une racine de l'onglet {tab_id} a changé depuis le scan, nouveau scan")
+        return None
+    results = task_payload(cached["task_id"])
+    if results is None:
+        return None
+    logger.info(f"♻️ Résultats du scan de l'onglet {tab_id} réutilisés ({age:.0f}s)")
+    return results
+
+def live_task_id(tab_id: str, check_column: str = None):
+    """
+    Retourne la tâche qui porte l'état de la surveillance de l'onglet (déjà terminée),
+    ou None si l'onglet n'est pas surveillé, pas encore prêt ou surveillé dans un autre mode.
+    """
+    state = task_store.get(watch_task_id(tab_id))
+    if state is None or state.get("check_column") != check_column:
+        return None
+    return watch_task_id(tab_id)
+
+def latest_task_id(tab_id: str) -> str:
+    """Tâche épinglée du magasin qui porte les résultats du dernier scan terminé d'un onglet."""
+    return f"{LATEST_TASK_PREFIX}{tab_id}"
+
+def pin_latest_results(task_id: str, paths_a: list, paths_b: list, max_depth: int, check_column: str = None, blob: bytes = None):
+    """
+    Copie une tâche de scan terminée dans la tâche épinglée de son onglet, qui survit à
+    l'expiration des tâches : l'onglet peut afficher ces résultats à sa prochaine ouverture.
+    """
+    task = scan_tasks[task_id]
+    pinned_id = latest_task_id(task.get("tab_id"))
+    task_store.save_payload(pinned_id, {"results": task["results"], "errors": task["errors"]}, blob)
+    task_store.save_state(pinned_id, {
+        **task_status(task),
+        "source": task.get("source", "manual"),
+        "scan_task_id": task_id,
+        "check_column": check_column,
+        "key": _scan_key(paths_a, paths_b, max_depth),
+    })
+
+def create_live_task(tab_id: str, check_column: str = None):
+    """Retourne la tâche de la surveillance de l'onglet à servir au lieu d'un scan, ou None."""
+    task_id = live_task_id(tab_id, check_column)
+    if task_id is not None:
+        logger.info(f"👀 Résultats de la surveillance servis pour l'onglet {tab_id} (tâche {task_id})")
+    return task_id
+
+def task_progress(task_id: str, label: str = "Progression") -> ProgressReporter:
+    """Reporter de progression qui publie dans l'état de la tâche."""
+    return ProgressReporter(scan_tasks[task_id], task_id, label, on_publish=lambda task: save_task(task_id))
+
+def run_scan_process(task_id: str, mode: str, paths_a: list, paths_b: list, check_column: str, max_depth: int, use_index: bool, workers: int, label: str, profile: bool = False):
+    """
+    Exécute le scan d'une tâche dans un processus dédié et relaie sa progression et ses
+    résultats partiels dans la tâche. Le processus est arrêté sur demande d'annulation
+    (de n'importe quel worker) ou après TASK_TIMEOUT_SECONDS. Avec profile, le profil
+    du scan est gardé dans task["profile"].
+    Retourne (results, errors, blob) ; lève ScanStopped si le scan a été arrêté.
+    """
+    task = scan_tasks[task_id]
+
+    def on_progress(fields: dict, has_partial: bool):
+        task.update(fields)
+        if not has_partial:
+            task.pop("partial_results", None)
+        save_task(task_id)
+
+    def on_partial(delta: dict, blob: bytes):
+        merge_partial(task.setdefault("partial_results", {}), delta)
+        # Les autres workers servent les résultats partiels depuis le magasin
+        task_store.append_partial(task_id, blob)
+
+    def should_stop():
+        if task_store.cancel_requested(task_id):
+            return "cancelled"
+        if time.time() - task.get("started_at", task["created_at"]) > TASK_TIMEOUT_SECONDS:
+            return "timeout"
+        return None
+
+    scan = ScanProcess(mode, paths_a, paths_b, check_column, max_depth, use_index, workers,
+                       {"total": task["total"], "total_source": task["total_source"]}, label, profile)
+    scan_processes[task_id] = scan
+    try:
+        outcome = scan.run(on_progress, on_partial, should_stop)
+        if scan.profile is not None:
+            task["profile"] = scan.profile
+        return outcome
+    finally:
+        scan_processes.pop(task_id, None)
+
+def record_scan_metrics(task_id: str, mode: str):
+    """Verse les mesures d'une tâche de scan terminée (quel que soit son statut) dans les métriques."""
+    task = scan_tasks[task_id]
+    labels = {"tab": task.get("tab_id") or "", "mode": mode}
+    duration = task["completed_at"] - task.get("started_at", task["created_at"])
+    metrics.observe("linkarr_scan_duration_seconds", {**labels, "status": task["status"]}, duration, SCAN_DURATION_BUCKETS)
+    results = task.get("results")
+    if task["status"] != "completed" or not results:
+        return
+    stats = results.get("stats", {})
+    metrics.inc("linkarr_scan_files_total", labels, stats.get("files", 0))
+    metrics.inc("linkarr_scan_directories_total", labels, stats.get("directories_visited", 0))
+    metrics.inc("linkarr_scan_errors_total", labels, len(task.get("errors") or []))
+    metrics.set("linkarr_scan_files_per_second", labels, stats.get("files_per_second", 0))
+    metrics.set("linkarr_scan_directories_per_second", labels, stats.get("directories_per_second", 0))
+    for category in RESULT_CATEGORIES:
+        metrics.set("linkarr_scan_results", {**labels, "category": category}, len(results.get(category, [])))
+        metrics.set("linkarr_scan_result_bytes", {**labels, "category": category}, sum(results.get("sizes", {}).get(category, [])))
+
+def open_index(use_index: bool):
+    """Retourne l'index persistant à utiliser comme contexte, ou un contexte vide."""
+    return InodeIndex() if use_index else nullcontext()
+
+def perform_scan_task(task_id: str, paths_a: list, paths_b: list, max_depth: int = -1, use_index: bool = False, workers: int = 1, profile: bool = False):
     """Effectue le scan de fichiers et met à jour l'état de la tâche."""
     logger.info(f"🔍 Début du scan pour la tâche {task_id}")
     logger.info(f"📁 Chemins A: {paths_a}")
@@ -185,36 +789,32 @@ def perform_scan_task(task_id: str, paths_a: list, paths_b: list, max_depth: int
     logger.info(f"🔢 Profondeur maximale: {max_depth if max_depth >= 0 else 'illimitée'}")
     
     try:
-        results, errors = analyze_hardlinks(paths_a, paths_b, task_id, scan_tasks, max_depth)
-        scan_tasks[task_id]["status"] = "completed"
-        scan_tasks[task_id]["results"] = results
-        scan_tasks[task_id]["errors"] = errors
-        scan_tasks[task_id]["completed_at"] = time.time()
+        mtimes = root_mtimes(paths_a + paths_b)
+        results, errors, blob = run_scan_process(task_id, "file", paths_a, paths_b, None, max_depth, use_index, workers, "Progression", profile)
+        record_file_count(task_id, paths_a, paths_b, max_depth)
+        complete_task(task_id, results, errors, blob=blob)
+        remember_tab_results(scan_tasks[task_id].get("tab_id"), paths_a, paths_b, max_depth, task_id, mtimes)
+        pin_latest_results(task_id, paths_a, paths_b, max_depth, blob=blob)
         
         logger.info(f"✅ Scan terminé pour la tâche {task_id}")
-        logger.info(f"📊 Résultats: {len(results.get('synced', []))} synchronisés, {len(results.get('orphans_a', []))} orphelins A, {len(results.get('orphans_b', []))} orphelins B")
+        logger.info(f"📊 Résultats: {len(results.get('synced', []))} synchronisés, {len(results.get('orphans_a', []))} orphelins A, {len(results.get('orphans_b', []))} orphelins B, {len(results.get('linked_outside', []))} liés hors des racines")
         if errors:
             logger.warning(f"⚠️ {len(errors)} erreurs rencontrées pendant le scan")
+    except ScanStopped as e:
+        stop_task(task_id, e.reason)
     except Exception as e:
         logger.error(f"❌ Erreur lors du scan de la tâche {task_id}: {str(e)}")
-        scan_tasks[task_id]["status"] = "error"
-        scan_tasks[task_id]["error"] = str(e)
-        scan_tasks[task_id]["completed_at"] = time.time()
+        fail_task(task_id, str(e))
+    record_scan_metrics(task_id, "file")
 
-@app.post("/api/scan/{tab_id}")
-def run_scan(tab_id: str, background_tasks: BackgroundTasks):
+def start_scan(tab: dict, priority: int = PRIORITY_INTERACTIVE, source: str = None, profile: bool = False) -> str:
     """
-    Lance une analyse sur un onglet en arrière-plan.
+    Met en file d'attente le scan de fichiers d'un onglet et retourne la tâche à suivre
+    (celle de la surveillance si elle est active, ou celle d'un scan identique déjà lancé).
+    source marque les scans qui ne viennent pas de l'interface ("schedule") ; profile
+    demande un profil du scan (voir /api/scan/profile).
     """
-    logger.info(f"🚀 Demande de scan pour l'onglet: {tab_id}")
-    
-    config = load_config()
-    tab = next((t for t in config.get("tabs", []) if t.get("id") == tab_id), None)
-
-    if not tab:
-        logger.error(f"❌ Onglet non trouvé: {tab_id}")
-        raise HTTPException(status_code=404, detail=f"L'onglet '{tab_id}' n'existe pas.")
-    
+    tab_id = tab.get("id")
     paths_a = tab.get("paths_a", [])
     paths_b = tab.get("paths_b", [])
     max_depth = tab.get("max_depth", -1)
@@ -223,34 +823,54 @@ def run_scan(tab_id: str, background_tasks: BackgroundTasks):
         logger.error(f"❌ Aucun chemin configuré pour l'onglet {tab_id}")
         raise HTTPException(status_code=400, detail=f"Aucun chemin configuré pour l'onglet '{tab_id}'.")
 
+    live_id = create_live_task(tab_id)
+    if live_id:
+        return live_id
+
     task_id = str(uuid.uuid4())
-    logger.info(f"📝 Comptage des fichiers pour la tâche {task_id}...")
-    total_files = count_files(paths_a, max_depth) + count_files(paths_b, max_depth)
-    logger.info(f"📊 Total de fichiers à scanner: {total_files}")
+    total = initial_total(tab_id, paths_a, paths_b, max_depth)
+    logger.info(f"📊 Total de fichiers annoncé: {total['total']} ({total['total_source']})")
     
     current_time = time.time()
-    scan_tasks[task_id] = {
+    register_task(task_id, {
         "status": "running",
         "progress": 0,
-        "total": total_files,
+        **total,
         "current_file": "",
         "results": None,
         "errors": None,
         "created_at": current_time,
-        "tab_id": tab_id
-    }
+        "tab_id": tab_id,
+        "stage": "queued",
+        "queue_position": None,
+        **({"source": source} if source else {})
+    })
     
-    logger.info(f"✨ Tâche {task_id} créée et ajoutée à scan_tasks")
+    logger.info(f"✨ Tâche {task_id} créée et enregistrée")
     logger.debug(f"🔍 Tâches actives: {list(scan_tasks.keys())}")
 
-    background_tasks.add_task(perform_scan_task, task_id, paths_a, paths_b, max_depth)
+    # Un scan identique déjà en attente ou en cours est réutilisé au lieu d'en lancer un second
+    # Un scan profilé n'est jamais regroupé avec un scan ordinaire, qui ne rendrait pas de profil
+    key = job_key("scan", tab_id, paths_a=paths_a, paths_b=paths_b, max_depth=max_depth, **({"profile": True} if profile else {}))
+    args = (paths_a, paths_b, max_depth, tab.get("use_index", False), tab.get("scan_workers", 1), profile)
+    return queue_task(task_id, perform_scan_task, args, paths_a + paths_b, key, priority)
+
+@app.post("/api/scan/{tab_id}")
+def run_scan(tab_id: str, profile: bool = False):
+    """
+    Lance une analyse sur un onglet en arrière-plan.
+    Avec profile=true, le scan est profilé par échantillonnage (voir /api/scan/profile).
+    """
+    logger.info(f"🚀 Demande de scan pour l'onglet: {tab_id}")
     
-    return {"task_id": task_id}
+    tab = get_tab_or_404(tab_id)
+    
+    return {"task_id": start_scan(tab, profile=profile)}
 
 
 # --- Endpoint pour le Scan par dossier (nouveau) ---
 
-def perform_scan_folder_task(task_id: str, paths_a: list, paths_b: list, check_column: str, max_depth: int = -1):
+def perform_scan_folder_task(task_id: str, paths_a: list, paths_b: list, check_column: str, max_depth: int = -1, use_index: bool = False, workers: int = 1, profile: bool = False):
     """Effectue le scan de dossiers et met à jour l'état de la tâche."""
     logger.info(f"🔍 Début du scan par dossier pour la tâche {task_id} (colonne: {check_column})")
     logger.info(f"📁 Chemins A: {paths_a}")
@@ -258,30 +878,28 @@ def perform_scan_folder_task(task_id: str, paths_a: list, paths_b: list, check_c
     logger.info(f"🔢 Profondeur maximale: {max_depth if max_depth >= 0 else 'illimitée'}")
     
     try:
-        results, errors = analyze_hardlinks_by_folder(paths_a, paths_b, check_column, task_id, scan_tasks, max_depth)
-        scan_tasks[task_id]["status"] = "completed"
-        scan_tasks[task_id]["results"] = results
-        scan_tasks[task_id]["errors"] = errors
-        scan_tasks[task_id]["completed_at"] = time.time()
+        mtimes = root_mtimes(paths_a + paths_b)
+        results, errors, blob = run_scan_process(task_id, "folder", paths_a, paths_b, check_column, max_depth, use_index, workers, "Progression scan par dossier", profile)
+        record_file_count(task_id, paths_a, paths_b, max_depth)
+        complete_task(task_id, results, errors, blob=blob)
+        # Les orphelins du mode par dossier servent aussi à la suppression
+        remember_tab_results(scan_tasks[task_id].get("tab_id"), paths_a, paths_b, max_depth, task_id, mtimes, check_column)
+        pin_latest_results(task_id, paths_a, paths_b, max_depth, check_column, blob)
         
         logger.info(f"✅ Scan par dossier terminé pour la tâche {task_id}")
-        logger.info(f"📊 Résultats: {len(results.get('synced', []))} synchronisés, {len(results.get('orphans_a', []))} orphelins A, {len(results.get('orphans_b', []))} orphelins B")
+        logger.info(f"📊 Résultats: {len(results.get('synced', []))} synchronisés, {len(results.get('orphans_a', []))} orphelins A, {len(results.get('orphans_b', []))} orphelins B, {len(results.get('linked_outside', []))} liés hors des racines")
         if errors:
             logger.warning(f"⚠️ {len(errors)} erreurs rencontrées pendant le scan")
+    except ScanStopped as e:
+        stop_task(task_id, e.reason)
     except Exception as e:
         logger.error(f"❌ Erreur lors du scan par dossier de la tâche {task_id}: {str(e)}")
-        scan_tasks[task_id]["status"] = "error"
-        scan_tasks[task_id]["error"] = str(e)
-        scan_tasks[task_id]["completed_at"] = time.time()
-
-@app.post("/api/scan-folder/{tab_id}")
-def run_scan_folder(tab_id: str, background_tasks: BackgroundTasks):
-    config = load_config()
-    tab = next((t for t in config.get("tabs", []) if t.get("id") == tab_id), None)
-    
-    if not tab:
-        raise HTTPException(status_code=404, detail=f"L'onglet '{tab_id}' n'existe pas.")
+        fail_task(task_id, str(e))
+    record_scan_metrics(task_id, "folder")
 
+def start_scan_folder(tab: dict, priority: int = PRIORITY_INTERACTIVE, source: str = None, profile: bool = False) -> str:
+    """Met en file d'attente le scan par dossier d'un onglet, comme start_scan."""
+    tab_id = tab.get("id")
     paths_a = tab.get("paths_a", [])
     paths_b = tab.get("paths_b", [])
     check_column = tab.get("check_column", "a")
@@ -293,81 +911,380 @@ def run_scan_folder(tab_id: str, background_tasks: BackgroundTasks):
     if check_column not in ["a", "b", "both"]:
         raise HTTPException(status_code=400, detail="Le paramètre check_column doit être 'a', 'b' ou 'both'.")
 
+    live_id = create_live_task(tab_id, check_column)
+    if live_id:
+        return live_id
+
     task_id = str(uuid.uuid4())
-    total_files = count_files(paths_a, max_depth) + count_files(paths_b, max_depth)
+    total = initial_total(tab_id, paths_a, paths_b, max_depth)
     
     current_time = time.time()
-    scan_tasks[task_id] = {
+    register_task(task_id, {
         "status": "running",
         "progress": 0,
-        "total": total_files,
+        **total,
         "current_file": "",
         "results": None,
         "errors": None,
         "created_at": current_time,
-        "tab_id": tab_id
+        "tab_id": tab_id,
+        "stage": "queued",
+        "queue_position": None,
+        **({"source": source} if source else {})
+    })
+
+    key = job_key("scan-folder", tab_id, paths_a=paths_a, paths_b=paths_b, max_depth=max_depth, check_column=check_column, **({"profile": True} if profile else {}))
+    args = (paths_a, paths_b, check_column, max_depth, tab.get("use_index", False), tab.get("scan_workers", 1), profile)
+    return queue_task(task_id, perform_scan_folder_task, args, paths_a + paths_b, key, priority)
+
+@app.post("/api/scan-folder/{tab_id}")
+def run_scan_folder(tab_id: str, profile: bool = False):
+    tab = get_tab_or_404(tab_id)
+
+    return {"task_id": start_scan_folder(tab, profile=profile)}
+
+def run_scheduled_scan(tab: dict):
+    """Lance le scan planifié d'un onglet dans son mode, derrière les demandes de l'interface."""
+    start = start_scan_folder if tab.get("scan_mode") == "folder" else start_scan
+    task_id = start(tab, PRIORITY_BACKGROUND, source="schedule")
+    logger.info(f"🗓️ Scan planifié de l'onglet {tab.get('id')} en file d'attente (tâche {task_id})")
+
+# Scans planifiés des onglets ("schedule"), lancés par le leader
+scan_planner = ScanPlanner(task_store, on_due=run_scheduled_scan)
+
+@app.get("/api/tabs/{tab_id}/latest")
+def get_latest_results(tab_id: str):
+    """
+    Derniers résultats connus d'un onglet, à afficher dès son ouverture sans relancer de scan :
+    ceux de la surveillance si elle est active, sinon ceux du dernier scan terminé (planifié
+    ou non) s'ils correspondent encore aux chemins, à la profondeur et au mode de l'onglet.
+    """
+    tab = get_tab_or_404(tab_id)
+
+    check_column = tab_check_column(tab)
+    task_id = live_task_id(tab_id, check_column)
+    state = task_store.get(task_id) if task_id else None
+    if state is None:
+        task_id = latest_task_id(tab_id)
+        state = task_store.get(task_id)
+        key = _scan_key(tab.get("paths_a", []), tab.get("paths_b", []), tab.get("max_depth", -1))
+        if state is None or state.get("check_column") != check_column or state.get("key") != key:
+            raise HTTPException(status_code=404, detail="Aucun résultat récent pour cet onglet.")
+
+    schedule = task_store.get_tab_state(tab_id).get("schedule")
+    return {
+        "task_id": task_id,
+        "source": state.get("source", "manual"),
+        "completed_at": state["completed_at"],
+        "age_seconds": max(0, round(time.time() - state["completed_at"])),
+        "next_run": schedule["next_run"] if schedule and tab.get("schedule") else None,
     }
 
-    background_tasks.add_task(perform_scan_folder_task, task_id, paths_a, paths_b, check_column, max_depth)
-    
-    return {"task_id": task_id}
+@app.get("/api/metrics")
+def get_metrics():
+    """
+    Métriques au format texte de Prometheus. Compteurs et histogrammes sont ceux de tous
+    les workers (partagés par le magasin) ; les jauges "worker" portent le pid de chacun.
+    """
+    flush_metrics()
+    counts = task_store.count_tasks()
+    samples = list(task_store.read_metrics())
+    samples += [("linkarr_tasks", label_key({"status": status}), count) for status, count in counts["tasks"].items()]
+    samples += [("linkarr_jobs", label_key({"state": state}), count) for state, count in counts["jobs"].items()]
+    return Response(render(samples), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def get_task_or_404(task_id: str, with_results: bool = False) -> dict:
+    task = find_task(task_id, with_results)
+    if not task:
+        logger.error(f"❌ Tâche de scan non trouvée: {task_id}")
+        logger.error(f"🗂️ Tâches de ce worker: {list(scan_tasks.keys())}")
+        raise HTTPException(status_code=404, detail="Tâche de scan non trouvée.")
+    return task
+
+def task_status(task: dict) -> dict:
+    """
+    Vue légère d'une tâche : progression et état, sans résultats ni erreurs détaillées.
+    L'état d'une tâche lu depuis le magasin est déjà cette vue.
+    """
+    # Copie atomique : le thread du scan peut publier pendant la lecture
+    task = task.copy()
+    status = {key: value for key, value in task.items() if key not in TASK_PAYLOAD_KEYS}
+    if "errors" in task or "errors_count" not in status:
+        status["errors_count"] = len(task.get("errors") or [])
+    if "partial_results" in task or "has_partial_results" not in status:
+        status["has_partial_results"] = "partial_results" in task
+    return status
+
+def task_results_view(task: dict):
+    """
+    Retourne l'index des résultats d'une tâche d'analyse : celui construit à la fin
+    du scan, ou une vue non triée des résultats partiels pendant le scan.
+    Retourne None si la tâche n'a pas encore de résultats à servir.
+    """
+    if task.get("results_index") is not None:
+        return task["results_index"]
+    partial = task.get("partial_results")
+    if partial is not None:
+        return ResultsIndex(partial, indexed=False)
+    return None
 
 @app.get("/api/scan/status/{task_id}")
 def get_scan_status(task_id: str):
-    """Récupère l'état d'une tâche de scan."""
+    """Récupère l'état d'une tâche de scan (progression seulement, voir /api/scan/results)."""
     logger.debug(f"🔍 Demande de statut pour la tâche: {task_id}")
     logger.debug(f"🗂️ Tâches disponibles: {list(scan_tasks.keys())}")
     
-    task = scan_tasks.get(task_id)
-    if not task:
-        logger.error(f"❌ Tâche de scan non trouvée: {task_id}")
-        logger.error(f"🗂️ Tâches actuellement en mémoire: {list(scan_tasks.keys())}")
-        raise HTTPException(status_code=404, detail="Tâche de scan non trouvée.")
+    task = get_task_or_404(task_id)
     
     logger.debug(f"✅ Statut trouvé pour {task_id}: {task.get('status', 'unknown')} ({task.get('progress', 0)}/{task.get('total', 0)})")
-    return task
+    return task_status(task)
+
+@app.get("/api/scan/profile/{task_id}")
+def get_scan_profile(task_id: str):
+    """
+    Télécharge le profil d'un scan lancé avec profile=true, au format "piles repliées"
+    (flamegraph.pl, speedscope, inferno).
+    """
+    task = get_task_or_404(task_id, with_results=True)
+    profile = task.get("profile")
+    if not profile:
+        raise HTTPException(status_code=404, detail="Aucun profil pour cette tâche : lancez le scan avec profile=true et attendez sa fin.")
+    return Response(profile, media_type="text/plain; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="linkarr-scan-{task_id}.folded"'})
+
+def task_summary(task: dict):
+    """
+    Résumé des résultats d'une tâche, ou None s'ils ne sont pas encore disponibles.
+    Pour une suppression, son bilan sans la liste des fichiers.
+    """
+    if task.get("action") == "delete_orphans":
+        if task.get("results") is None:
+            return None
+        return {key: value for key, value in task["results"].items() if key != "deleted_files"}
+
+    view = task_results_view(task)
+    if view is None:
+        return None
+    return {
+        **view.summary(),
+        "partial": not view.indexed,
+        "errors": task.get("errors") or [],
+    }
+
+@app.get("/api/scan/results/{task_id}/summary")
+def get_scan_results_summary(task_id: str):
+    """
+    Résumé des résultats d'une tâche : nombre d'éléments et octets par catégorie,
+    dossiers synchronisés et erreurs. Pour une suppression, son bilan sans la liste des fichiers.
+    """
+    summary = task_summary(get_task_or_404(task_id, with_results=True))
+    if summary is None:
+        raise HTTPException(status_code=409, detail="Aucun résultat disponible pour cette tâche.")
+    return summary
+
+@app.get("/api/scan/results/{task_id}/folders")
+def get_scan_folders(task_id: str, column: str = "a", orphans_only: bool = False):
+    """
+    Compteurs et octets par dossier d'un scan par dossier, pour une colonne :
+    synchronisés, orphelins signalés, orphelins masqués, conflits et liés hors des racines.
+    """
+    if column not in ("a", "b"):
+        raise HTTPException(status_code=400, detail="Le paramètre column doit être 'a' ou 'b'.")
+    task = get_task_or_404(task_id, with_results=True)
+    results = task.get("results")
+    if results is None:
+        raise HTTPException(status_code=409, detail="Aucun résultat disponible pour cette tâche.")
+    folders = (results.get("folders") or {}).get(column.upper())
+    if folders is None:
+        raise HTTPException(status_code=404, detail="Pas de statistiques par dossier pour cette tâche (scan par fichier).")
+    if orphans_only:
+        folders = [folder for folder in folders if folder["counts"]["orphans"]]
+    return {"column": column.upper(), "folders": folders}
+
+@app.get("/api/scan/results/{task_id}/space")
+def get_scan_space(task_id: str, column: str = "a", by: str = "root"):
+    """
+    Espace des orphelins et des synchronisés d'une colonne, par racine ou par dossier :
+    fichiers et octets orphelins, octets synchronisés et octets réellement libérables
+    (chaque inode une seule fois). Calculé depuis les résultats, sans relire le disque.
+    """
+    if column not in ("a", "b"):
+        raise HTTPException(status_code=400, detail="Le paramètre column doit être 'a' ou 'b'.")
+    if by not in ("root", "folder"):
+        raise HTTPException(status_code=400, detail="Le paramètre by doit être 'root' ou 'folder'.")
+    task = get_task_or_404(task_id, with_results=True)
+    results = task.get("results")
+    if results is None or task.get("action") == "delete_orphans":
+        raise HTTPException(status_code=409, detail="Aucun résultat disponible pour cette tâche.")
+    if by == "root":
+        space = results.get("space")
+        if space is None:
+            raise HTTPException(status_code=404, detail="Pas de comptes par racine pour cette tâche : relancez le scan.")
+    else:
+        space = space_by_folder(results)
+    return {"column": column.upper(), "by": by, **space[column.upper()]}
+
+def format_event(event: str, data: dict) -> str:
+    """Formate un événement Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def task_events(task_id: str, request: Request):
+    """
+    Générateur du flux d'événements d'une tâche.
+
+    - "progress" : champs du statut qui ont changé depuis le dernier envoi (le premier
+      événement contient le statut complet), au plus un par PROGRESS_EVENT_INTERVAL ;
+    - "stage" : changement d'étape (scan_b, scan_a, classify, index, delete) ;
+    - "done" : état final (statut, erreur, nombre d'erreurs), puis fin du flux ; le client
+      charge ensuite le résumé par /api/scan/results/{task_id}/summary.
+    L'état est lu dans le pool de threads (il vient du magasin pour la tâche d'un autre
+    worker) : la boucle asyncio n'attend jamais SQLite ni la décompression des résultats.
+    """
+    sent = {}
+    stage = None
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        task = await run_in_threadpool(find_task, task_id)
+        if task is None:
+            yield format_event("done", {"status": "not_found", "error": "Tâche de scan non trouvée."})
+            return
+
+        if task.get("stage") != stage:
+            stage = task.get("stage")
+            yield format_event("stage", {"stage": stage})
+            last_sent = time.monotonic()
+
+        status = task_status(task)
+        delta = {key: value for key, value in status.items() if key != "stage" and sent.get(key) != value}
+        if delta:
+            sent.update(delta)
+            yield format_event("progress", delta)
+            last_sent = time.monotonic()
+
+        if status.get("status") != "running":
+            yield format_event("done", {
+                "status": status.get("status"),
+                "error": status.get("error"),
+                "errors_count": status.get("errors_count", 0),
+            })
+            return
+
+        if time.monotonic() - last_sent > EVENT_HEARTBEAT_SECONDS:
+            # Commentaire SSE : garde la connexion ouverte à travers les proxys
+            yield ": ping\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(PROGRESS_EVENT_INTERVAL)
+
+@app.get("/api/scan/events/{task_id}")
+async def stream_task_events(task_id: str, request: Request):
+    """
+    Flux Server-Sent Events de la progression d'une tâche (scan ou suppression).
+    Remplace le polling de /api/scan/status, qui reste disponible en repli.
+    """
+    get_task_or_404(task_id)
+    return StreamingResponse(
+        task_events(task_id, request),
+        media_type="text/event-stream",
+        # Désactive la mise en tampon de nginx pour que chaque événement parte immédiatement
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/scan/cancel/{task_id}")
+def cancel_scan(task_id: str):
+    """
+    Annule un scan en attente ou en cours : son processus est terminé, ce qui rend toute sa mémoire.
+    Le scan peut tourner dans un autre worker : la demande passe alors par le magasin
+    et il s'arrête à sa prochaine vérification (au plus une seconde).
+    """
+    task = get_task_or_404(task_id)
+    if task.get("status") != "running":
+        raise HTTPException(status_code=409, detail="La tâche n'est pas en cours.")
+    if task.get("action") == "delete_orphans":
+        raise HTTPException(status_code=409, detail="Une suppression en cours ne peut pas être annulée.")
+
+    logger.info(f"🛑 Annulation demandée pour la tâche {task_id}")
+    if job_scheduler.cancel(task_id):
+        # Encore en file d'attente dans ce worker : il n'y a rien à arrêter
+        stop_task(task_id, "cancelled")
+        return {"message": "Scan retiré de la file d'attente."}
+    task_store.request_cancel(task_id)
+    scan = scan_processes.get(task_id)
+    if scan is not None:
+        scan.stop("cancelled")
+    return {"message": "Annulation du scan demandée."}
+
+@app.get("/api/scan/results/{task_id}")
+def get_scan_results(task_id: str, category: str, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                     prefix: str = None, contains: str = None, sort: str = "path", order: str = "asc"):
+    """
+    Page de résultats d'une catégorie, par curseur.
+
+    Filtres : préfixe de chemin et sous-chaîne (insensible à la casse) ; tri par chemin
+    ou par taille, croissant ou décroissant. Pendant un scan, sert les résultats partiels
+    dans l'ordre du scan.
+    """
+    task = get_task_or_404(task_id, with_results=True)
+
+    if category not in RESULT_CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Le paramètre category doit être parmi: {', '.join(RESULT_CATEGORIES)}.")
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail="Le paramètre sort doit être 'path' ou 'size'.")
+    if order not in ["asc", "desc"]:
+        raise HTTPException(status_code=400, detail="Le paramètre order doit être 'asc' ou 'desc'.")
+    if cursor < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Le curseur doit être positif et la limite entre 1 et {MAX_PAGE_SIZE}.")
+
+    view = task_results_view(task)
+    if view is None:
+        raise HTTPException(status_code=409, detail="Aucun résultat disponible pour cette tâche.")
+    return view.page(category, cursor, limit, prefix, contains, sort, order == "desc")
 
 # --- Endpoints pour la suppression des orphelins ---
 
-def perform_delete_orphans_task(task_id: str, paths_a: list, paths_b: list, column: str, dry_run: bool, max_depth: int = -1):
+def perform_delete_orphans_task(task_id: str, paths_a: list, paths_b: list, column: str, dry_run: bool, max_depth: int = -1, use_index: bool = False, workers: int = 1, cached=None):
     """Effectue la suppression des orphelins et met à jour l'état de la tâche."""
     logger.info(f"🗑️ Début de la suppression des orphelins pour la tâche {task_id} (colonne: {column}, dry_run: {dry_run})")
     logger.info(f"📁 Chemins A: {paths_a}")
     logger.info(f"📁 Chemins B: {paths_b}")
     logger.info(f"🔢 Profondeur maximale: {max_depth if max_depth >= 0 else 'illimitée'}")
     
+    scan_results, scan_errors = cached if cached else (None, None)
     try:
-        results = delete_orphan_files(paths_a, paths_b, column, dry_run, task_id, scan_tasks, max_depth)
-        scan_tasks[task_id]["status"] = "completed"
-        scan_tasks[task_id]["results"] = results
-        scan_tasks[task_id]["completed_at"] = time.time()
+        with open_index(use_index) as index:
+            results = delete_orphan_files(paths_a, paths_b, column, dry_run, task_progress(task_id), max_depth, index, workers, scan_results, scan_errors)
+        if not dry_run:
+            # Les fichiers supprimés rendent les derniers résultats de l'onglet caducs
+            tab_id = scan_tasks[task_id].get("tab_id")
+            task_store.set_tab_state(tab_id, last_scan=None)
+            task_store.delete(latest_task_id(tab_id))
+        complete_task(task_id, results, index=False)
+        if not dry_run:
+            labels = {"tab": scan_tasks[task_id].get("tab_id") or ""}
+            metrics.inc("linkarr_deleted_files_total", labels, results.get("total_deleted", 0))
+            metrics.inc("linkarr_delete_errors_total", {**labels, "kind": "verify"}, results.get("verify_errors", 0))
+            metrics.inc("linkarr_delete_errors_total", {**labels, "kind": "unlink"}, results.get("unlink_errors", 0))
         
         action = "Simulation" if dry_run else "Suppression"
         logger.info(f"✅ {action} des orphelins terminée pour la tâche {task_id}")
         logger.info(f"📊 Résultats: {results.get('total_deleted', 0)} fichiers traités, {results.get('total_errors', 0)} erreurs")
     except Exception as e:
         logger.error(f"❌ Erreur lors de la suppression des orphelins de la tâche {task_id}: {str(e)}")
-        scan_tasks[task_id]["status"] = "error"
-        scan_tasks[task_id]["error"] = str(e)
-        scan_tasks[task_id]["completed_at"] = time.time()
+        fail_task(task_id, str(e))
 
 @app.get("/api/delete-orphans/{tab_id}")
 def preview_delete_orphans(tab_id: str, column: str = "b"):
     """
-    Prévisualise les fichiers orphelins qui seraient supprimés (mode dry-run).
+    Prévisualise les fichiers orphelins qui seraient supprimés (mode dry-run), depuis les
+    résultats du dernier scan encore frais de l'onglet (409 sinon) sans aucun appel
+    système : freed_bytes est l'espace réellement libéré. Les candidats sont revérifiés
+    par la suppression elle-même.
     """
     logger.info(f"🔍 Prévisualisation de la suppression des orphelins pour l'onglet: {tab_id} (colonne: {column})")
     
-    config = load_config()
-    tab = next((t for t in config.get("tabs", []) if t.get("id") == tab_id), None)
-
-    if not tab:
-        logger.error(f"❌ Onglet non trouvé: {tab_id}")
-        raise HTTPException(status_code=404, detail=f"L'onglet '{tab_id}' n'existe pas.")
+    tab = get_tab_or_404(tab_id)
     
     paths_a = tab.get("paths_a", [])
     paths_b = tab.get("paths_b", [])
-    max_depth = tab.get("max_depth", -1)
     
     logger.info(f"📁 Chemins A: {paths_a}")
     logger.info(f"📁 Chemins B: {paths_b}")
@@ -379,75 +1296,35 @@ def preview_delete_orphans(tab_id: str, column: str = "b"):
     if column not in ["a", "b", "both"]:
         raise HTTPException(status_code=400, detail="Le paramètre column doit être 'a', 'b' ou 'both'.")
 
+    # La prévisualisation ne scanne pas dans la requête : elle part du dernier scan de l'onglet
+    cached = fresh_tab_results(tab)
+    if cached is None:
+        raise HTTPException(status_code=409, detail="Aucun scan récent de l'onglet : lancez un scan avant de prévisualiser la suppression.")
+    scan_results, scan_errors = cached
+
     try:
-        # Effectuer d'abord un scan pour obtenir les orphelins
-        logger.info("🔍 Début du scan pour prévisualisation...")
-        scan_results, scan_errors = analyze_hardlinks(paths_a, paths_b, task_id=None, tasks_db=None, max_depth=max_depth)
-        
-        # Préparer la prévisualisation
-        orphans_to_delete = []
-        if column in ["a", "both"]:
-            orphans_to_delete.extend(scan_results.get("orphans_a", []))
-        if column in ["b", "both"]:
-            orphans_to_delete.extend(scan_results.get("orphans_b", []))
-        
-        # Créer la structure de réponse comme delete_orphan_files
-        preview_results = {
-            "deleted_files": [],
-            "errors": scan_errors.copy(),
-            "dry_run": True,
-            "total_deleted": 0,
-            "total_errors": len(scan_errors)
-        }
-        
-        # Simuler la suppression pour chaque fichier orphelin
-        for file_path in orphans_to_delete:
-            try:
-                if os.path.exists(file_path):
-                    preview_results["deleted_files"].append({
-                        "path": file_path,
-                        "size": os.path.getsize(file_path),
-                        "action": "would_delete"
-                    })
-                else:
-                    preview_results["errors"].append({
-                        "path": file_path,
-                        "error": "Fichier non trouvé"
-                    })
-            except Exception as e:
-                preview_results["errors"].append({
-                    "path": file_path,
-                    "error": str(e)
-                })
-        
-        preview_results["total_deleted"] = len(preview_results["deleted_files"])
-        preview_results["total_errors"] = len(preview_results["errors"]) - len(scan_errors)
+        preview_results = plan_orphan_deletion(scan_results, column, scan_errors)
         
         logger.info(f"✅ Prévisualisation terminée: {preview_results['total_deleted']} fichiers à supprimer, {preview_results['total_errors']} erreurs")
         return preview_results
         
     except Exception as e:
         logger.error(f"❌ Erreur lors de la prévisualisation: {str(e)}")
-        import traceback
         logger.error(f"❌ Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prévisualisation: {str(e)}")
 
 @app.post("/api/delete-orphans/{tab_id}")
-def delete_orphans(tab_id: str, background_tasks: BackgroundTasks, column: str = "b", confirm: bool = False):
+def delete_orphans(tab_id: str, column: str = "b", confirm: bool = False):
     """
-    Lance la suppression des fichiers orphelins en arrière-plan.
+    Lance la suppression des fichiers orphelins en arrière-plan, à partir du dernier scan
+    encore frais de l'onglet (409 sinon).
     """
     logger.info(f"🗑️ Demande de suppression des orphelins pour l'onglet: {tab_id} (colonne: {column}, confirm: {confirm})")
     
     if not confirm:
         raise HTTPException(status_code=400, detail="Le paramètre 'confirm=true' est requis pour confirmer la suppression.")
     
-    config = load_config()
-    tab = next((t for t in config.get("tabs", []) if t.get("id") == tab_id), None)
-
-    if not tab:
-        logger.error(f"❌ Onglet non trouvé: {tab_id}")
-        raise HTTPException(status_code=404, detail=f"L'onglet '{tab_id}' n'existe pas.")
+    tab = get_tab_or_404(tab_id)
     
     paths_a = tab.get("paths_a", [])
     paths_b = tab.get("paths_b", [])
@@ -460,27 +1337,39 @@ def delete_orphans(tab_id: str, background_tasks: BackgroundTasks, column: str =
     if column not in ["a", "b", "both"]:
         raise HTTPException(status_code=400, detail="Le paramètre column doit être 'a', 'b' ou 'both'.")
 
+    # Seuls les candidats d'un scan frais sont revérifiés : aucun parcours complet dans ce worker
+    cached = fresh_tab_results(tab)
+    if cached is None:
+        raise HTTPException(status_code=409, detail="Aucun scan récent de l'onglet : lancez un scan avant de supprimer les orphelins.")
+
     task_id = str(uuid.uuid4())
-    logger.info(f"📝 Comptage des fichiers pour la suppression, tâche {task_id}...")
-    total_files = count_files(paths_a, max_depth) + count_files(paths_b, max_depth)
-    logger.info(f"📊 Total de fichiers à analyser: {total_files}")
+    total = initial_total(tab_id, paths_a, paths_b, max_depth)
+    logger.info(f"📊 Total de fichiers annoncé: {total['total']} ({total['total_source']})")
     
     current_time = time.time()
-    scan_tasks[task_id] = {
+    register_task(task_id, {
         "status": "running",
         "progress": 0,
-        "total": total_files,
+        **total,
         "current_file": "",
         "results": None,
         "created_at": current_time,
         "tab_id": tab_id,
         "action": "delete_orphans",
-        "column": column
-    }
+        "column": column,
+        "stage": "queued",
+        "queue_position": None
+    })
     
-    logger.info(f"✨ Tâche de suppression {task_id} créée et ajoutée à scan_tasks")
+    logger.info(f"✨ Tâche de suppression {task_id} créée et enregistrée")
     logger.debug(f"🔍 Tâches actives: {list(scan_tasks.keys())}")
 
-    background_tasks.add_task(perform_delete_orphans_task, task_id, paths_a, paths_b, column, False, max_depth)
+    args = (paths_a, paths_b, column, False, max_depth, tab.get("use_index", False), tab.get("scan_workers", 1), cached)
+    queue_task(task_id, perform_delete_orphans_task, args, paths_a + paths_b)
     
-    return {"task_id": task_id, "message": f"Suppression des orphelins de la colonne {column} démarrée"}
\ No newline at end of file
+    return {"task_id": task_id, "message": f"Suppression des orphelins de la colonne {column} démarrée"}
+
+# Surveillances et scans planifiés, une fois tous les endpoints définis
+leader_timer = start_leader_timer()
+atexit.register(leader_timer.cancel)
+atexit.register(watch_manager.stop_all)
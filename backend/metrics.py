@@ -0,0 +1,148 @@
+# backend/metrics.py
+import json
+import sys
+import threading
+
+# Métriques exposées par /api/metrics : nom -> (type Prometheus, description)
+METRICS = {
+    "linkarr_scan_duration_seconds": ("histogram", "Durée des scans terminés, par onglet, mode et statut"),
+    "linkarr_scan_files_total": ("counter", "Fichiers parcourus par les scans terminés"),
+    "linkarr_scan_directories_total": ("counter", "Dossiers parcourus par les scans terminés"),
+    "linkarr_scan_files_per_second": ("gauge", "Débit en fichiers du dernier scan de l'onglet"),
+    "linkarr_scan_directories_per_second": ("gauge", "Débit en dossiers du dernier scan de l'onglet"),
+    "linkarr_scan_errors_total": ("counter", "Erreurs de listage ou de stat rencontrées par les scans"),
+    "linkarr_scan_results": ("gauge", "Éléments de chaque catégorie dans le dernier scan de l'onglet"),
+    "linkarr_scan_result_bytes": ("gauge", "Octets de chaque catégorie dans le dernier scan de l'onglet"),
+    "linkarr_deleted_files_total": ("counter", "Fichiers orphelins supprimés"),
+    "linkarr_delete_errors_total": ("counter", "Fichiers épargnés à la vérification ou en échec de suppression"),
+    "linkarr_tasks": ("gauge", "Tâches du magasin, par statut"),
+    "linkarr_jobs": ("gauge", "Jobs de la file d'attente, en attente ou en cours"),
+    "linkarr_worker_tasks": ("gauge", "Tâches gardées en mémoire par chaque worker"),
+    "linkarr_worker_results_bytes": ("gauge", "Mémoire estimée des résultats gardés par chaque worker"),
+    "linkarr_worker_rss_bytes": ("gauge", "Mémoire résidente de chaque worker"),
+    "linkarr_http_requests_total": ("counter", "Requêtes HTTP de l'API, par route et code de réponse"),
+    "linkarr_http_request_duration_seconds": ("histogram", "Durée des requêtes HTTP de l'API, par route"),
+}
+
+# Bornes des histogrammes, en secondes
+SCAN_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+HTTP_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Éléments mesurés par catégorie pour estimer la mémoire de résultats
+SIZE_SAMPLE = 100
+
+def label_key(labels: dict) -> str:
+    """Étiquettes d'une série sous forme canonique (clé du magasin)."""
+    return json.dumps(labels, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+class MetricsBuffer:
+    """
+    Compteurs et histogrammes d'un worker, accumulés en mémoire et versés dans le magasin
+    de tâches par flush() : une observation ne coûte qu'un verrou et quelques additions,
+    et toutes les séries sont partagées entre les workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.increments = {}
+        self.gauges = {}
+
+    def inc(self, name: str, labels: dict, amount: float = 1):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.increments[key] = self.increments.get(key, 0) + amount
+
+    def set(self, name: str, labels: dict, value: float):
+        """Jauge partagée par tous les workers (dernière valeur écrite)."""
+        with self.lock:
+            self.gauges[(name, label_key(labels))] = value
+
+    def observe(self, name: str, labels: dict, value: float, buckets: tuple):
+        """Ajoute une observation à un histogramme (compteurs de seaux cumulés, somme et nombre)."""
+        with self.lock:
+            # Les seaux non atteints sont incrémentés de 0 : chaque série existe dès la première observation
+            for bound in buckets + ("+Inf",):
+                key = (f"{name}_bucket", label_key({**labels, "le": str(bound)}))
+                self.increments[key] = self.increments.get(key, 0) + (1 if bound == "+Inf" or value <= bound else 0)
+            for suffix, amount in (("_sum", value), ("_count", 1)):
+                key = (f"{name}{suffix}", label_key(labels))
+                self.increments[key] = self.increments.get(key, 0) + amount
+
+    def flush(self, store):
+        with self.lock:
+            increments, self.increments = self.increments, {}
+            gauges, self.gauges = self.gauges, {}
+        try:
+            store.update_metrics(
+                [(name, labels, amount) for (name, labels), amount in increments.items()],
+                [(name, labels, value) for (name, labels), value in gauges.items()],
+            )
+        except Exception:
+            # Rien n'est perdu : les valeurs seront versées au prochain flush
+            with self.lock:
+                for key, amount in increments.items():
+                    self.increments[key] = self.increments.get(key, 0) + amount
+                for key, value in gauges.items():
+                    self.gauges.setdefault(key, value)
+            raise
+
+def estimate_results_bytes(results: dict) -> int:
+    """
+    Mémoire approximative des résultats d'une analyse : taille moyenne d'un échantillon
+    de chaque catégorie, multipliée par le nombre d'éléments.
+    """
+    if not results:
+        return 0
+    total = 0
+    for items in results.values():
+        if not isinstance(items, list) or not items:
+            continue
+        sample = items[:SIZE_SAMPLE]
+        total += sys.getsizeof(items) + sum(_deep_size(item) for item in sample) * len(items) // len(sample)
+    return total
+
+def _deep_size(value) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(item) for item in value.values())
+    elif isinstance(value, list):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(labels: str) -> str:
+    labels = json.loads(labels)
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def _family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in METRICS:
+            return name[: -len(suffix)]
+    return name
+
+def render(samples: list) -> str:
+    """Texte d'exposition Prometheus (version 0.0.4) des séries [(nom, étiquettes, valeur)]."""
+    families = {}
+    for name, labels, value in samples:
+        families.setdefault(_family(name), []).append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        # Seaux d'un histogramme dans l'ordre croissant de leur borne
+        def order(sample):
+            labels = json.loads(sample[1])
+            bound = labels.pop("le", None)
+            return (label_key(labels), sample[0], float(bound) if bound is not None else 0)
+        for name, labels, value in sorted(families[family], key=order):
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
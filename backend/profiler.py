@@ -0,0 +1,68 @@
+# backend/profiler.py
+import os
+import sys
+import threading
+from collections import Counter
+
+# Intervalle entre deux échantillons des piles d'appels (100 Hz)
+PROFILE_INTERVAL = 0.01
+
+# Profondeur maximale d'une pile échantillonnée (les appels les plus externes sont tronqués)
+PROFILE_MAX_DEPTH = 128
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage, sans dépendance : un thread relève toutes les
+    interval secondes la pile de chaque autre thread du processus et compte les piles
+    identiques. Le coût est à peu près fixe, quelle que soit la taille du scan.
+
+    folded() rend le résultat au format "piles repliées" (une ligne "f1;f2;f3 nombre"),
+    lu par flamegraph.pl, speedscope ou inferno.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    name = names.get(code)
+                    if name is None:
+                        name = names[code] = _frame_name(code)
+                    stack.append(name)
+                    frame = frame.f_back
+                stack.append(threads.get(thread_id, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
@@ -0,0 +1,200 @@
+# backend/progress.py
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal entre deux publications de la progression dans l'état de la tâche
+PUBLISH_INTERVAL = 0.5
+
+# Intervalle entre deux logs de progression
+LOG_INTERVAL = 10
+
+# Lissage des débits : poids de la dernière fenêtre de publication
+RATE_SMOOTHING = 0.3
+
+class ProgressReporter:
+    """
+    Suivi de progression d'une tâche, à coût quasi nul dans les boucles de scan.
+
+    Les compteurs (fichiers, octets, fichier courant, total) sont locaux au reporter :
+    le scanner les avance par lot, un dossier à la fois, sans toucher au dict de la tâche.
+    Un instantané n'est publié dans la tâche qu'au plus toutes les PUBLISH_INTERVAL
+    secondes, en un seul dict.update sous verrou : l'endpoint de statut ne voit jamais
+    un état à moitié écrit. L'instantané ajoute les débits (fichiers/s, octets/s,
+    lissés), une estimation du temps restant et la durée de chaque étape ("timings") :
+    temps écoulé, temps CPU du processus, fichiers et dossiers traités pendant l'étape.
+
+    Sans tâche (task=None), le reporter compte sans rien publier. on_publish(task) est
+    appelé après chaque publication, hors verrou (ex: écriture dans le magasin de tâches).
+    """
+
+    def __init__(self, task: dict = None, task_id: str = None, label: str = "Progression", interval: float = PUBLISH_INTERVAL, on_publish=None):
+        self.task = task
+        self.task_id = task_id
+        self.label = label
+        self.interval = interval
+        self.on_publish = on_publish
+        self.lock = threading.Lock()
+
+        self.files = 0
+        self.bytes = 0
+        self.current_file = ""
+        self.total = task.get("total", 0) if task else 0
+        self.total_source = task.get("total_source", "estimate") if task else "estimate"
+        self.files_per_second = 0.0
+        self.bytes_per_second = 0.0
+
+        # Étape en cours et mesures des étapes terminées
+        self.dirs = 0
+        self.stage = None
+        self.timings = {}
+        self.stage_started = (0.0, 0.0, 0, 0)
+
+        now = time.monotonic()
+        self.published_at = now
+        self.logged_at = now
+        self.published_files = 0
+        self.published_bytes = 0
+        if task is not None:
+            # Toutes les clés existent dès le départ : les publications ne changent plus la taille du dict
+            self.publish(force=True)
+
+    def advance(self, files: int = 1, size: int = 0, current_file: str = None, walk_stats: dict = None):
+        """
+        Compte des fichiers traités ; publie si l'intervalle est écoulé.
+        walk_stats (voir walk_tree) affine au passage l'estimation du total.
+        """
+        self.files += files
+        self.bytes += size
+        if current_file is not None:
+            self.current_file = current_file
+        if walk_stats is not None:
+            self.dirs = walk_stats.get("dirs_visited", self.dirs)
+            self.refine_total(walk_stats)
+        elif self.total < self.files:
+            self.total = self.files
+        now = time.monotonic()
+        if now - self.published_at >= self.interval:
+            self.publish(now=now)
+
+    def refine_total(self, walk_stats: dict):
+        """
+        Met à jour le total pendant le parcours.
+
+        Sans comptage préalable, le total vient soit du dernier scan connu de l'onglet
+        ("total_source": "last_scan"), soit d'une estimation affinée à chaque dossier :
+        fichiers vus + dossiers en attente x moyenne de fichiers par dossier.
+        """
+        if self.total_source == "estimate":
+            pending = walk_stats.get("dirs_pending", 0)
+            visited = walk_stats.get("dirs_visited", 1)
+            self.total = self.files + (pending * self.files) // visited
+        elif self.total < self.files:
+            self.total = self.files
+
+    def restart(self, total: int, stage: str = None):
+        """Repart de zéro pour une nouvelle phase au total connu (ex: la suppression)."""
+        if stage:
+            # L'étape précédente est mesurée avant la remise à zéro des compteurs
+            self.enter_stage(stage)
+        now = time.monotonic()
+        self.files = self.bytes = 0
+        self.published_files = self.published_bytes = 0
+        self.files_per_second = self.bytes_per_second = 0.0
+        self.current_file = ""
+        self.total = total
+        self.total_source = "exact"
+        self.published_at = now
+        # Les fichiers de la nouvelle étape se comptent depuis zéro
+        wall, cpu, _, dirs = self.stage_started
+        self.stage_started = (wall, cpu, 0, dirs)
+        fields = {"stage": stage} if stage else {}
+        self.publish(force=True, **fields)
+
+    def set(self, **fields):
+        """Publie immédiatement des champs de la tâche (étape, résultats partiels...)."""
+        self.publish(force=True, **fields)
+
+    def enter_stage(self, stage: str):
+        """Clôt la mesure de l'étape en cours et commence celle de stage (None : aucune)."""
+        if stage == self.stage:
+            return
+        if self.stage is not None:
+            self.timings = {**self.timings, self.stage: self.stage_timing()}
+        self.stage = stage
+        self.stage_started = (time.monotonic(), time.process_time(), self.files, self.dirs)
+
+    def stage_timing(self) -> dict:
+        """Mesures de l'étape en cours depuis son début."""
+        wall, cpu, files, dirs = self.stage_started
+        return {
+            "wall_seconds": round(time.monotonic() - wall, 3),
+            "cpu_seconds": round(time.process_time() - cpu, 3),
+            "files": self.files - files,
+            "directories": self.dirs - dirs,
+        }
+
+    def finish(self):
+        """Clôt la dernière étape et publie les mesures définitives."""
+        self.enter_stage(None)
+        self.publish(force=True)
+
+    def discard(self, key: str):
+        """Retire un champ de la tâche."""
+        if self.task is not None:
+            with self.lock:
+                self.task.pop(key, None)
+            if self.on_publish is not None:
+                self.on_publish(self.task)
+
+    def eta_seconds(self):
+        """Temps restant estimé au débit actuel, ou None s'il n'est pas calculable."""
+        if self.files_per_second <= 0 or self.total <= self.files:
+            return None
+        return round((self.total - self.files) / self.files_per_second)
+
+    def snapshot(self) -> dict:
+        return {
+            "progress": self.files,
+            "total": self.total,
+            "total_source": self.total_source,
+            "current_file": self.current_file,
+            "bytes_processed": self.bytes,
+            "files_per_second": round(self.files_per_second, 1),
+            "bytes_per_second": round(self.bytes_per_second),
+            "eta_seconds": self.eta_seconds(),
+            # Nouveau dict à chaque instantané : la tâche publiée n'est jamais modifiée en place
+            "timings": {**self.timings, self.stage: self.stage_timing()} if self.stage else self.timings,
+        }
+
+    def publish(self, force: bool = False, now: float = None, **fields):
+        """Recalcule les débits et écrit l'instantané dans la tâche."""
+        if "stage" in fields:
+            self.enter_stage(fields["stage"])
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.published_at
+        if elapsed > 0 and self.files > self.published_files:
+            files_rate = (self.files - self.published_files) / elapsed
+            bytes_rate = (self.bytes - self.published_bytes) / elapsed
+            if self.files_per_second:
+                files_rate = RATE_SMOOTHING * files_rate + (1 - RATE_SMOOTHING) * self.files_per_second
+                bytes_rate = RATE_SMOOTHING * bytes_rate + (1 - RATE_SMOOTHING) * self.bytes_per_second
+            self.files_per_second, self.bytes_per_second = files_rate, bytes_rate
+        if elapsed > 0 or force:
+            self.published_at = now
+            self.published_files = self.files
+            self.published_bytes = self.bytes
+
+        if self.task is not None:
+            snapshot = self.snapshot()
+            snapshot.update(fields)
+            with self.lock:
+                self.task.update(snapshot)
+            if self.on_publish is not None:
+                self.on_publish(self.task)
+
+        if now - self.logged_at >= LOG_INTERVAL:
+            self.logged_at = now
+            logger.info(f"📊 {self.label}: {self.files} fichiers traités ({self.files_per_second:.0f} fichiers/s)...")
@@ -0,0 +1,117 @@
+# backend/results_index.py
+from array import array
+from scanner import RESULT_CATEGORIES
+
+# Tris proposés par l'API de résultats
+SORT_FIELDS = ("path", "size")
+
+# Taille de page par défaut et maximale
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 5000
+
+def item_paths(category: str, item) -> list[str]:
+    """Chemins d'un élément de résultat, quelle que soit sa catégorie."""
+    if category == "synced":
+        return [item["path_a"], item["path_b"]]
+    if category == "conflicts":
+        return item["paths_a"] + item["paths_b"]
+    if category == "linked_outside":
+        return item["paths"]
+    return [item]
+
+def _matches(paths: list[str], prefix: str, contains: str) -> bool:
+    """Un élément correspond si l'un de ses chemins passe les deux filtres."""
+    for path in paths:
+        if prefix and not path.startswith(prefix):
+            continue
+        if contains and contains not in path.lower():
+            continue
+        return True
+    return False
+
+class ResultsIndex:
+    """
+    Index de pagination des résultats d'une analyse.
+
+    Construit une seule fois quand le scan se termine : pour chaque catégorie, l'ordre
+    des éléments par chemin et par taille est précalculé dans des tableaux de positions.
+    Chaque page est ensuite lue par curseur (position dans cet ordre) sans retrier ni
+    recopier les résultats.
+
+    Avec indexed=False, l'ordre est celui du scan et se recalcule à chaque page : c'est
+    la vue des résultats partiels d'une tâche en cours, dont les listes grandissent encore.
+    """
+
+    def __init__(self, results: dict, indexed: bool = True):
+        self.results = results
+        self.indexed = indexed
+        self.orders = {}
+        if indexed:
+            for category in RESULT_CATEGORIES:
+                items = results.get(category) or []
+                sizes = self._sizes(category)
+                first_path = lambda i: item_paths(category, items[i])[0]
+                self.orders[(category, "path")] = array("I", sorted(range(len(items)), key=first_path))
+                self.orders[(category, "size")] = array("I", sorted(range(len(items)), key=sizes.__getitem__))
+
+    def _sizes(self, category: str) -> list:
+        items = self.results.get(category) or []
+        sizes = (self.results.get("sizes") or {}).get(category)
+        return sizes if sizes is not None and len(sizes) == len(items) else [0] * len(items)
+
+    def _order(self, category: str, sort: str):
+        if self.indexed:
+            return self.orders[(category, sort)]
+        return range(len(self.results.get(category) or []))
+
+    def summary(self) -> dict:
+        """Nombre d'éléments et octets par catégorie, sans les listes elles-mêmes."""
+        summary = {
+            "counts": {category: len(self.results.get(category) or []) for category in RESULT_CATEGORIES},
+            "bytes": {category: sum(self._sizes(category)) for category in RESULT_CATEGORIES},
+        }
+        for key in ("synced_folders", "space", "stats"):
+            if key in self.results:
+                summary[key] = self.results[key]
+        return summary
+
+    def page(self, category: str, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE, prefix: str = None,
+             contains: str = None, sort: str = "path", descending: bool = False) -> dict:
+        """
+        Retourne une page d'une catégorie.
+
+        Le curseur est une position dans l'ordre demandé ; next_cursor vaut None quand la
+        catégorie est épuisée. Les filtres (préfixe de chemin, sous-chaîne insensible à la
+        casse) sont appliqués pendant la lecture : une page filtrée peut donc être courte.
+        """
+        items = self.results.get(category) or []
+        sizes = self._sizes(category)
+        order = self._order(category, sort)
+        contains = contains.lower() if contains else None
+        total = len(order)
+
+        # Espace alloué et mtimes, gardés par le scan avec SCAN_FILE_DETAILS
+        details = {key: self.results[key][category] for key in ("allocated", "mtimes") if key in self.results}
+        page_items, page_sizes, page_positions = [], [], []
+        position = cursor
+        while position < total and len(page_items) < limit:
+            index = order[total - 1 - position] if descending else order[position]
+            position += 1
+            item = items[index]
+            if (prefix or contains) and not _matches(item_paths(category, item), prefix, contains):
+                continue
+            page_items.append(item)
+            page_sizes.append(sizes[index])
+            page_positions.append(index)
+
+        page = {
+            "category": category,
+            "items": page_items,
+            "sizes": page_sizes,
+            "total": total,
+            "next_cursor": position if position < total else None,
+        }
+        for key, values in details.items():
+            if len(values) == len(items):
+                page[key] = [values[index] for index in page_positions]
+        return page
@@ -0,0 +1,196 @@
+# backend/scan_process.py
+import sys
+import time
+import logging
+import multiprocessing
+from contextlib import nullcontext
+from progress import ProgressReporter
+from task_store import pack, unpack
+
+logger = logging.getLogger(__name__)
+
+# "spawn" : le processus de scan repart d'un interpréteur neuf, sans hériter des threads
+# (surveillances, serveur) ni de la mémoire du worker de l'API
+CONTEXT = multiprocessing.get_context("spawn")
+
+# Intervalle minimal entre deux envois des résultats partiels au worker
+PARTIAL_RESULTS_INTERVAL = 5
+
+# Intervalle de vérification d'une demande d'annulation pendant l'attente de messages
+STOP_POLL_SECONDS = 1
+
+# Délai laissé au processus après SIGTERM avant SIGKILL
+TERMINATE_GRACE_SECONDS = 5
+
+def partial_delta(partial: dict, sent: dict) -> dict:
+    """
+    Éléments ajoutés aux listes de partial (dicts de listes imbriqués, voir
+    scanner._new_results) depuis le dernier appel ; sent garde la longueur déjà
+    envoyée de chaque liste. Les listes des résultats partiels ne font que grandir.
+    """
+    delta = {}
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            delta[key] = partial_delta(value, sent.setdefault(key, {}))
+        else:
+            start = sent.get(key, 0)
+            delta[key] = value[start:]
+            sent[key] = len(value)
+    return delta
+
+def merge_partial(partial: dict, delta: dict):
+    """
+    Ajoute un envoi de partial_delta aux résultats partiels reçus jusque-là. Les listes
+    alignées (sizes...) sont complétées avant les catégories : un lecteur concurrent voit
+    au pire des tailles pas encore alignées, que ResultsIndex remplace par des zéros.
+    """
+    for key, value in sorted(delta.items(), key=lambda item: not isinstance(item[1], dict)):
+        if isinstance(value, dict):
+            merge_partial(partial.setdefault(key, {}), value)
+        else:
+            partial.setdefault(key, []).extend(value)
+
+class ScanStopped(Exception):
+    """Le scan a été arrêté avant la fin ; reason vaut "cancelled" ou "timeout"."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+def _scan_main(conn, mode: str, paths_a: list, paths_b: list, check_column: str, max_depth: int, use_index: bool, workers: int, task: dict, label: str, profile: bool = False):
+    """
+    Point d'entrée du processus de scan.
+
+    La progression est envoyée au worker à chaque publication du reporter, les éléments
+    ajoutés aux résultats partiels au plus toutes les PARTIAL_RESULTS_INTERVAL secondes
+    (jamais les listes entières), et les résultats finaux en une fois, en JSON compact compressé (voir task_store.pack). Avec profile,
+    le scan est échantillonné par SamplingProfiler et les piles repliées sont jointes
+    aux résultats ("profile").
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    from scanner import analyze_hardlinks, analyze_hardlinks_by_folder
+    from inode_index import InodeIndex
+    from profiler import SamplingProfiler
+
+    partial_sent_at = [0.0]
+    partial_sent = {}
+
+    def forward(task: dict):
+        fields = {key: value for key, value in task.items() if key != "partial_results"}
+        partial = task.get("partial_results")
+        conn.send(("progress", fields, partial is not None))
+        if partial is not None and time.monotonic() - partial_sent_at[0] >= PARTIAL_RESULTS_INTERVAL:
+            partial_sent_at[0] = time.monotonic()
+            conn.send(("partial", pack(partial_delta(partial, partial_sent))))
+
+    try:
+        progress = ProgressReporter(task, label=label, on_publish=forward)
+        profiler = SamplingProfiler() if profile else None
+        with profiler or nullcontext(), InodeIndex() if use_index else nullcontext() as index:
+            if mode == "folder":
+                results, errors = analyze_hardlinks_by_folder(paths_a, paths_b, check_column, progress, max_depth, index, workers)
+            else:
+                results, errors = analyze_hardlinks(paths_a, paths_b, progress, max_depth, index, workers)
+            progress.set(stage="serialize")
+            payload = {"results": results, "errors": errors}
+            if profiler is not None:
+                # L'échantillonnage s'arrête ici : la sérialisation des piles n'y figure pas
+                profiler.stop()
+                payload["profile"] = profiler.folded()
+                progress.set(profile_samples=profiler.samples)
+            blob = pack(payload)
+        progress.finish()
+        conn.send(("done", blob))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+class ScanProcess:
+    """
+    Scan exécuté dans un processus dédié.
+
+    Le parcours en Python pur garde le GIL : dans un processus à part, il ne ralentit
+    plus les autres requêtes du worker. L'annulation termine le processus, ce qui rend
+    aussitôt toute sa mémoire (map d'inodes, résultats intermédiaires).
+    """
+
+    def __init__(self, mode: str, paths_a: list, paths_b: list, check_column: str = None, max_depth: int = -1,
+                 use_index: bool = False, workers: int = 1, task: dict = None, label: str = "Progression", profile: bool = False):
+        self.stop_reason = None
+        self.profile = None
+        self.conn, child_conn = CONTEXT.Pipe(duplex=False)
+        self.process = CONTEXT.Process(
+            target=_scan_main,
+            args=(child_conn, mode, paths_a, paths_b, check_column, max_depth, use_index, workers, task or {}, label, profile),
+            name="linkarr-scan",
+            daemon=True,
+        )
+        self.process.start()
+        # Le worker ne garde que son bout du tube : la fin du processus ferme le tube
+        child_conn.close()
+
+    def stop(self, reason: str = "cancelled"):
+        """Termine le processus (SIGTERM, puis SIGKILL s'il ne s'arrête pas)."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        if self.process.is_alive():
+            logger.info(f"🛑 Arrêt du processus de scan {self.process.pid} ({reason})")
+            self.process.terminate()
+            self.process.join(TERMINATE_GRACE_SECONDS)
+            if self.process.is_alive():
+                self.process.kill()
+
+    def run(self, on_progress=None, on_partial=None, should_stop=None):
+        """
+        Relaie les messages du processus jusqu'à la fin du scan.
+
+        on_progress(champs, has_partial) reçoit chaque publication de progression,
+        on_partial(delta, blob) les éléments ajoutés aux résultats partiels depuis l'envoi
+        précédent, à cumuler avec merge_partial (blob : le même delta passé par pack()) ; should_stop() est appelé toutes les
+        STOP_POLL_SECONDS et arrête le scan s'il retourne une raison.
+
+        Retourne (results, errors, blob), blob étant le contenu déjà compressé ; le profil
+        éventuel est gardé dans self.profile.
+        Lève ScanStopped si le scan a été arrêté, RuntimeError s'il a échoué.
+        """
+        checked_at = time.monotonic()
+        try:
+            while True:
+                ready = self.conn.poll(STOP_POLL_SECONDS)
+                if should_stop is not None and time.monotonic() - checked_at >= STOP_POLL_SECONDS:
+                    checked_at = time.monotonic()
+                    reason = should_stop()
+                    if reason:
+                        self.stop(reason)
+                        continue
+                if not ready:
+                    if not self.process.is_alive() and not self.conn.poll():
+                        raise EOFError
+                    continue
+                message = self.conn.recv()
+                if message[0] == "progress" and on_progress is not None:
+                    on_progress(message[1], message[2])
+                elif message[0] == "partial" and on_partial is not None:
+                    on_partial(unpack(message[1]), message[1])
+                elif message[0] == "done":
+                    payload = unpack(message[1])
+                    self.profile = payload.get("profile")
+                    return payload["results"], payload["errors"], message[1]
+                elif message[0] == "error":
+                    raise RuntimeError(message[1])
+        except (EOFError, OSError):
+            if self.stop_reason:
+                raise ScanStopped(self.stop_reason)
+            self.process.join(TERMINATE_GRACE_SECONDS)
+            raise RuntimeError(f"Le processus de scan s'est arrêté de façon inattendue (code {self.process.exitcode})")
+        finally:
+            self.conn.close()
+            self.process.join(TERMINATE_GRACE_SECONDS)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
@@ -0,0 +1,175 @@
+# backend/scan_schedule.py
+import re
+import time
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Intervalle : un nombre suivi d'une unité, par exemple "30m", "6h" ou "1d"
+INTERVAL_PATTERN = re.compile(r"^\s*(\d+)\s*([smhd])\s*$")
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# En dessous, un scan planifié n'a pas le temps de finir avant le suivant
+MIN_INTERVAL_SECONDS = 300
+
+# Raccourcis cron acceptés
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# Bornes des champs cron : minute, heure, jour du mois, mois, jour de la semaine (0 et 7 = dimanche)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Recherche de la prochaine échéance limitée à quatre ans (cas du 29 février)
+CRON_SEARCH_DAYS = 4 * 366
+
+class ScheduleError(ValueError):
+    """Planification invalide ; le message est destiné à l'utilisateur."""
+
+def _parse_cron_field(field: str, low: int, high: int) -> set:
+    values = set()
+    for part in field.split(","):
+        expr, _, step = part.partition("/")
+        if step and not step.isdigit() or step == "0":
+            raise ScheduleError(f"Pas invalide dans '{part}'.")
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start, _, end = expr.partition("-")
+            if not start.isdigit() or not end.isdigit():
+                raise ScheduleError(f"Plage invalide : '{part}'.")
+            start, end = int(start), int(end)
+        elif expr.isdigit():
+            start = int(expr)
+            end = high if step else start
+        else:
+            raise ScheduleError(f"Valeur invalide : '{part}'.")
+        if start < low or end > high or start > end:
+            raise ScheduleError(f"'{part}' sort des bornes {low}-{high}.")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+class IntervalSchedule:
+    """Un scan toutes les seconds secondes, compté depuis le précédent."""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+
+    def next_run(self, after: float) -> float:
+        return after + self.seconds
+
+class CronSchedule:
+    """Expression cron à 5 champs, évaluée à l'heure locale du conteneur (variable TZ)."""
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ScheduleError("Une expression cron doit avoir 5 champs : minute heure jour mois jour-de-semaine.")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Comme cron : si le jour du mois et le jour de la semaine sont tous deux restreints, l'un ou l'autre suffit
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_run(self, after: float) -> float:
+        moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=CRON_SEARCH_DAYS)
+        # On saute mois, jours et heures entiers qui ne conviennent pas
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ScheduleError("Cette expression cron ne correspond à aucune date.")
+
+def parse_schedule(expr: str):
+    """
+    Retourne la planification décrite par expr : un intervalle ("30m", "6h", "1d") ou
+    une expression cron ("0 3 * * *", "@daily"). Lève ScheduleError si elle est invalide.
+    """
+    expr = expr.strip()
+    match = INTERVAL_PATTERN.match(expr)
+    if match:
+        seconds = int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+        if seconds < MIN_INTERVAL_SECONDS:
+            raise ScheduleError(f"L'intervalle minimal entre deux scans planifiés est de {MIN_INTERVAL_SECONDS // 60} minutes.")
+        return IntervalSchedule(seconds)
+    schedule = CronSchedule(CRON_ALIASES.get(expr, expr))
+    # Rejette dès maintenant une expression qui ne se déclenche jamais (ex. 31 février)
+    schedule.next_run(time.time())
+    return schedule
+
+class ScanPlanner:
+    """
+    Déclenche les scans planifiés des onglets qui ont un champ "schedule".
+
+    La prochaine échéance de chaque onglet est gardée dans l'état de l'onglet du magasin,
+    donc partagée entre les workers et conservée après un redémarrage : une échéance
+    manquée pendant un arrêt déclenche un seul scan à la reprise. on_due(tab) lance le scan.
+    """
+
+    def __init__(self, store, on_due):
+        self.store = store
+        self.on_due = on_due
+        self.tabs = []
+
+    def sync(self, tabs: list):
+        """Retient les onglets planifiés de la configuration et oublie les planifications retirées."""
+        self.tabs = []
+        for tab in tabs:
+            expr = tab.get("schedule")
+            if not expr:
+                if self.store.get_tab_state(tab["id"]).get("schedule") is not None:
+                    self.store.set_tab_state(tab["id"], schedule=None)
+                continue
+            try:
+                parse_schedule(expr)
+            except ScheduleError as e:
+                logger.error(f"❌ Planification ignorée pour l'onglet {tab['id']} ('{expr}'): {e}")
+                continue
+            self.tabs.append(tab)
+
+    def tick(self, now: float = None):
+        """Lance les scans arrivés à échéance et calcule leur échéance suivante."""
+        now = time.time() if now is None else now
+        for tab in self.tabs:
+            tab_id = tab["id"]
+            expr = tab["schedule"]
+            state = self.store.get_tab_state(tab_id).get("schedule")
+            schedule = parse_schedule(expr)
+            if state is None or state["expr"] != expr:
+                # Nouvelle planification : la première échéance part de maintenant
+                next_run = schedule.next_run(now)
+                self.store.set_tab_state(tab_id, schedule={"expr": expr, "next_run": next_run, "last_run": None})
+                logger.info(f"🗓️ Onglet {tab_id} planifié ('{expr}'), prochain scan le {datetime.fromtimestamp(next_run):%Y-%m-%d %H:%M}")
+                continue
+            if now < state["next_run"]:
+                continue
+            # L'échéance est avancée avant le lancement : un scan qui échoue n'est pas relancé en boucle
+            next_run = schedule.next_run(now)
+            self.store.set_tab_state(tab_id, schedule={"expr": expr, "next_run": next_run, "last_run": now})
+            logger.info(f"🗓️ Scan planifié de l'onglet {tab_id}, prochain le {datetime.fromtimestamp(next_run):%Y-%m-%d %H:%M}")
+            try:
+                self.on_due(tab)
+            except Exception as e:
+                logger.error(f"❌ Scan planifié de l'onglet {tab_id} impossible: {e}")
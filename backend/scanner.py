@@ -1,283 +1,880 @@
 # backend/scanner.py
 import os
+import re
+import stat
+import time
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from inode_map import InodeMap, COLUMNS, format_bytes
+from progress import ProgressReporter
+from deleter import delete_files, prune_empty_directories
 
 logger = logging.getLogger(__name__)
 
+# Listages simultanés au plus sur un même disque rotatif (les SSD et partages réseau
+# utilisent tous les threads de scan de l'onglet)
+HDD_WORKERS = int(os.getenv("HDD_WORKERS", "1"))
+
+# Catégories de résultats d'une analyse ; results["sizes"][catégorie] donne la taille
+# de chaque élément, dans le même ordre que results[catégorie]
+RESULT_CATEGORIES = ("synced", "orphans_a", "orphans_b", "conflicts", "linked_outside")
+
+# Catégories d'orphelins ; results["reclaimable"][catégorie] donne, dans le même ordre,
+# les octets libérés par l'élément : la taille de l'inode sur son premier lien, 0 sur les
+# suivants (l'inode n'est libéré qu'avec son dernier lien)
+ORPHAN_CATEGORIES = ("orphans_a", "orphans_b")
+
+# Garder aussi l'espace alloué (st_blocks) et le mtime de chaque élément, dans
+# results["allocated"] et results["mtimes"] : lus du même stat, mais plus de mémoire
+SCAN_FILE_DETAILS = os.getenv("SCAN_FILE_DETAILS", "false").lower() == "true"
+
+# Compteurs par dossier du mode par dossier (results["folders"]) ; "hidden" compte les
+# orphelins masqués parce que leur dossier contient un fichier synchronisé
+FOLDER_CATEGORIES = ("synced", "orphans", "hidden", "conflicts", "linked_outside")
+
+class CrossDeviceError(Exception):
+    """Les colonnes A et B ne partagent aucun périphérique : aucun hardlink n'est possible."""
+
+def _read_mount_points() -> set[str] | None:
+    """
+    Retourne l'ensemble des points de montage connus du noyau.
+
+    Un dossier ne peut changer de st_dev que s'il est lui-même un point de montage :
+    connaître cette liste évite de faire un stat sur chaque sous-dossier.
+    Retourne None si /proc n'est pas disponible (on stat alors chaque dossier).
+    """
+    try:
+        with open("/proc/self/mountinfo", "r", encoding="utf-8") as f:
+            # Le 5e champ est le point de montage, avec les espaces encodés en octal (\040)
+            return {
+                re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), line.split(" ")[4])
+                for line in f if line.strip()
+            }
+    except (OSError, IndexError):
+        return None
+
+def _list_directory(dirpath: str, dev: int, mount_points: set[str] | None, with_stat: bool = False, errors: list = None):
+    """
+    Liste un dossier avec os.scandir et sépare fichiers et sous-dossiers.
+
+    L'inode vient directement de readdir (DirEntry.inode()) et le type du d_type :
+    aucun stat n'est fait pour un fichier ordinaire, sauf si with_stat est demandé
+    (nlink, taille...). Le dossier est ouvert par descripteur, donc les stat éventuels
+    sont des fstatat relatifs au lieu d'une résolution complète du chemin.
+    Une entrée illisible (lien symbolique en boucle, accès refusé...) est consignée dans
+    errors sans interrompre le listage du dossier.
+
+    Retourne (fichiers, sous_dossiers) :
+    - fichiers : liste de (nom, st_dev, st_ino, stat ou None)
+    - sous_dossiers : liste de (chemin, st_dev)
+    """
+    files = []
+    subdirs = []
+    use_fd = os.scandir in os.supports_fd
+    fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY) if use_fd else None
+    try:
+        with os.scandir(fd if use_fd else dirpath) as it:
+            for entry in it:
+                name = entry.name
+                try:
+                    # Comme os.walk : les liens vers des dossiers sont des dossiers, mais on n'y descend pas
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            sub_path = os.path.join(dirpath, name)
+                            sub_dev = dev
+                            if mount_points is None or sub_path in mount_points:
+                                sub_dev = entry.stat(follow_symlinks=False).st_dev
+                            subdirs.append((sub_path, sub_dev))
+                        continue
+                    if entry.is_symlink():
+                        # Un lien symbolique désigne l'inode de sa cible (comportement de os.stat)
+                        st = entry.stat()
+                        files.append((name, st.st_dev, st.st_ino, st))
+                    elif with_stat:
+                        st = entry.stat(follow_symlinks=False)
+                        files.append((name, st.st_dev, st.st_ino, st))
+                    else:
+                        files.append((name, dev, entry.inode(), None))
+                except FileNotFoundError:
+                    # Le fichier a peut-être été supprimé pendant le scan
+                    logger.debug(f"⚠️ Fichier non trouvé pendant le scan: {os.path.join(dirpath, name)}")
+                except OSError as e:
+                    filepath = os.path.join(dirpath, name)
+                    logger.warning(f"❌ Erreur lors du traitement du fichier {filepath}: {str(e)}")
+                    if errors is not None:
+                        errors.append({"path": filepath, "error": str(e)})
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return files, subdirs
+
+def _visit_directory(dirpath: str, dev: int, mounts: set[str] | None, with_stat: bool, index, errors: list):
+    """
+    Liste un dossier de la file de parcours et retourne (fichiers, sous_dossiers).
+    Les erreurs par fichier sont ajoutées à errors. Peut être appelé depuis un thread du pool.
+    """
+    if index is not None:
+        # Le mtime du dossier dit si son listage mémorisé est encore valable
+        dir_stat = os.stat(dirpath)
+        listing = index.get_directory(dirpath, dir_stat)
+        if listing is None:
+            file_errors = []
+            listing = _list_directory(dirpath, dir_stat.st_dev, mounts, True, file_errors)
+            # Un listage incomplet n'est pas mémorisé : ses erreurs reviendront au prochain scan
+            if not file_errors:
+                index.put_directory(dirpath, dir_stat, *listing)
+            errors.extend(file_errors)
+        return listing
+    return _list_directory(dirpath, dev, mounts, with_stat, errors)
+
+def _record_walk_error(dirpath: str, is_root: bool, error: Exception, errors: list):
+    """Consigne l'échec du listage d'un dossier."""
+    if isinstance(error, FileNotFoundError):
+        if is_root:
+            logger.error(f"❌ Dossier non trouvé: {dirpath}")
+            errors.append({"path": dirpath, "error": "Le dossier n'existe pas."})
+        else:
+            logger.debug(f"⚠️ Dossier disparu pendant le scan: {dirpath}")
+        return
+    logger.error(f"❌ Erreur lors du scan du dossier {dirpath}: {str(error)}")
+    errors.append({"path": dirpath, "error": str(error)})
+
+def _is_rotational(dev: int) -> bool | None:
+    """
+    Indique si le périphérique bloc derrière st_dev est un disque rotatif.
+    Retourne None s'il n'y a pas de périphérique bloc (NFS, FUSE/mergerfs, tmpfs...).
+    """
+    if os.major(dev) == 0:
+        return None
+    sys_path = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    # Une partition n'a pas de dossier queue : il est porté par le disque parent
+    for candidate in (sys_path, os.path.dirname(sys_path)):
+        try:
+            with open(os.path.join(candidate, "queue", "rotational"), "r") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+def device_concurrency(dev: int, workers: int, hdd_workers: int = HDD_WORKERS) -> int:
+    """Nombre de dossiers listés en même temps sur un périphérique donné."""
+    if _is_rotational(dev):
+        # Plusieurs lectures concurrentes font voyager la tête de lecture d'un disque à l'autre bout
+        return max(1, min(workers, hdd_workers))
+    return workers
+
+def check_devices(paths_a: list[str], paths_b: list[str]):
+    """
+    Vérifie qu'un hardlink est possible entre les colonnes avant de les parcourir.
+
+    Un hardlink ne traverse pas les systèmes de fichiers : si aucune racine A ne partage
+    son st_dev avec une racine B, tous les fichiers seraient orphelins.
+    Les racines absentes sont ignorées ici et signalées par le parcours.
+    """
+    devices = {}
+    for column, paths in (("A", paths_a), ("B", paths_b)):
+        devices[column] = set()
+        for path in paths:
+            try:
+                devices[column].add(os.stat(path).st_dev)
+            except OSError:
+                continue
+
+    if devices["A"] and devices["B"] and devices["A"].isdisjoint(devices["B"]):
+        raise CrossDeviceError(
+            "Les colonnes A et B sont sur des périphériques différents : "
+            "aucun hardlink n'est possible entre elles. Vérifiez les chemins ou les montages Docker."
+        )
+
+def walk_tree(roots: list[tuple[str, str]], max_depth: int = -1, errors: list = None, with_stat: bool = False, stats: dict = None, index=None, workers: int = 1, hdd_workers: int = HDD_WORKERS):
+    """
+    Parcourt une liste de racines étiquetées avec os.scandir.
+
+    Args:
+        roots: Liste de (chemin racine, étiquette), l'étiquette est renvoyée telle quelle
+        max_depth: Profondeur maximale (0 = fichiers de la racine seulement, -1 = illimitée)
+        errors: Liste à compléter avec les erreurs rencontrées
+        with_stat: Si True, chaque fichier est accompagné de son stat
+        stats: Dictionnaire optionnel mis à jour avec dirs_visited / dirs_pending
+        index: InodeIndex optionnel ; seuls les dossiers dont le mtime a changé sont relistés
+        workers: Nombre de threads de listage ; au-delà de 1, chaque sous-dossier devient
+            une tâche de la file de son périphérique, prise par le premier thread libre
+        hdd_workers: Listages simultanés au plus sur un même disque rotatif
+
+    Yields:
+        (dossier, étiquette, fichiers) où fichiers est la liste renvoyée par _list_directory,
+        dans l'ordre de fin des listages quand workers > 1
+    """
+    if errors is None:
+        errors = []
+    mount_points = _read_mount_points()
+
+    # Files (chemin, étiquette, st_dev, profondeur, points de montage) par périphérique.
+    # Les points de montage ne sont comparables qu'aux chemins absolus sans lien symbolique.
+    # Chaque file est dépilée par la fin (parcours en profondeur) pour borner sa taille.
+    queues = defaultdict(deque)
+    for root, tag in roots:
+        try:
+            # Un seul stat par racine, les fichiers héritent du st_dev de leur dossier
+            dev = os.stat(root).st_dev
+        except Exception as e:
+            _record_walk_error(root, True, e, errors)
+            continue
+        queues[dev].appendleft((root, tag, dev, 0, mount_points if os.path.realpath(root) == root else None))
+
+    def expand(item, subdirs):
+        """Ajoute les sous-dossiers d'un dossier listé à la file de leur périphérique."""
+        _, tag, _, depth, mounts = item
+        # Empêcher la descente si on atteint la profondeur maximale
+        if max_depth < 0 or depth < max_depth:
+            for sub_path, sub_dev in reversed(subdirs):
+                queues[sub_dev].append((sub_path, tag, sub_dev, depth + 1, mounts))
+
+    def pending_count():
+        return sum(len(queue) for queue in queues.values())
+
+    if workers <= 1:
+        while any(queues.values()):
+            item = next(queue for queue in queues.values() if queue).pop()
+            dirpath, tag, dev, depth, mounts = item
+            try:
+                files, subdirs = _visit_directory(dirpath, dev, mounts, with_stat, index, errors)
+            except Exception as e:
+                _record_walk_error(dirpath, depth == 0, e, errors)
+                continue
+            expand(item, subdirs)
+            if stats is not None:
+                stats["dirs_visited"] = stats.get("dirs_visited", 0) + 1
+                stats["dirs_pending"] = pending_count()
+            yield dirpath, tag, files
+        return
+
+    # Limite de listages simultanés par périphérique : 1 sur un disque rotatif, workers sinon
+    limits = {}
+    running = defaultdict(int)
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        while in_flight or any(queues.values()):
+            # Distribuer à tour de rôle entre périphériques tant qu'il reste des threads libres
+            submitted = True
+            while submitted and len(in_flight) < workers:
+                submitted = False
+                for dev, queue in list(queues.items()):
+                    if not queue or len(in_flight) >= workers:
+                        continue
+                    if dev not in limits:
+                        limits[dev] = device_concurrency(dev, workers, hdd_workers)
+                        logger.debug(f"💽 Périphérique {os.major(dev)}:{os.minor(dev)}: {limits[dev]} listage(s) simultané(s)")
+                    if running[dev] >= limits[dev]:
+                        continue
+                    item = queue.pop()
+                    dirpath, _, _, _, mounts = item
+                    in_flight[pool.submit(_visit_directory, dirpath, dev, mounts, with_stat, index, errors)] = item
+                    running[dev] += 1
+                    submitted = True
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                dirpath, tag, dev, depth, _ = item
+                running[dev] -= 1
+                try:
+                    files, subdirs = future.result()
+                except Exception as e:
+                    _record_walk_error(dirpath, depth == 0, e, errors)
+                    continue
+                expand(item, subdirs)
+                if stats is not None:
+                    stats["dirs_visited"] = stats.get("dirs_visited", 0) + 1
+                    stats["dirs_pending"] = pending_count() + len(in_flight)
+                yield dirpath, tag, files
+
 def count_files(paths: list[str], max_depth: int = -1) -> int:
     """Compte le nombre total de fichiers dans une liste de chemins."""
     logger.info(f"📊 Comptage des fichiers dans {len(paths)} chemins (profondeur max: {max_depth if max_depth >= 0 else 'illimitée'})...")
     total = 0
     for path in paths:
-        try:
-            path_total = 0
-            for root, dirs, files in os.walk(path, topdown=True):
-                # Calculer la profondeur actuelle par rapport au chemin de base
-                if max_depth >= 0:
-                    relative_path = os.path.relpath(root, path)
-                    if relative_path == '.':
-                        depth = 0
-                    else:
-                        depth = len(relative_path.split(os.sep))
-                    
-                    # Empêcher la descente si on atteint la profondeur maximale
-                    if depth >= max_depth:
-                        dirs.clear()
-                    
-                    # Ignorer si on dépasse la profondeur maximale
-                    if depth > max_depth:
-                        continue
-                
-                path_total += len(files)
-            total += path_total
-            logger.debug(f"📁 {path}: {path_total} fichiers")
-        except FileNotFoundError:
-            logger.warning(f"❌ Chemin non trouvé lors du comptage: {path}")
-            continue
-        except Exception as e:
-            logger.error(f"❌ Erreur lors du comptage dans {path}: {str(e)}")
-            continue
-    
+        path_total = 0
+        for _, _, files in walk_tree([(path, None)], max_depth):
+            path_total += len(files)
+        total += path_total
+        logger.debug(f"📁 {path}: {path_total} fichiers")
+
     logger.info(f"📊 Total de fichiers comptés: {total}")
     return total
 
-def analyze_hardlinks(paths_a: list[str], paths_b: list[str], task_id: str = None, tasks_db: dict = None, max_depth: int = -1):
+def _new_results(categories: tuple, details: bool = False) -> dict:
+    """Listes vides des catégories et de leurs tailles (et détails) alignées."""
+    results = {category: [] for category in categories}
+    results["sizes"] = {category: [] for category in categories}
+    results["reclaimable"] = {category: [] for category in categories if category in ORPHAN_CATEGORIES}
+    if details:
+        results["allocated"] = {category: [] for category in categories}
+        results["mtimes"] = {category: [] for category in categories}
+    return results
+
+def _stat_detail(st):
+    """(espace alloué, mtime) d'un fichier, tirés du stat déjà fait par le parcours."""
+    blocks = getattr(st, "st_blocks", None)
+    # Listage relu d'un ancien index, sans blocks : la taille en tient lieu
+    return (blocks * 512 if blocks is not None else st.st_size, st.st_mtime)
+
+def _keep(results: dict, category: str, items: list, size: int, detail: tuple = None):
     """
-    Analyse les liens durs (hardlinks) entre deux listes de répertoires.
+    Ajoute des éléments à une catégorie en gardant alignés results["sizes"], les octets
+    libérables des orphelins et, si results les garde, l'espace alloué et les mtimes.
+    Les éléments d'un même appel partagent un inode.
     """
-    task_info = f"pour la tâche {task_id}" if task_id else "sans tâche"
-    logger.info(f"🔍 Analyse des hardlinks démarrée {task_info} (profondeur max: {max_depth if max_depth >= 0 else 'illimitée'})")
-    
-    inodes_map = defaultdict(lambda: {"A": [], "B": []})
+    results[category].extend(items)
+    results["sizes"][category].extend([size] * len(items))
+    if category in ORPHAN_CATEGORIES:
+        results["reclaimable"][category].extend([size] + [0] * (len(items) - 1))
+    if "allocated" in results:
+        allocated, mtime = detail or (0, None)
+        results["allocated"][category].extend([allocated] * len(items))
+        results["mtimes"][category].extend([mtime] * len(items))
+
+def _extend(results: dict, source: dict, category: str):
+    """Reprend une catégorie de source avec ses listes alignées."""
+    results[category].extend(source[category])
+    for key in ("sizes", "reclaimable", "allocated", "mtimes"):
+        if category in results.get(key, {}) and category in source.get(key, {}):
+            results[key][category].extend(source[key][category])
+
+def _details(results: dict, category: str, index: int):
+    """detail (alloué, mtime) du index-ième élément d'une catégorie, ou None."""
+    if "allocated" not in results:
+        return None
+    return (results["allocated"][category][index], results["mtimes"][category][index])
+
+def _collect_inodes(paths_a: list[str], paths_b: list[str], progress: ProgressReporter = None, max_depth: int = -1, index=None, workers: int = 1, stream_orphans: bool = True, details: bool = SCAN_FILE_DETAILS):
+    """
+    Parcourt les colonnes A et B et regroupe les chemins par inode, en classant au fil
+    du parcours tout ce qui peut déjà l'être.
+
+    Moteur commun à toutes les analyses. La colonne B est parcourue d'abord et mémorisée
+    dans une InodeMap, puis la colonne A est lue en flux et chaque fichier est confronté
+    aux inodes de B dès sa lecture. Sont confirmés sans passer par la map :
+    - les fichiers à lien unique (st_nlink == 1), forcément orphelins ;
+    - un fichier A à 2 liens dont l'autre lien est déjà connu en B : paire synchronisée.
+    Le classement final ne tranche plus que le reste (orphelins B à plusieurs liens,
+    conflits, liens hors des racines). Un fichier relu de l'index n'a pas de nlink à jour
+    (voir InodeIndex) : il passe toujours par la map, et son nlink n'est relu (un stat)
+    que si l'inode n'a de liens que dans une colonne.
+
+    Pendant le scan, la tâche expose les éléments confirmés dans "partial_results" ; seules les
+    paires synchronisées y figurent si stream_orphans est False (le mode par dossier
+    peut encore masquer un orphelin une fois tout le parcours terminé).
+
+    La taille (et avec details l'espace alloué et le mtime) de chaque fichier vient du
+    stat du parcours : aucun appel système de plus.
+
+    Retourne (inodes_map, confirmed, errors, walk_stats) où confirmed contient les listes
+    "synced", "orphans_a" et "orphans_b" déjà tranchées avec leurs listes alignées
+    (voir _new_results), et walk_stats les compteurs du parcours (dirs_visited, walk_seconds).
+    """
+    inodes_map = InodeMap(details)
+    confirmed = _new_results(("synced", "orphans_a", "orphans_b"), details)
     errors = []
-    files_processed = 0
+    if progress is None:
+        progress = ProgressReporter()
+    walk_stats = {}
+    walk_started = time.perf_counter()
 
-    def scan_directory(directory_path: str, column: str):
-        """Scanne un répertoire et remplit la map d'inodes."""
-        nonlocal files_processed
-        logger.info(f"📁 Scan du répertoire {column}: {directory_path}")
-        try:
-            for root, dirs, files in os.walk(directory_path, topdown=True):
-                # Calculer la profondeur actuelle par rapport au chemin de base
-                if max_depth >= 0:
-                    relative_path = os.path.relpath(root, directory_path)
-                    if relative_path == '.':
-                        depth = 0
-                    else:
-                        depth = len(relative_path.split(os.sep))
-                    
-                    # Empêcher la descente si on atteint la profondeur maximale
-                    if depth >= max_depth:
-                        dirs.clear()
-                    
-                    # Ignorer si on dépasse la profondeur maximale
-                    if depth > max_depth:
-                        continue
-                
-                logger.debug(f"🔍 Scan du dossier: {root} ({len(files)} fichiers)")
-                for filename in files:
-                    files_processed += 1
-                    # Mise à jour du progrès seulement si on a un task_id et tasks_db valides
-                    if task_id and tasks_db and task_id in tasks_db:
-                        tasks_db[task_id]["progress"] += 1
-                        tasks_db[task_id]["current_file"] = filename
-                        # Log de progression tous les 100 fichiers
-                        if files_processed % 100 == 0:
-                            logger.info(f"📊 Progression: {files_processed} fichiers traités...")
-                    
-                    filepath = os.path.join(root, filename)
-                    try:
-                        stat = os.stat(filepath)
-                        # Clé unique pour un appareil et un inode
-                        inode_key = (stat.st_dev, stat.st_ino)
-                        inodes_map[inode_key][column].append(filepath)
-                    except FileNotFoundError:
-                        # Le fichier a peut-être été supprimé pendant le scan
-                        logger.debug(f"⚠️ Fichier non trouvé pendant le scan: {filepath}")
-                        continue
-                    except Exception as e:
-                        logger.warning(f"❌ Erreur lors du traitement du fichier {filepath}: {str(e)}")
-                        errors.append({"path": filepath, "error": str(e)})
-        except FileNotFoundError:
-            logger.error(f"❌ Dossier non trouvé: {directory_path}")
-            errors.append({"path": directory_path, "error": "Le dossier n'existe pas."})
-        except Exception as e:
-            logger.error(f"❌ Erreur lors du scan du dossier {directory_path}: {str(e)}")
-            errors.append({"path": directory_path, "error": str(e)})
+    # Refuser tout de suite plutôt que de tout parcourir pour ne trouver que des orphelins
+    check_devices(paths_a, paths_b)
+
+    # Mêmes listes que confirmed : l'état de la tâche suit le scan sans copie
+    progress.set(partial_results=confirmed if stream_orphans else {"synced": confirmed["synced"]}, stage="scan_b")
 
-    # Scanne tous les dossiers fournis
-    for path in paths_a:
-        scan_directory(path, "A")
     for path in paths_b:
-        scan_directory(path, "B")
-
-    # Analyse des résultats
-    results = {
-        "synced": [],
-        "orphans_a": [], # Présent en A, mais pas en B
-        "orphans_b": [], # Présent en B, mais pas en A
-        "conflicts": []  # Plus de 2 hardlinks au total
-    }
+        logger.info(f"📁 Scan du répertoire B: {path}")
+    # Chaque racine est l'étiquette de ses dossiers : la racine d'un fichier est connue sans comparer de chemins
+    for dirpath, root, files in walk_tree([(path, path) for path in paths_b], max_depth, errors, with_stat=True, stats=walk_stats, index=index, workers=workers):
+        logger.debug(f"🔍 Scan du dossier: {dirpath} ({len(files)} fichiers)")
+        dir_id = inodes_map.add_directory(dirpath, root)
+        dir_bytes = 0
+        for name, dev, ino, st in files:
+            dir_bytes += st.st_size
+            detail = _stat_detail(st) if details else None
+            if st.st_nlink == 1:
+                _keep(confirmed, "orphans_b", [inodes_map.path(dir_id, name)], st.st_size, detail)
+            else:
+                inodes_map.add(dir_id, name, "B", dev, ino, st.st_nlink, st.st_size, detail)
+
+        # Les racines A restent à parcourir : les compter dans l'estimation du total
+        walk_stats["dirs_pending"] = walk_stats.get("dirs_pending", 0) + len(paths_a)
+        _count_directory(progress, inodes_map, files, dir_bytes, walk_stats)
+
+    progress.set(stage="scan_a")
+    for path in paths_a:
+        logger.info(f"📁 Scan du répertoire A: {path}")
+    for dirpath, root, files in walk_tree([(path, path) for path in paths_a], max_depth, errors, with_stat=True, stats=walk_stats, index=index, workers=workers):
+        logger.debug(f"🔍 Scan du dossier: {dirpath} ({len(files)} fichiers)")
+        dir_id = inodes_map.add_directory(dirpath, root)
+        dir_bytes = 0
+        for name, dev, ino, st in files:
+            dir_bytes += st.st_size
+            detail = _stat_detail(st) if details else None
+            if st.st_nlink == 1:
+                _keep(confirmed, "orphans_a", [inodes_map.path(dir_id, name)], st.st_size, detail)
+                continue
+
+            if st.st_nlink == 2:
+                # Deux liens au total dont un seul vu, en B : aucun autre lien ne peut exister
+                slot = inodes_map.lookup(dev, ino)
+                if slot is not None:
+                    links = inodes_map.links(slot)
+                    if len(links) == 1 and links[0][0] == "B":
+                        _keep(confirmed, "synced", [{"path_a": inodes_map.path(dir_id, name), "path_b": links[0][1]}], st.st_size, detail)
+                        inodes_map.discard(dev, ino)
+                        continue
+
+            # Clé unique pour un appareil et un inode
+            inodes_map.add(dir_id, name, "A", dev, ino, st.st_nlink, st.st_size, detail)
+
+        _count_directory(progress, inodes_map, files, dir_bytes, walk_stats)
+
+    _refresh_nlinks(inodes_map)
+    walk_stats["walk_seconds"] = time.perf_counter() - walk_started
+
+    # Les résultats complets remplacent les partiels à la fin de la tâche
+    progress.discard("partial_results")
+
+    return inodes_map, confirmed, errors, walk_stats
+
+def _refresh_nlinks(inodes_map: InodeMap):
+    """
+    Relit st_nlink des inodes venus de listages de l'index dont le classement en dépend :
+    ceux qui n'ont de liens que dans une colonne (orphelin ou lié hors des racines).
+    Une paire ou un conflit se classe sans nlink. Un fichier disparu ou remplacé depuis
+    garde nlink inconnu et reste classé sur ses seuls liens vus.
+    """
+    refreshed = 0
+    for (dev, ino), slot in list(inodes_map.unknown_nlinks()):
+        links = inodes_map.links(slot)
+        if len({column for column, _ in links}) > 1:
+            continue
+        try:
+            st = os.stat(links[0][1])
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) == (dev, ino):
+            inodes_map.set_nlink(slot, st.st_nlink)
+            refreshed += 1
+    if refreshed:
+        logger.debug(f"🔗 nlink relu pour {refreshed} inode(s) de listages de l'index")
+
+def _count_directory(progress: ProgressReporter, inodes_map: InodeMap, files: list, dir_bytes: int, walk_stats: dict):
+    """Compte les fichiers d'un dossier parcouru, en un seul appel au reporter de progression."""
+    if not files:
+        return
+    inodes_map.files += len(files)
+    progress.advance(len(files), dir_bytes, files[-1][0], walk_stats)
+
+def _linked_outside(paths: dict, column: str):
+    """
+    Retourne l'entrée "linked_outside" d'un inode vu dans une seule colonne si son nombre
+    de liens dépasse les chemins trouvés, sinon None.
+
+    Les liens manquants sont hors des racines scannées (ou au-delà de la profondeur max) :
+    le fichier n'est pas un vrai orphelin, le supprimer ne libérerait aucun espace.
+    """
+    links = paths[column]
+    if paths.get("nlink", 0) > len(links):
+        return {"column": column, "paths": links, "nlink": paths["nlink"]}
+    return None
+
+def classify_inodes(inodes_map: InodeMap, confirmed: dict = None) -> dict:
+    """
+    Classe chaque inode de la map en synchronisé, orphelin A/B, conflit ou lié hors des racines.
+    confirmed contient les éléments déjà tranchés pendant le parcours (voir _collect_inodes).
+    """
+    # Analyse des résultats : synchronisés, orphelins A (présents en A mais pas en B) et B,
+    # conflits (plus de 2 hardlinks au total) et liés hors des racines scannées
+    results = _new_results(RESULT_CATEGORIES, bool(confirmed and "allocated" in confirmed))
+
+    if confirmed:
+        for category in ("synced", "orphans_a", "orphans_b"):
+            _extend(results, confirmed, category)
+
+    for _, paths in inodes_map.items():
+        category, items = classify_inode(paths)
+        _keep(results, category, items, paths.get("size", 0), paths.get("detail"))
+
+    return results
+
+def classified_results(classified) -> dict:
+    """Résultats construits à partir d'inodes déjà classés : (catégorie, éléments, taille) par inode."""
+    results = _new_results(RESULT_CATEGORIES)
+    for category, items, size in classified:
+        _keep(results, category, items, size)
+    return results
+
+def classify_inode(paths: dict):
+    """
+    Classe un seul inode de la map (voir InodeMap.entry) et retourne (catégorie, éléments).
+    Les éléments d'un même inode partagent sa taille (voir _keep).
+    """
+    count_a = len(paths["A"])
+    count_b = len(paths["B"])
 
-    for inode_key, paths in inodes_map.items():
-        count_a = len(paths["A"])
-        count_b = len(paths["B"])
+    # Cas parfait : 1 hardlink en A et 1 en B
+    if count_a == 1 and count_b == 1:
+        return "synced", [{"path_a": paths["A"][0], "path_b": paths["B"][0]}]
+
+    # Orphelin en A : au moins un lien en A, aucun en B
+    # Orphelin en B : au moins un lien en B, aucun en A
+    if count_a == 0 or count_b == 0:
+        column = "A" if count_b == 0 else "B"
+        outside = _linked_outside(paths, column)
+        if outside:
+            return "linked_outside", [outside]
+        return ("orphans_a" if column == "A" else "orphans_b"), paths[column]
+
+    # Tous les autres cas sont des "conflits" à examiner
+    # (ex: 2 en A et 1 en B, 2 en A et 0 en B, etc.)
+    return "conflicts", [{"paths_a": paths["A"], "paths_b": paths["B"]}]
+
+def _split_path(path: str):
+    """Découpe un chemin en (préfixe "dossier/", nom), comme les liens de l'InodeMap."""
+    cut = path.rfind(os.sep) + 1
+    return path[:cut], path[cut:]
+
+class _FolderStats:
+    """
+    Compteurs par dossier du mode par dossier : fichiers et octets synchronisés,
+    orphelins signalés, orphelins masqués (dossier synchronisé), conflits et liés hors des racines.
+    """
+
+    def __init__(self, root_of):
+        self.root_of = root_of
+        self.folders = ({}, {})  # colonne (0 = A, 1 = B) -> préfixe -> compteurs
+
+    def add(self, column: int, prefix: str, category: str, size: int):
+        folder = self.folders[column].get(prefix)
+        if folder is None:
+            folder = self.folders[column][prefix] = {
+                "counts": dict.fromkeys(FOLDER_CATEGORIES, 0),
+                "bytes": dict.fromkeys(FOLDER_CATEGORIES, 0),
+            }
+        folder["counts"][category] += 1
+        folder["bytes"][category] += size
+
+    def export(self) -> dict:
+        """{"A": [...], "B": [...]} triés par chemin, chaque dossier avec sa racine."""
+        exported = {}
+        for column, folders in zip(COLUMNS, self.folders):
+            exported[column] = [
+                {"path": os.path.dirname(prefix), "root": self.root_of(prefix, column), **stats}
+                for prefix, stats in sorted(folders.items())
+            ]
+        return exported
+
+def classify_inodes_by_folder(inodes_map: InodeMap, paths_a: list[str], paths_b: list[str], check_column: str, confirmed: dict = None) -> dict:
+    """
+    Classe les inodes comme classify_inodes, mais un orphelin situé dans un dossier
+    qui contient au moins un fichier synchronisé n'est pas signalé.
+
+    Étape d'agrégation en une seule passe sur la map : chaque lien arrive avec son dossier
+    (préfixe interné par l'InodeMap) et sa colonne, les compteurs par dossier
+    (results["folders"]) sont tenus au fil de l'eau et les orphelins sont mis en attente
+    par dossier. Seuls ces dossiers en attente sont ensuite confrontés aux dossiers
+    synchronisés, sans repasser sur les inodes.
+    """
+    inodes = inodes_map.folder_items()
+    root_of = lambda prefix, column: inodes_map.root_of(prefix)
+
+    # Colonnes dont les dossiers synchronisés masquent les orphelins
+    checked = {"a": (0,), "b": (1,), "both": (0, 1)}.get(check_column, ())
+    synced_folders = (set(), set())
+    pending = (defaultdict(list), defaultdict(list))  # colonne -> préfixe -> [(catégorie, éléments, taille, detail, dossiers des liens)]
+    folders = _FolderStats(root_of)
+
+    # Mêmes catégories que classify_inodes
+    results = _new_results(RESULT_CATEGORIES, bool(confirmed and "allocated" in confirmed))
+
+    def mark_synced(links_by_column, size: int, category: str = "synced"):
+        # Les dossiers de toutes les colonnes vérifiées sont marqués synchronisés
+        for column, links in enumerate(links_by_column):
+            for prefix, _ in links:
+                folders.add(column, prefix, category, size)
+                if column in checked:
+                    synced_folders[column].add(prefix)
+
+    if confirmed:
+        for pair, size in zip(confirmed["synced"], confirmed["sizes"]["synced"]):
+            mark_synced(([_split_path(pair["path_a"])], [_split_path(pair["path_b"])]), size)
+        _extend(results, confirmed, "synced")
+        # Les orphelins confirmés pendant le parcours suivent la même règle de dossier
+        for category, column in (("orphans_a", 0), ("orphans_b", 1)):
+            for position, (path, size) in enumerate(zip(confirmed[category], confirmed["sizes"][category])):
+                prefix, _ = _split_path(path)
+                pending[column][prefix].append((category, [path], size, _details(confirmed, category, position), (prefix,)))
+
+    for _, links_a, links_b, nlink, size, detail in inodes:
+        count_a = len(links_a)
+        count_b = len(links_b)
 
         # Cas parfait : 1 hardlink en A et 1 en B
         if count_a == 1 and count_b == 1:
-            results["synced"].append({"path_a": paths["A"][0], "path_b": paths["B"][0]})
-        
-        # Orphelin en A : au moins un lien en A, aucun en B
-        elif count_a > 0 and count_b == 0:
-            results["orphans_a"].extend(paths["A"])
-            
-        # Orphelin en B : au moins un lien en B, aucun en A
-        elif count_b > 0 and count_a == 0:
-            results["orphans_b"].extend(paths["B"])
-            
+            mark_synced((links_a, links_b), size)
+            _keep(results, "synced", [{"path_a": "".join(links_a[0]), "path_b": "".join(links_b[0])}], size, detail)
+
+        # Orphelin d'une seule colonne : tranché une fois les dossiers synchronisés connus
+        elif count_b == 0 or count_a == 0:
+            column, links = (0, links_a) if count_b == 0 else (1, links_b)
+            paths = ["".join(link) for link in links]
+            prefixes = [prefix for prefix, _ in links]
+            # Le dossier du premier lien décide pour tous les liens de l'inode
+            if nlink > len(links):
+                outside = {"column": COLUMNS[column], "paths": paths, "nlink": nlink}
+                pending[column][prefixes[0]].append(("linked_outside", [outside], size, detail, prefixes))
+            else:
+                pending[column][prefixes[0]].append((("orphans_a", "orphans_b")[column], paths, size, detail, prefixes))
+
         # Tous les autres cas sont des "conflits" à examiner
         # (ex: 2 en A et 1 en B, 2 en A et 0 en B, etc.)
         else:
-            results["conflicts"].append({"paths_a": paths["A"], "paths_b": paths["B"]})
+            # Un conflit a des liens des deux côtés : ses dossiers comptent comme synchronisés
+            mark_synced((links_a, links_b), size, "conflicts")
+            _keep(results, "conflicts", [{"paths_a": ["".join(l) for l in links_a], "paths_b": ["".join(l) for l in links_b]}], size, detail)
+
+    for column in (0, 1):
+        for prefix, entries in pending[column].items():
+            hidden = prefix in synced_folders[column]
+            for category, items, size, detail, link_prefixes in entries:
+                if not hidden:
+                    _keep(results, category, items, size, detail)
+                # Chaque lien compte dans son propre dossier
+                counted = "hidden" if hidden else "linked_outside" if category == "linked_outside" else "orphans"
+                for link_prefix in link_prefixes:
+                    folders.add(column, link_prefix, counted, size)
+
+    results["synced_folders"] = {
+        column: [os.path.dirname(prefix) for prefix in synced_folders[index]]
+        for index, column in enumerate(COLUMNS)
+    }
+    results["folders"] = folders.export()
+    return results
+
+def _space_entry(details: bool) -> dict:
+    entry = {"orphans": {"files": 0, "bytes": 0}, "synced": {"files": 0, "bytes": 0}, "reclaimable": {"bytes": 0}}
+    if details:
+        entry["reclaimable"]["allocated_bytes"] = 0
+    return entry
+
+def _add_space(total: dict, counters: dict):
+    for kind, values in counters.items():
+        for key, value in values.items():
+            total[kind][key] += value
+
+def space_report(results: dict, group) -> dict:
+    """
+    Espace des orphelins et des synchronisés de chaque colonne, regroupé par
+    group(chemin, colonne) (racine, dossier...), calculé depuis les seuls résultats :
+    aucun appel système.
+
+    "orphans" compte chaque lien orphelin et sa taille ; "reclaimable" les octets
+    réellement libérés si on supprime les orphelins, chaque inode une seule fois
+    (results["reclaimable"]), et avec SCAN_FILE_DETAILS l'espace alloué correspondant.
+    Retourne {"A": {"total": compteurs, "groups": [{"path": clé, ...compteurs}]}, "B": ...}.
+    """
+    details = "allocated" in results
+    groups = ({}, {})
+
+    def counters_for(column: int, path: str) -> dict:
+        key = group(path, COLUMNS[column])
+        counters = groups[column].get(key)
+        if counters is None:
+            counters = groups[column][key] = _space_entry(details)
+        return counters
+
+    sizes = results.get("sizes") or {}
+    for column, category in enumerate(ORPHAN_CATEGORIES):
+        items = results.get(category) or []
+        item_sizes = sizes.get(category) or [0] * len(items)
+        # Résultats antérieurs à results["reclaimable"] : chaque lien compte
+        freed = (results.get("reclaimable") or {}).get(category) or item_sizes
+        allocated = (results.get("allocated") or {}).get(category)
+        for position, path in enumerate(items):
+            counters = counters_for(column, path)
+            counters["orphans"]["files"] += 1
+            counters["orphans"]["bytes"] += item_sizes[position]
+            if freed[position]:
+                counters["reclaimable"]["bytes"] += freed[position]
+                if details:
+                    counters["reclaimable"]["allocated_bytes"] += allocated[position]
+
+    for pair, size in zip(results.get("synced") or [], sizes.get("synced") or []):
+        for column, key in enumerate(("path_a", "path_b")):
+            counters = counters_for(column, pair[key])
+            counters["synced"]["files"] += 1
+            counters["synced"]["bytes"] += size
+
+    report = {}
+    for column, name in enumerate(COLUMNS):
+        total = _space_entry(details)
+        for counters in groups[column].values():
+            _add_space(total, counters)
+        report[name] = {
+            "total": total,
+            "groups": [{"path": key, **counters} for key, counters in sorted(groups[column].items(), key=lambda item: item[0] or "")],
+        }
+    return report
+
+def root_finder(roots: list[str]):
+    """Retourne root_of(chemin) : la racine de roots qui contient le chemin (la plus longue), ou None."""
+    prefixes = sorted(((os.path.join(root, ""), os.path.normpath(root)) for root in roots), key=lambda item: len(item[0]), reverse=True)
+    cache = {}
+
+    def root_of(path: str):
+        # Une recherche par dossier : ses fichiers partagent la même racine
+        folder = path[:path.rfind(os.sep) + 1]
+        if folder not in cache:
+            cache[folder] = next((root for prefix, root in prefixes if folder.startswith(prefix)), None)
+        return cache[folder]
+    return root_of
+
+def space_by_root(results: dict, paths_a: list[str], paths_b: list[str]) -> dict:
+    """space_report() par racine scannée, gardé dans results["space"] à la fin d'une analyse."""
+    finders = {"A": root_finder(paths_a), "B": root_finder(paths_b)}
+    return space_report(results, lambda path, column: finders[column](path))
+
+def space_by_folder(results: dict) -> dict:
+    """space_report() par dossier parent de chaque fichier."""
+    return space_report(results, lambda path, column: os.path.dirname(path))
 
+def _scan_stats(inodes_map: InodeMap, walk_stats: dict, errors: list, started: float) -> dict:
+    """
+    Volumétrie, débit et mémoire du scan, mesurés une fois les résultats construits.
+    started est l'instant (perf_counter) du début de l'analyse.
+    """
+    stats = inodes_map.stats()
+    walk_seconds = walk_stats.get("walk_seconds", 0)
+    stats.update({
+        "directories_visited": walk_stats.get("dirs_visited", 0),
+        "walk_errors": len(errors),
+        "walk_seconds": round(walk_seconds, 3),
+        "scan_seconds": round(time.perf_counter() - started, 3),
+        "files_per_second": round(stats["files"] / walk_seconds) if walk_seconds else 0,
+        "directories_per_second": round(walk_stats.get("dirs_visited", 0) / walk_seconds) if walk_seconds else 0,
+    })
+    logger.info(
+        f"🧠 Mémoire du scan: map {format_bytes(stats['map_bytes'])} pour {stats['files']} fichiers "
+        f"dans {stats['directories']} dossiers, processus {format_bytes(stats.get('rss_bytes', 0))} "
+        f"(pic {format_bytes(stats['peak_rss_bytes'])})"
+    )
+    return stats
+
+def analyze_hardlinks(paths_a: list[str], paths_b: list[str], progress: ProgressReporter = None, max_depth: int = -1, index=None, workers: int = 1):
+    """
+    Analyse les liens durs (hardlinks) entre deux listes de répertoires.
+    """
+    task_info = f"pour la tâche {progress.task_id}" if progress and progress.task_id else "sans tâche"
+    logger.info(f"🔍 Analyse des hardlinks démarrée {task_info} (profondeur max: {max_depth if max_depth >= 0 else 'illimitée'}, threads: {workers})")
+    
+    started = time.perf_counter()
+    if progress is None:
+        progress = ProgressReporter()
+    inodes_map, confirmed, errors, walk_stats = _collect_inodes(paths_a, paths_b, progress, max_depth, index, workers)
+    progress.set(stage="classify")
+    results = classify_inodes(inodes_map, confirmed)
+    results["space"] = space_by_root(results, paths_a, paths_b)
+    results["stats"] = _scan_stats(inodes_map, walk_stats, errors, started)
     return results, errors
 
-def analyze_hardlinks_by_folder(paths_a: list[str], paths_b: list[str], check_column: str, task_id: str = None, tasks_db: dict = None, max_depth: int = -1):
+def analyze_hardlinks_by_folder(paths_a: list[str], paths_b: list[str], check_column: str, progress: ProgressReporter = None, max_depth: int = -1, index=None, workers: int = 1):
     """
     Analyse les liens durs (hardlinks) par dossier.
     """
-    task_info = f"pour la tâche {task_id}" if task_id else "sans tâche"
-    logger.info(f"🔍 Analyse des hardlinks par dossier démarrée {task_info} (colonne: {check_column}, profondeur max: {max_depth if max_depth >= 0 else 'illimitée'})")
+    task_info = f"pour la tâche {progress.task_id}" if progress and progress.task_id else "sans tâche"
+    logger.info(f"🔍 Analyse des hardlinks par dossier démarrée {task_info} (colonne: {check_column}, profondeur max: {max_depth if max_depth >= 0 else 'illimitée'}, threads: {workers})")
     
-    inodes_map = defaultdict(lambda: {"A": [], "B": []})
-    errors = []
-    files_processed = 0
-    
-    synced_folders = defaultdict(set)
-    
-    def scan_directory(directory_path: str, column: str):
-        """Scanne un répertoire et remplit la map d'inodes."""
-        nonlocal files_processed
-        logger.info(f"📁 Scan par dossier du répertoire {column}: {directory_path}")
-        try:
-            for root, dirs, files in os.walk(directory_path, topdown=True):
-                # Calculer la profondeur actuelle par rapport au chemin de base
-                if max_depth >= 0:
-                    relative_path = os.path.relpath(root, directory_path)
-                    if relative_path == '.':
-                        depth = 0
-                    else:
-                        depth = len(relative_path.split(os.sep))
-                    
-                    # Empêcher la descente si on atteint la profondeur maximale
-                    if depth >= max_depth:
-                        dirs.clear()
-                    
-                    # Ignorer si on dépasse la profondeur maximale
-                    if depth > max_depth:
-                        continue
-                
-                logger.debug(f"🔍 Scan du dossier: {root} ({len(files)} fichiers)")
-                for filename in files:
-                    files_processed += 1
-                    # Mise à jour du progrès seulement si on a un task_id et tasks_db valides
-                    if task_id and tasks_db and task_id in tasks_db:
-                        tasks_db[task_id]["progress"] += 1
-                        tasks_db[task_id]["current_file"] = filename
-                        # Log de progression tous les 100 fichiers
-                        if files_processed % 100 == 0:
-                            logger.info(f"📊 Progression scan par dossier: {files_processed} fichiers traités...")
-                    
-                    filepath = os.path.join(root, filename)
-                    try:
-                        stat = os.stat(filepath)
-                        # Clé unique pour un appareil et un inode
-                        inode_key = (stat.st_dev, stat.st_ino)
-                        inodes_map[inode_key][column].append(filepath)
-                    except FileNotFoundError:
-                        # Le fichier a peut-être été supprimé pendant le scan
-                        logger.debug(f"⚠️ Fichier non trouvé pendant le scan: {filepath}")
-                        continue
-                    except Exception as e:
-                        logger.warning(f"❌ Erreur lors du traitement du fichier {filepath}: {str(e)}")
-                        errors.append({"path": filepath, "error": str(e)})
-        except FileNotFoundError:
-            logger.error(f"❌ Dossier non trouvé: {directory_path}")
-            errors.append({"path": directory_path, "error": "Le dossier n'existe pas."})
-        except Exception as e:
-            logger.error(f"❌ Erreur lors du scan du dossier {directory_path}: {str(e)}")
-            errors.append({"path": directory_path, "error": str(e)})
+    started = time.perf_counter()
+    if progress is None:
+        progress = ProgressReporter()
+    inodes_map, confirmed, errors, walk_stats = _collect_inodes(paths_a, paths_b, progress, max_depth, index, workers, stream_orphans=False)
+    # Étape distincte du classement par fichier : le regroupement par dossier a son propre coût
+    progress.set(stage="aggregate")
+    results = classify_inodes_by_folder(inodes_map, paths_a, paths_b, check_column, confirmed)
+    results["space"] = space_by_root(results, paths_a, paths_b)
+    results["stats"] = _scan_stats(inodes_map, walk_stats, errors, started)
+    return results, errors
 
-    # Scanne tous les dossiers fournis
-    for path in paths_a:
-        scan_directory(path, "A")
-    for path in paths_b:
-        scan_directory(path, "B")
-
-    # Identifie les dossiers qui ont au moins un fichier synchronisé
-    for inode_key, paths in inodes_map.items():
-        if len(paths["A"]) > 0 and len(paths["B"]) > 0:
-            # Pour chaque fichier synchronisé, marquer son dossier comme synchronisé
-            for path in paths["A"] + paths["B"]:
-                if check_column == 'a' and path.startswith(tuple(paths_a)):
-                    folder_path = os.path.dirname(path)
-                    synced_folders['A'].add(folder_path)
-                elif check_column == 'b' and path.startswith(tuple(paths_b)):
-                    folder_path = os.path.dirname(path)
-                    synced_folders['B'].add(folder_path)
-                # Si check_column est 'both', on marque les deux côtés
-                elif check_column == 'both':
-                    if path.startswith(tuple(paths_a)):
-                        folder_path = os.path.dirname(path)
-                        synced_folders['A'].add(folder_path)
-                    elif path.startswith(tuple(paths_b)):
-                        folder_path = os.path.dirname(path)
-                        synced_folders['B'].add(folder_path)
-
-    # Analyse des résultats
-    results = {
-        "synced": [],
-        "synced_folders": {
-            "A": list(synced_folders['A']),
-            "B": list(synced_folders['B'])
-        },
-        "orphans_a": [], # Présent en A, mais pas en B
-        "orphans_b": [], # Présent en B, mais pas en A
-        "conflicts": []  # Plus de 2 hardlinks au total
-    }
+def verify_orphans(paths: list[str]):
+    """
+    Revérifie des orphelins issus d'un scan antérieur, juste avant d'agir dessus.
 
-    for inode_key, paths in inodes_map.items():
-        count_a = len(paths["A"])
-        count_b = len(paths["B"])
+    Un chemin reste orphelin s'il est toujours un fichier ordinaire et si tous les liens
+    de son inode figurent parmi les chemins donnés (st_nlink == nombre de candidats du
+    même inode) : un lien ajouté ailleurs depuis le scan, en A comme en B, l'exclut.
 
-        # Cas parfait : 1 hardlink en A et 1 en B
-        if count_a == 1 and count_b == 1:
-            results["synced"].append({"path_a": paths["A"][0], "path_b": paths["B"][0]})
-        
-        # Orphelin en A : au moins un lien en A, aucun en B
-        elif count_a > 0 and count_b == 0:
-            # Vérifier si le dossier est déjà marqué comme synchronisé
-            folder_path = os.path.dirname(paths["A"][0])
-            if folder_path not in synced_folders['A']:
-                results["orphans_a"].extend(paths["A"])
-            
-        # Orphelin en B : au moins un lien en B, aucun en A
-        elif count_b > 0 and count_a == 0:
-            # Vérifier si le dossier est déjà marqué comme synchronisé
-            folder_path = os.path.dirname(paths["B"][0])
-            if folder_path not in synced_folders['B']:
-                results["orphans_b"].extend(paths["B"])
-            
-        # Tous les autres cas sont des "conflits" à examiner
-        # (ex: 2 en A et 1 en B, 2 en A et 0 en B, etc.)
+    Retourne (orphelins, rejets) : liste de (chemin, stat) et liste d'erreurs {path, error}.
+    """
+    stats = []
+    links = defaultdict(int)
+    rejected = []
+    for path in paths:
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            rejected.append({"path": path, "error": "Fichier non trouvé"})
+            continue
+        except OSError as e:
+            rejected.append({"path": path, "error": str(e)})
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            rejected.append({"path": path, "error": "N'est pas un fichier ordinaire"})
+            continue
+        stats.append((path, st))
+        links[(st.st_dev, st.st_ino)] += 1
+
+    verified = []
+    for path, st in stats:
+        if st.st_nlink != links[(st.st_dev, st.st_ino)]:
+            rejected.append({"path": path, "error": "Lié ailleurs depuis le scan"})
         else:
-            results["conflicts"].append({"paths_a": paths["A"], "paths_b": paths["B"]})
+            verified.append((path, st))
+    return verified, rejected
 
-    return results, errors
+def plan_orphan_deletion(results: dict, column: str = "b", scan_errors: list = None) -> dict:
+    """
+    Prévisualisation d'une suppression tirée des seuls résultats du scan, sans aucun
+    appel système : même forme que delete_orphan_files(dry_run=True), avec "verified"
+    à False. Les candidats ne sont pas revérifiés ici ; la suppression le fait juste
+    avant d'agir. freed_bytes ne compte qu'une fois chaque inode (results["reclaimable"]).
+    """
+    scan_errors = scan_errors or []
+    plan = {
+        "deleted_files": [],
+        "errors": scan_errors.copy(),
+        "dry_run": True,
+        "verified": False,
+        "total_deleted": 0,
+        "total_errors": 0,
+        "verify_errors": 0,
+        "unlink_errors": 0,
+        "total_bytes": 0,
+        "freed_bytes": 0,
+    }
+    for letter, category in (("a", "orphans_a"), ("b", "orphans_b")):
+        if column not in [letter, "both"]:
+            continue
+        items = results.get(category) or []
+        sizes = (results.get("sizes") or {}).get(category) or [0] * len(items)
+        freed = (results.get("reclaimable") or {}).get(category) or sizes
+        plan["deleted_files"].extend(
+            {"path": path, "size": size, "action": "would_delete"} for path, size in zip(items, sizes)
+        )
+        plan["total_bytes"] += sum(sizes)
+        plan["freed_bytes"] += sum(freed)
+    plan["total_deleted"] = len(plan["deleted_files"])
+    return plan
 
 # --- Section pour tester le script directement ---
-def delete_orphan_files(paths_a: list[str], paths_b: list[str], column: str = "b", dry_run: bool = False, task_id: str = None, tasks_db: dict = None, max_depth: int = -1):
+def delete_orphan_files(paths_a: list[str], paths_b: list[str], column: str = "b", dry_run: bool = False, progress: ProgressReporter = None, max_depth: int = -1, index=None, workers: int = 1, results: dict = None, scan_errors: list = None):
     """
     Supprime les fichiers orphelins d'une colonne spécifique.
     
@@ -286,116 +883,119 @@ def delete_orphan_files(paths_a: list[str], paths_b: list[str], column: str = "b
         paths_b: Liste des chemins de la colonne B
         column: Colonne à nettoyer ('a', 'b', ou 'both')
         dry_run: Si True, ne supprime pas réellement les fichiers
-        task_id: ID de la tâche pour le suivi
-        tasks_db: Base de données des tâches pour le suivi
+        progress: ProgressReporter de la tâche pour le suivi
         max_depth: Profondeur maximale de scan
+        index: InodeIndex optionnel pour un scan incrémental
+        workers: Nombre de threads de listage pour le scan, et de dossiers vidés en parallèle
+        results: Résultats d'un scan récent de l'onglet ; s'ils sont fournis, aucun scan
+            n'est relancé et seuls les orphelins candidats sont revérifiés
+        scan_errors: Erreurs de ce scan récent
     
     Returns:
         dict: Résultats de la suppression avec les fichiers supprimés et les erreurs
     """
     logger.info(f"🗑️ Début de la suppression des orphelins (colonne: {column}, dry_run: {dry_run})")
     
-    # D'abord, scanner pour identifier les orphelins
-    results, scan_errors = analyze_hardlinks(paths_a, paths_b, task_id, tasks_db, max_depth)
+    if progress is None:
+        progress = ProgressReporter()
+    if results is None:
+        # D'abord, scanner pour identifier les orphelins
+        results, scan_errors = analyze_hardlinks(paths_a, paths_b, progress, max_depth, index, workers)
+    else:
+        logger.info("♻️ Résultats d'un scan récent réutilisés, seuls les candidats sont revérifiés")
+    scan_errors = scan_errors or []
     
     deletion_results = {
         "deleted_files": [],
         "errors": scan_errors.copy(),
         "dry_run": dry_run,
         "total_deleted": 0,
-        "total_errors": 0
+        "total_errors": 0,
+        # Répartition des erreurs propres à la suppression, pour les métriques
+        "verify_errors": 0,
+        "unlink_errors": 0,
+        # Octets libérés : un inode ne l'est qu'une fois tous ses liens supprimés
+        "freed_bytes": 0
     }
     
     files_to_delete = []
+    progress.set(stage="verify")
     
-    # Déterminer quels fichiers supprimer selon la colonne
-    if column in ["a", "both"]:
-        files_to_delete.extend(results.get("orphans_a", []))
-        logger.info(f"📂 Fichiers orphelins colonne A à traiter: {len(results.get('orphans_a', []))}")
-    
-    if column in ["b", "both"]:
-        files_to_delete.extend(results.get("orphans_b", []))
-        logger.info(f"📂 Fichiers orphelins colonne B à traiter: {len(results.get('orphans_b', []))}")
+    # Déterminer quels fichiers supprimer selon la colonne, chaque colonne revérifiée à part
+    # (un orphelin de A lié depuis en B n'est plus un orphelin)
+    for letter, category in (("a", "orphans_a"), ("b", "orphans_b")):
+        if column not in [letter, "both"]:
+            continue
+        verified, rejected = verify_orphans(results.get(category, []))
+        files_to_delete.extend(verified)
+        deletion_results["errors"].extend(rejected)
+        deletion_results["verify_errors"] += len(rejected)
+        logger.info(f"📂 Fichiers orphelins colonne {letter.upper()} à traiter: {len(verified)} ({len(rejected)} écartés à la vérification)")
     
     logger.info(f"📊 Total de fichiers à {'simuler' if dry_run else 'supprimer'}: {len(files_to_delete)}")
     
     if not files_to_delete:
         logger.info("✅ Aucun fichier orphelin trouvé à supprimer")
+        deletion_results["total_errors"] = len(deletion_results["errors"]) - len(scan_errors)
+        progress.finish()
         return deletion_results
+
+    # Liens restants de chaque inode : vérifiés, ce sont tous ses liens
+    remaining = defaultdict(int)
+    inode_of = {}
+    for file_path, st in files_to_delete:
+        remaining[(st.st_dev, st.st_ino)] += 1
+        inode_of[file_path] = (st.st_dev, st.st_ino)
+
+    def unlinked(file_path: str, size: int):
+        key = inode_of[file_path]
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            deletion_results["freed_bytes"] += size
+
+    # La progression repart de zéro sur le nombre de fichiers à supprimer
+    progress.label = "Progression suppression"
+    progress.restart(len(files_to_delete), stage="delete")
     
-    # Traitement des fichiers
-    files_processed = 0
-    for file_path in files_to_delete:
-        files_processed += 1
-        
-        # Mise à jour du progrès si on a un task_id
-        if task_id and tasks_db and task_id in tasks_db:
-            tasks_db[task_id]["progress"] = files_processed
-            tasks_db[task_id]["current_file"] = os.path.basename(file_path)
-            
-            # Log de progression tous les 10 fichiers
-            if files_processed % 10 == 0:
-                logger.info(f"📊 Progression suppression: {files_processed}/{len(files_to_delete)} fichiers traités...")
-        
-        try:
-            if dry_run:
-                # Mode simulation : vérifier seulement que le fichier existe
-                if os.path.exists(file_path):
-                    deletion_results["deleted_files"].append({
-                        "path": file_path,
-                        "size": os.path.getsize(file_path),
-                        "action": "would_delete"
-                    })
-                    logger.debug(f"🔍 [DRY RUN] Fichier à supprimer: {file_path}")
-                else:
-                    logger.warning(f"⚠️ [DRY RUN] Fichier non trouvé: {file_path}")
-                    deletion_results["errors"].append({
-                        "path": file_path,
-                        "error": "Fichier non trouvé"
-                    })
-            else:
-                # Mode réel : supprimer le fichier
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    os.remove(file_path)
-                    deletion_results["deleted_files"].append({
-                        "path": file_path,
-                        "size": file_size,
-                        "action": "deleted"
-                    })
-                    logger.info(f"🗑️ Fichier supprimé: {file_path}")
-                    
-                    # Tentative de suppression du dossier parent s'il est vide
-                    try:
-                        parent_dir = os.path.dirname(file_path)
-                        if parent_dir and os.path.exists(parent_dir) and not os.listdir(parent_dir):
-                            os.rmdir(parent_dir)
-                            logger.info(f"📁 Dossier vide supprimé: {parent_dir}")
-                    except OSError:
-                        # Le dossier n'est pas vide ou ne peut pas être supprimé
-                        pass
-                else:
-                    logger.warning(f"⚠️ Fichier non trouvé lors de la suppression: {file_path}")
-                    deletion_results["errors"].append({
-                        "path": file_path,
-                        "error": "Fichier non trouvé lors de la suppression"
-                    })
-                    
-        except PermissionError as e:
-            error_msg = f"Permission refusée: {str(e)}"
-            logger.error(f"❌ {error_msg} pour {file_path}")
-            deletion_results["errors"].append({
+    if dry_run:
+        # Mode simulation : les fichiers viennent d'être vérifiés
+        for file_path, st in files_to_delete:
+            progress.advance(1, st.st_size, os.path.basename(file_path))
+            unlinked(file_path, st.st_size)
+            deletion_results["deleted_files"].append({
                 "path": file_path,
-                "error": error_msg
+                "size": st.st_size,
+                "action": "would_delete"
             })
-        except Exception as e:
-            error_msg = f"Erreur inattendue: {str(e)}"
-            logger.error(f"❌ {error_msg} pour {file_path}")
-            deletion_results["errors"].append({
+            logger.debug(f"🔍 [DRY RUN] Fichier à supprimer: {file_path}")
+    else:
+        # Mode réel : suppressions par dossier, chaque résultat publié au fil de l'eau
+        emptied = set()
+        for file_path, file_size, error in delete_files(files_to_delete, workers):
+            progress.advance(1, file_size, os.path.basename(file_path))
+            if error:
+                logger.error(f"❌ {error} pour {file_path}")
+                deletion_results["errors"].append({
+                    "path": file_path,
+                    "error": error
+                })
+                deletion_results["unlink_errors"] += 1
+                continue
+            unlinked(file_path, file_size)
+            deletion_results["deleted_files"].append({
                 "path": file_path,
-                "error": error_msg
+                "size": file_size,
+                "action": "deleted"
             })
+            emptied.add(os.path.dirname(file_path))
+            logger.debug(f"🗑️ Fichier supprimé: {file_path}")
+
+        # Une seule passe finale sur les dossiers touchés, sans jamais retirer une racine
+        removed_dirs = prune_empty_directories(emptied, paths_a + paths_b)
+        if removed_dirs:
+            logger.info(f"📁 {len(removed_dirs)} dossier(s) vide(s) supprimé(s)")
     
+    progress.finish()
     deletion_results["total_deleted"] = len(deletion_results["deleted_files"])
     deletion_results["total_errors"] = len(deletion_results["errors"]) - len(scan_errors)
     
@@ -0,0 +1,122 @@
+# backend/scheduler.py
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Jobs (scans, suppressions) exécutés en même temps, tous workers confondus
+SCAN_MAX_JOBS = int(os.getenv("SCAN_MAX_JOBS", "2"))
+
+# Jobs exécutés en même temps sur un même disque
+SCAN_JOBS_PER_DEVICE = int(os.getenv("SCAN_JOBS_PER_DEVICE", "1"))
+
+# Priorités : les demandes de l'interface passent avant les scans d'arrière-plan
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Intervalle de nouvelle tentative des jobs en attente (un job terminé réveille aussitôt la file)
+SCHEDULER_POLL_SECONDS = 1
+
+def job_key(kind: str, tab_id: str, **params) -> str:
+    """Clé de regroupement : deux demandes de même clé sont le même job."""
+    return json.dumps([kind, tab_id, params], sort_keys=True, ensure_ascii=False)
+
+def job_devices(paths: list) -> list:
+    """Périphériques lus par un job (les racines illisibles sont ignorées)."""
+    devices = set()
+    for path in paths:
+        try:
+            devices.add(os.stat(path).st_dev)
+        except OSError:
+            continue
+    return sorted(devices)
+
+class JobScheduler:
+    """
+    File d'attente des jobs d'un worker.
+
+    La file et les créneaux sont tenus par le magasin de tâches, donc partagés entre les
+    workers : au plus max_running jobs en même temps, et per_device par disque. Un job
+    tourne dans le worker qui l'a reçu ; son thread de file le démarre dès que le magasin
+    l'admet, dans l'ordre des priorités. on_position(job_id, position) est appelé quand la
+    position d'un job en attente change.
+    """
+
+    def __init__(self, store, max_running: int = SCAN_MAX_JOBS, per_device: int = SCAN_JOBS_PER_DEVICE, on_position=None):
+        self.store = store
+        self.max_running = max_running
+        self.per_device = per_device
+        self.on_position = on_position
+        self.pending = {}  # job_id -> fonction du job
+        self.positions = {}
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self.thread.start()
+
+    def submit(self, job_id: str, run, key: str = None, devices: list = (), priority: int = PRIORITY_INTERACTIVE):
+        """
+        Met un job en file d'attente. Si un job de même clé est déjà en attente ou en cours
+        (dans n'importe quel worker), rien n'est ajouté et son id est retourné ; sinon None.
+        Un job en attente regroupé avec une demande plus prioritaire prend sa priorité.
+        """
+        existing = self.store.enqueue_job(job_id, key, devices, priority)
+        if existing is not None:
+            logger.info(f"🔗 Demande regroupée avec le job {existing} (priorité {priority})")
+            with self.cond:
+                # Sa priorité a pu monter : réessayer tout de suite et republier les positions
+                self.cond.notify()
+            return existing
+        with self.cond:
+            self.pending[job_id] = run
+            self.cond.notify()
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Retire un job encore en attente dans ce worker ; retourne False s'il n'y est pas."""
+        with self.cond:
+            if self.pending.pop(job_id, None) is None:
+                return False
+            self.positions.pop(job_id, None)
+        self.store.finish_job(job_id)
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait(SCHEDULER_POLL_SECONDS)
+                waiting = list(self.pending)
+            for job_id in waiting:
+                try:
+                    self._try_start(job_id)
+                except Exception as e:
+                    logger.error(f"❌ File d'attente: impossible de démarrer le job {job_id}: {e}")
+
+    def _try_start(self, job_id: str):
+        if self.store.claim_job(job_id, self.max_running, self.per_device):
+            with self.cond:
+                run = self.pending.pop(job_id, None)
+                self.positions.pop(job_id, None)
+            if run is None:
+                # Annulé entre-temps
+                self.store.finish_job(job_id)
+                return
+            threading.Thread(target=self._execute, args=(job_id, run), name=f"job-{job_id}", daemon=True).start()
+            return
+
+        position = self.store.queue_position(job_id)
+        if position != self.positions.get(job_id) and self.on_position is not None:
+            self.positions[job_id] = position
+            self.on_position(job_id, position)
+
+    def _execute(self, job_id: str, run):
+        try:
+            run()
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} en erreur: {e}")
+        finally:
+            self.store.finish_job(job_id)
+            with self.cond:
+                # Un créneau vient de se libérer
+                self.cond.notify()
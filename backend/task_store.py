@@ -0,0 +1,675 @@
+# backend/task_store.py
+import os
+import json
+import time
+import zlib
+import fcntl
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from config_manager import CONFIG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Magasin des tâches : "sqlite" (partagé entre les workers gunicorn, survit aux redémarrages)
+# ou "memory" (un seul worker, tout est perdu au redémarrage)
+TASK_STORE = os.getenv("TASK_STORE", "sqlite")
+
+# Base SQLite rangée à côté de settings.json
+TASKS_PATH = os.getenv("TASKS_PATH", os.path.join(os.path.dirname(CONFIG_PATH), "tasks.db"))
+
+# Statuts d'une tâche terminée
+FINAL_STATUSES = ("completed", "error", "timeout", "cancelled")
+
+# Les instantanés de la surveillance ne sont jamais expirés : le worker leader les remplace
+WATCH_TASK_PREFIX = "watch-"
+
+# Ni les derniers résultats de chaque onglet, remplacés à chaque scan terminé
+LATEST_TASK_PREFIX = "latest-"
+PINNED_TASK_PREFIXES = (WATCH_TASK_PREFIX, LATEST_TASK_PREFIX)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    completed_at REAL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partials (
+    id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (id, seq)
+);
+CREATE TABLE IF NOT EXISTS tabs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cancels (
+    id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT,
+    devices TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    queued_at REAL NOT NULL,
+    running INTEGER NOT NULL DEFAULT 0,
+    owner TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    owner TEXT,
+    PRIMARY KEY (name, labels)
+);
+"""
+
+def _process_start(pid: int):
+    """Date de démarrage d'un processus (en ticks depuis le boot), ou None si inconnue."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Le nom du processus, entre parenthèses, peut contenir des espaces
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def current_owner() -> str:
+    """
+    Identifiant du processus qui exécute une tâche : pid et date de démarrage,
+    pour qu'un pid réutilisé après un redémarrage ne passe pas pour le même processus.
+    """
+    pid = os.getpid()
+    return f"{pid}:{_process_start(pid)}"
+
+def owner_alive(owner: str) -> bool:
+    """Vrai si le processus propriétaire d'une tâche tourne encore."""
+    if not owner:
+        return False
+    pid, _, start = owner.partition(":")
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return start == "None" or _process_start(int(pid)) == start
+
+def pack(data) -> bytes:
+    """Sérialise des résultats en JSON compact compressé."""
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+def unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+def interrupted(state: dict, now: float) -> dict:
+    """État d'une tâche dont le processus s'est arrêté pendant son exécution."""
+    return {
+        **state,
+        "status": "error",
+        "error": "Tâche interrompue : le worker qui l'exécutait s'est arrêté",
+        "completed_at": now,
+    }
+
+def admit(job_id: str, running: list, queued: list, max_running: int, per_device: int) -> bool:
+    """
+    Décide si un job en attente peut démarrer.
+
+    running : listes de périphériques des jobs en cours ; queued : (id, périphériques) des
+    jobs en attente, par priorité puis ancienneté. On parcourt la file dans l'ordre en
+    réservant les créneaux des jobs admissibles : un job ne passe pas devant un job plus
+    prioritaire qui peut démarrer, mais un job bloqué par son disque ne bloque pas les
+    jobs des autres disques.
+    """
+    total = len(running)
+    per_dev = {}
+    for devices in running:
+        for dev in devices:
+            per_dev[dev] = per_dev.get(dev, 0) + 1
+    for queued_id, devices in queued:
+        if total >= max_running:
+            return False
+        if any(per_dev.get(dev, 0) >= per_device for dev in devices):
+            continue
+        if queued_id == job_id:
+            return True
+        total += 1
+        for dev in devices:
+            per_dev[dev] = per_dev.get(dev, 0) + 1
+    return False
+
+class TaskStore(ABC):
+    """
+    Magasin des tâches partagé entre les workers.
+
+    Chaque tâche a un état léger (statut, progression, étape... : la vue de
+    /api/scan/status), réécrit à chaque publication de progression, et un contenu
+    volumineux ({"results", "errors"}) écrit une seule fois, avant d'annoncer la tâche
+    terminée. Pendant le scan, les éléments ajoutés aux résultats partiels y sont versés
+    par envois successifs (voir scan_process.partial_delta), lisibles de tous les workers
+    et oubliés dès que la tâche n'est plus en cours. Le magasin garde aussi un petit état
+    par onglet (dernier comptage de fichiers, dernier scan réutilisable) et les métriques
+    de tous les workers. Chaque magasin implémente toutes les méthodes abstraites.
+    """
+
+    # Chemin du verrou de leader, None si le magasin n'est pas partagé entre processus
+    lock_path = None
+
+    @abstractmethod
+    def save_state(self, task_id: str, state: dict):
+        """Écrit l'état léger d'une tâche ; un statut autre que "running" oublie ses résultats partiels."""
+
+    @abstractmethod
+    def get(self, task_id: str):
+        """État d'une tâche, ou None si elle n'existe pas (ou plus)."""
+
+    @abstractmethod
+    def save_payload(self, task_id: str, payload: dict, blob: bytes = None):
+        """Écrit le contenu d'une tâche ; blob est ce contenu déjà passé par pack(), s'il est disponible."""
+
+    @abstractmethod
+    def load_payload(self, task_id: str):
+        """Contenu d'une tâche terminée, ou None."""
+
+    @abstractmethod
+    def append_partial(self, task_id: str, blob: bytes):
+        """Ajoute un envoi de résultats partiels (un partial_delta passé par pack()) à une tâche en cours."""
+
+    @abstractmethod
+    def load_partials(self, task_id: str, after: int = 0) -> list:
+        """Envois de résultats partiels numérotés après after : [(numéro, delta)], dans l'ordre."""
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        """Oublie une tâche : état, contenu, résultats partiels, demande d'arrêt et job."""
+
+    @abstractmethod
+    def expire(self, retention: float, now: float = None) -> tuple[int, int]:
+        """
+        Supprime les tâches terminées depuis plus de retention secondes et passe en erreur
+        les tâches en cours dont le processus s'est arrêté.
+        Retourne (tâches supprimées, tâches interrompues).
+        """
+
+    @abstractmethod
+    def request_cancel(self, task_id: str):
+        """Demande l'arrêt d'une tâche ; le worker qui l'exécute la voit à sa prochaine vérification."""
+
+    @abstractmethod
+    def cancel_requested(self, task_id: str) -> bool:
+        """Indique si l'arrêt de la tâche a été demandé (par n'importe quel worker)."""
+
+    @abstractmethod
+    def clear_cancel(self, task_id: str):
+        """Retire la demande d'arrêt d'une tâche, une fois celle-ci arrêtée."""
+
+    @abstractmethod
+    def enqueue_job(self, job_id: str, key: str, devices: list, priority: int):
+        """
+        Met un job en file d'attente, sauf si un job de même clé est déjà en attente ou en
+        cours : retourne alors l'id de ce job (et rien n'est ajouté), sinon None.
+        Une clé None n'est jamais regroupée. Un job regroupé encore en attente prend la
+        priorité de la demande si elle est plus haute, et remonte d'autant dans la file.
+        """
+
+    @abstractmethod
+    def claim_job(self, job_id: str, max_running: int, per_device: int) -> bool:
+        """Démarre le job s'il est admis (voir admit) ; retourne True s'il peut tourner."""
+
+    @abstractmethod
+    def finish_job(self, job_id: str):
+        """Retire un job terminé ou abandonné, ce qui libère son créneau."""
+
+    @abstractmethod
+    def queue_position(self, job_id: str):
+        """Position (à partir de 1) d'un job dans la file d'attente, ou None s'il n'y est pas."""
+
+    @abstractmethod
+    def get_tab_state(self, tab_id: str) -> dict:
+        """État d'un onglet (voir set_tab_state), {} s'il n'en a pas."""
+
+    @abstractmethod
+    def set_tab_state(self, tab_id: str, **fields):
+        """Met à jour des champs de l'état d'un onglet ; None retire le champ."""
+
+    @abstractmethod
+    def update_metrics(self, increments: list = (), gauges: list = (), owner: str = None):
+        """
+        Ajoute les incréments [(nom, étiquettes, quantité)] aux compteurs et fixe les jauges
+        [(nom, étiquettes, valeur)], en une seule écriture. Les étiquettes sont du JSON trié.
+        Les jauges d'un owner (voir current_owner) sont retirées quand son processus s'arrête.
+        """
+
+    @abstractmethod
+    def read_metrics(self) -> list:
+        """Toutes les séries enregistrées : [(nom, étiquettes, valeur)]."""
+
+    @abstractmethod
+    def count_tasks(self) -> dict:
+        """Nombre de tâches par statut et de jobs en attente ou en cours."""
+
+class MemoryTaskStore(TaskStore):
+    """Magasin en mémoire du processus : l'état et le contenu sont gardés tels quels, sans copie des résultats."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.payloads = {}
+        self.partials = {}
+        self.tabs = {}
+        self.cancels = set()
+        self.jobs = {}
+        self.metrics = {}  # (nom, étiquettes) -> [valeur, owner]
+
+    def save_state(self, task_id: str, state: dict):
+        with self.lock:
+            if state.get("status") == "running":
+                self.tasks[task_id] = {**state, "owner": current_owner()}
+            else:
+                self.tasks[task_id] = dict(state)
+                self.partials.pop(task_id, None)
+
+    def get(self, task_id: str):
+        with self.lock:
+            state = self.tasks.get(task_id)
+            return None if state is None else {k: v for k, v in state.items() if k != "owner"}
+
+    def save_payload(self, task_id: str, payload: dict, blob: bytes = None):
+        with self.lock:
+            self.payloads[task_id] = payload
+
+    def load_payload(self, task_id: str):
+        with self.lock:
+            return self.payloads.get(task_id)
+
+    def append_partial(self, task_id: str, blob: bytes):
+        with self.lock:
+            self.partials.setdefault(task_id, []).append(unpack(blob))
+
+    def load_partials(self, task_id: str, after: int = 0) -> list:
+        with self.lock:
+            deltas = self.partials.get(task_id, [])[after:]
+        return list(enumerate(deltas, after + 1))
+
+    def delete(self, task_id: str):
+        with self.lock:
+            self.tasks.pop(task_id, None)
+            self.payloads.pop(task_id, None)
+            self.partials.pop(task_id, None)
+            self.cancels.discard(task_id)
+            self.jobs.pop(task_id, None)
+
+    def expire(self, retention: float, now: float = None) -> tuple[int, int]:
+        now = time.time() if now is None else now
+        removed = stopped = 0
+        with self.lock:
+            for task_id, state in list(self.tasks.items()):
+                if state.get("status") == "running":
+                    if not owner_alive(state.get("owner")):
+                        self.tasks[task_id] = interrupted(state, now)
+                        self.partials.pop(task_id, None)
+                        stopped += 1
+                elif not task_id.startswith(PINNED_TASK_PREFIXES) and now - state.get("completed_at", state["created_at"]) > retention:
+                    del self.tasks[task_id]
+                    self.payloads.pop(task_id, None)
+                    self.cancels.discard(task_id)
+                    removed += 1
+            for job_id, job in list(self.jobs.items()):
+                if not owner_alive(job["owner"]):
+                    del self.jobs[job_id]
+            for key, (_, owner) in list(self.metrics.items()):
+                if owner is not None and not owner_alive(owner):
+                    del self.metrics[key]
+        return removed, stopped
+
+    def enqueue_job(self, job_id: str, key: str, devices: list, priority: int):
+        with self.lock:
+            if key is not None:
+                for other_id, job in self.jobs.items():
+                    if job["key"] == key:
+                        if not job["running"]:
+                            job["priority"] = min(job["priority"], priority)
+                        return other_id
+            self.jobs[job_id] = {
+                "key": key, "devices": list(devices), "priority": priority,
+                "queued_at": time.time(), "running": False, "owner": current_owner(),
+            }
+            return None
+
+    def _queue(self) -> list:
+        queued = [(job["priority"], job["queued_at"], job_id) for job_id, job in self.jobs.items() if not job["running"]]
+        return [job_id for _, _, job_id in sorted(queued)]
+
+    def claim_job(self, job_id: str, max_running: int, per_device: int) -> bool:
+        with self.lock:
+            if job_id not in self.jobs:
+                return False
+            running = [job["devices"] for job in self.jobs.values() if job["running"]]
+            queued = [(other_id, self.jobs[other_id]["devices"]) for other_id in self._queue()]
+            if not admit(job_id, running, queued, max_running, per_device):
+                return False
+            self.jobs[job_id]["running"] = True
+            return True
+
+    def finish_job(self, job_id: str):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    def queue_position(self, job_id: str):
+        with self.lock:
+            queue = self._queue()
+        return queue.index(job_id) + 1 if job_id in queue else None
+
+    def request_cancel(self, task_id: str):
+        with self.lock:
+            self.cancels.add(task_id)
+
+    def cancel_requested(self, task_id: str) -> bool:
+        with self.lock:
+            return task_id in self.cancels
+
+    def clear_cancel(self, task_id: str):
+        with self.lock:
+            self.cancels.discard(task_id)
+
+    def get_tab_state(self, tab_id: str) -> dict:
+        with self.lock:
+            return dict(self.tabs.get(tab_id, {}))
+
+    def set_tab_state(self, tab_id: str, **fields):
+        with self.lock:
+            state = self.tabs.setdefault(tab_id, {})
+            for key, value in fields.items():
+                if value is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = value
+
+    def update_metrics(self, increments: list = (), gauges: list = (), owner: str = None):
+        with self.lock:
+            for name, labels, amount in increments:
+                self.metrics.setdefault((name, labels), [0, None])[0] += amount
+            for name, labels, value in gauges:
+                self.metrics[(name, labels)] = [value, owner]
+
+    def read_metrics(self) -> list:
+        with self.lock:
+            return [(name, labels, value) for (name, labels), (value, _) in self.metrics.items()]
+
+    def count_tasks(self) -> dict:
+        with self.lock:
+            tasks = {}
+            for state in self.tasks.values():
+                tasks[state.get("status")] = tasks.get(state.get("status"), 0) + 1
+            running = sum(1 for job in self.jobs.values() if job["running"])
+            return {"tasks": tasks, "jobs": {"queued": len(self.jobs) - running, "running": running}}
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Magasin SQLite partagé par tous les workers de la machine (mode WAL : les lectures
+    ne bloquent pas les écritures). L'état est stocké en JSON, le contenu en JSON
+    compact compressé par zlib. Chaque processus ouvre sa propre connexion, partagée
+    entre ses threads sous verrou.
+    """
+
+    def __init__(self, path: str = TASKS_PATH):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit : chaque écriture est visible immédiatement des autres workers
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def save_state(self, task_id: str, state: dict):
+        owner = current_owner() if state.get("status") == "running" else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, status, owner, created_at, completed_at, state) VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, state.get("status"), owner, state.get("created_at", time.time()), state.get("completed_at"),
+                 json.dumps(state, ensure_ascii=False)),
+            )
+            if owner is None:
+                # Les résultats partiels ne servent que pendant le scan
+                self.conn.execute("DELETE FROM partials WHERE id = ?", (task_id,))
+
+    def get(self, task_id: str):
+        with self.lock:
+            row = self.conn.execute("SELECT state FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save_payload(self, task_id: str, payload: dict, blob: bytes = None):
+        blob = pack(payload) if blob is None else blob
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO payloads (id, data) VALUES (?, ?)", (task_id, blob))
+
+    def load_payload(self, task_id: str):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM payloads WHERE id = ?", (task_id,)).fetchone()
+        return None if row is None else unpack(row[0])
+
+    def append_partial(self, task_id: str, blob: bytes):
+        with self.lock:
+            # Seul le worker qui exécute la tâche y ajoute des envois : la numérotation ne se croise pas
+            self.conn.execute(
+                "INSERT INTO partials (id, seq, data) VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM partials WHERE id = ?), ?)",
+                (task_id, task_id, blob),
+            )
+
+    def load_partials(self, task_id: str, after: int = 0) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, data FROM partials WHERE id = ? AND seq > ? ORDER BY seq", (task_id, after)
+            ).fetchall()
+        return [(seq, unpack(data)) for seq, data in rows]
+
+    def delete(self, task_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.conn.execute("DELETE FROM payloads WHERE id = ?", (task_id,))
+            self.conn.execute("DELETE FROM partials WHERE id = ?", (task_id,))
+            self.conn.execute("DELETE FROM cancels WHERE id = ?", (task_id,))
+            self.conn.execute("DELETE FROM jobs WHERE id = ?", (task_id,))
+
+    def expire(self, retention: float, now: float = None) -> tuple[int, int]:
+        now = time.time() if now is None else now
+        with self.lock:
+            running = self.conn.execute("SELECT id, owner, state FROM tasks WHERE status = 'running'").fetchall()
+            stopped = [(task_id, json.loads(state)) for task_id, owner, state in running if not owner_alive(owner)]
+            owners = [owner for (owner,) in self.conn.execute("SELECT DISTINCT owner FROM jobs")]
+            metric_owners = [owner for (owner,) in self.conn.execute("SELECT DISTINCT owner FROM metrics WHERE owner IS NOT NULL")]
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs d'un worker arrêté : leurs créneaux sont libérés
+                for owner in owners:
+                    if not owner_alive(owner):
+                        self.conn.execute("DELETE FROM jobs WHERE owner = ?", (owner,))
+                # Jauges propres à un worker arrêté
+                for owner in metric_owners:
+                    if not owner_alive(owner):
+                        self.conn.execute("DELETE FROM metrics WHERE owner = ?", (owner,))
+                for task_id, state in stopped:
+                    state = interrupted(state, now)
+                    self.conn.execute(
+                        "UPDATE tasks SET status = ?, owner = NULL, completed_at = ?, state = ? WHERE id = ? AND status = 'running'",
+                        (state["status"], now, json.dumps(state, ensure_ascii=False), task_id),
+                    )
+                # Les tâches épinglées (surveillance, derniers résultats) ne sont pas concernées
+                expired = "status != 'running' AND COALESCE(completed_at, created_at) < ?"
+                params = [now - retention]
+                for prefix in PINNED_TASK_PREFIXES:
+                    expired += " AND substr(id, 1, ?) != ?"
+                    params += [len(prefix), prefix]
+                # Résultats partiels des tâches qui ne sont plus en cours (interrompues ci-dessus)
+                self.conn.execute("DELETE FROM partials WHERE id NOT IN (SELECT id FROM tasks WHERE status = 'running')")
+                self.conn.execute(f"DELETE FROM payloads WHERE id IN (SELECT id FROM tasks WHERE {expired})", params)
+                self.conn.execute(f"DELETE FROM cancels WHERE id IN (SELECT id FROM tasks WHERE {expired})", params)
+                removed = self.conn.execute(f"DELETE FROM tasks WHERE {expired}", params).rowcount
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return removed, len(stopped)
+
+    def request_cancel(self, task_id: str):
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO cancels (id) VALUES (?)", (task_id,))
+
+    def cancel_requested(self, task_id: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM cancels WHERE id = ?", (task_id,)).fetchone() is not None
+
+    def clear_cancel(self, task_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM cancels WHERE id = ?", (task_id,))
+
+    def enqueue_job(self, job_id: str, key: str, devices: list, priority: int):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if key is not None:
+                    row = self.conn.execute("SELECT id FROM jobs WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self.conn.execute("UPDATE jobs SET priority = ? WHERE id = ? AND running = 0 AND priority > ?", (priority, row[0], priority))
+                        self.conn.execute("COMMIT")
+                        return row[0]
+                self.conn.execute(
+                    "INSERT INTO jobs (id, key, devices, priority, queued_at, running, owner) VALUES (?, ?, ?, ?, ?, 0, ?)",
+                    (job_id, key, json.dumps(list(devices)), priority, time.time(), current_owner()),
+                )
+                self.conn.execute("COMMIT")
+                return None
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim_job(self, job_id: str, max_running: int, per_device: int) -> bool:
+        with self.lock:
+            # Transaction d'écriture : deux workers ne peuvent pas prendre le même créneau
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute("SELECT id, devices, running FROM jobs ORDER BY priority, queued_at").fetchall()
+                running = [json.loads(devices) for _, devices, is_running in rows if is_running]
+                queued = [(other_id, json.loads(devices)) for other_id, devices, is_running in rows if not is_running]
+                admitted = admit(job_id, running, queued, max_running, per_device)
+                if admitted:
+                    self.conn.execute("UPDATE jobs SET running = 1 WHERE id = ?", (job_id,))
+                self.conn.execute("COMMIT")
+                return admitted
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def finish_job(self, job_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def queue_position(self, job_id: str):
+        with self.lock:
+            queue = [job for (job,) in self.conn.execute("SELECT id FROM jobs WHERE running = 0 ORDER BY priority, queued_at")]
+        return queue.index(job_id) + 1 if job_id in queue else None
+
+    def get_tab_state(self, tab_id: str) -> dict:
+        with self.lock:
+            row = self.conn.execute("SELECT state FROM tabs WHERE id = ?", (tab_id,)).fetchone()
+        return {} if row is None else json.loads(row[0])
+
+    def set_tab_state(self, tab_id: str, **fields):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT state FROM tabs WHERE id = ?", (tab_id,)).fetchone()
+                state = {} if row is None else json.loads(row[0])
+                for key, value in fields.items():
+                    if value is None:
+                        state.pop(key, None)
+                    else:
+                        state[key] = value
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO tabs (id, state) VALUES (?, ?)", (tab_id, json.dumps(state, ensure_ascii=False))
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def update_metrics(self, increments: list = (), gauges: list = (), owner: str = None):
+        if not increments and not gauges:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                    increments,
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO metrics (name, labels, value, owner) VALUES (?, ?, ?, ?)",
+                    [(name, labels, value, owner) for name, labels, value in gauges],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def read_metrics(self) -> list:
+        with self.lock:
+            return self.conn.execute("SELECT name, labels, value FROM metrics").fetchall()
+
+    def count_tasks(self) -> dict:
+        with self.lock:
+            tasks = dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            jobs = dict(self.conn.execute("SELECT running, COUNT(*) FROM jobs GROUP BY running").fetchall())
+        return {"tasks": tasks, "jobs": {"queued": jobs.get(0, 0), "running": jobs.get(1, 0)}}
+
+def open_task_store() -> TaskStore:
+    """Ouvre le magasin de tâches choisi par TASK_STORE."""
+    if TASK_STORE == "memory":
+        logger.info("🗃️ Tâches gardées en mémoire (un seul worker)")
+        return MemoryTaskStore()
+    logger.info(f"🗃️ Tâches partagées entre les workers dans {TASKS_PATH}")
+    return SQLiteTaskStore(TASKS_PATH)
+
+class LeaderLock:
+    """
+    Désigne un seul worker leader par verrou fcntl sur un fichier : lui seul lance les
+    surveillances inotify et l'expiration du magasin. Le verrou est rendu par le système
+    quand le processus s'arrête ; un autre worker le reprend à sa prochaine tentative.
+    Sans chemin (magasin en mémoire), le processus est toujours leader.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.fd = None
+
+    @property
+    def held(self) -> bool:
+        return self.path is None or self.fd is not None
+
+    def acquire(self) -> bool:
+        """Tente de devenir leader ; retourne True si ce processus l'est."""
+        if self.held:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
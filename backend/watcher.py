@@ -0,0 +1,443 @@
+# backend/watcher.py
+import os
+import stat
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from inotify_reader import Inotify, InotifyOverflow, Change
+from inode_map import InodeMap, INO_BITS, INO_MASK, inode_key
+from scanner import walk_tree, check_devices, classify_inode, classified_results, classify_inodes_by_folder, space_by_root
+
+logger = logging.getLogger(__name__)
+
+# Délai avant de relancer la surveillance après une erreur
+WATCH_RETRY_SECONDS = 30
+
+# Intervalle minimal entre deux transmissions de l'état à on_publish
+WATCH_PUBLISH_SECONDS = 5
+
+# Attente maximale d'un événement avant de vérifier les demandes de contenu (payload_wanted)
+WATCH_POLL_SECONDS = 1
+
+# Erreurs de lecture gardées par surveillance (les plus récentes)
+WATCH_MAX_ERRORS = 1000
+
+# Liens retirés tolérés dans l'InodeMap avant de la compacter (au moins autant que de fichiers suivis)
+WATCH_COMPACT_LINKS = 100000
+
+def watch_signature(tab: dict):
+    """Ce qui, dans la configuration d'un onglet, impose de relancer sa surveillance."""
+    return (tuple(tab.get("paths_a", [])), tuple(tab.get("paths_b", [])), tab.get("max_depth", -1), watch_column(tab))
+
+def watch_column(tab: dict):
+    """Colonne vérifiée des résultats transmis par la surveillance : None en mode fichier."""
+    return tab.get("check_column", "a") if tab.get("scan_mode") == "folder" else None
+
+class TabWatcher:
+    """
+    Maintient l'état des hardlinks d'un onglet à jour à partir des événements inotify.
+
+    Un scan complet initialise l'état, puis chaque création, renommage, lien ou
+    suppression met à jour l'InodeMap sans reparcourir l'arborescence. Seuls les inodes
+    touchés par un lot d'événements sont reclassés ; les listes de résultats sont
+    reconstruites depuis ces classements à la lecture suivante, sans reclasser la map.
+    Le nombre de liens d'un inode n'est relu qu'à un événement dans les racines : un lien
+    créé ou supprimé ailleurs n'apparaît qu'au prochain événement sur l'inode. Comme le scan, la
+    surveillance ne descend pas dans les liens symboliques vers des dossiers.
+
+    La surveillance transmet séparément un état léger et son contenu complet :
+    - on_publish(watcher, état) reçoit l'état (voir get_status) au plus toutes les
+      WATCH_PUBLISH_SECONDS quand il a changé, et None quand il cesse d'être valable
+      (arrêt, erreur) ;
+    - on_payload(watcher, instantané) reçoit le contenu au mode de l'onglet (voir
+      get_results et check_column), seulement s'il a changé depuis le dernier envoi et
+      que payload_wanted(watcher) indique qu'un lecteur l'a demandé depuis.
+    watch_id distingue cette surveillance de celle qui la remplace.
+    """
+
+    def __init__(self, tab: dict, on_publish=None, on_payload=None, payload_wanted=None):
+        self.tab_id = tab["id"]
+        self.paths_a = list(tab.get("paths_a", []))
+        self.paths_b = list(tab.get("paths_b", []))
+        self.max_depth = tab.get("max_depth", -1)
+        self.workers = tab.get("scan_workers", 1)
+        self.signature = watch_signature(tab)
+        self.check_column = watch_column(tab)
+        self.watch_id = uuid.uuid4().hex
+        self.on_publish = on_publish
+        self.on_payload = on_payload
+        self.payload_wanted = payload_wanted
+        self.published_at = 0
+        self.dirty = False
+        self.payload_updated_at = None  # updated_at du dernier contenu transmis
+        self.payload_sent_at = 0  # instant (time.time) de ce dernier envoi
+
+        # Racines normalisées avec leur colonne, les plus longues d'abord
+        self.roots = sorted(
+            [(os.path.normpath(p), "A") for p in self.paths_a] + [(os.path.normpath(p), "B") for p in self.paths_b],
+            key=lambda root: len(root[0]), reverse=True,
+        )
+
+        self.lock = threading.Lock()
+        self.inodes_map = InodeMap()
+        self.entries = {}  # n° de dossier -> {nom: clé d'inode} des fichiers suivis
+        self.file_count = 0
+        self.classified = {}  # clé d'inode -> (catégorie, éléments, taille)
+        self.touched = set()  # clés d'inode à reclasser à la fin du lot
+        self.errors = deque(maxlen=WATCH_MAX_ERRORS)
+        self.results = None
+        self.folder_results = {}
+        self.updated_at = None
+        self.ready = False
+        self.inotify = None  # lecteur créé à chaque relecture complète
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"watch-{self.tab_id}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    # --- Lecture de l'état ---
+
+    def get_results(self, check_column: str = None):
+        """
+        Retourne un instantané {"results", "errors", "files", "updated_at"} à jour,
+        ou None si le scan initial n'est pas terminé.
+        check_column demande les résultats du mode par dossier.
+        """
+        with self.lock:
+            if not self.ready:
+                return None
+            if check_column is None:
+                if self.results is None:
+                    self.results = classified_results(self.classified.values())
+                    self.results["space"] = space_by_root(self.results, self.paths_a, self.paths_b)
+                results = self.results
+            else:
+                if check_column not in self.folder_results:
+                    self.folder_results[check_column] = classify_inodes_by_folder(
+                        self.inodes_map, self.paths_a, self.paths_b, check_column
+                    )
+                    self.folder_results[check_column]["space"] = space_by_root(self.folder_results[check_column], self.paths_a, self.paths_b)
+                results = self.folder_results[check_column]
+            return {
+                "results": results,
+                "errors": list(self.errors),
+                "files": self.file_count,
+                "updated_at": self.updated_at,
+            }
+
+    def get_status(self) -> dict:
+        """État léger transmis à on_publish : {"files", "errors_count", "updated_at", "payload_updated_at"}."""
+        with self.lock:
+            return {
+                "files": self.file_count,
+                "errors_count": len(self.errors),
+                "updated_at": self.updated_at,
+                "payload_updated_at": self.payload_updated_at,
+            }
+
+    # --- Mise à jour de l'état ---
+
+    def _column_for(self, path: str):
+        """Retourne (racine, colonne) du chemin, ou (None, None) s'il est hors des racines."""
+        for root, column in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root, column
+        return None, None
+
+    def _depth(self, root: str, dirpath: str) -> int:
+        """Profondeur d'un dossier par rapport à sa racine (0 = la racine elle-même)."""
+        return 0 if dirpath == root else dirpath[len(root):].count(os.sep)
+
+    def _directory(self, dirpath: str, root: str) -> int:
+        """Numéro d'un dossier suivi, connu même vide pour reconnaître sa suppression."""
+        dir_id = self.inodes_map.add_directory(dirpath, root)
+        if dir_id not in self.entries:
+            self.entries[dir_id] = {}
+            # Une racine signale aussi sa propre suppression, les autres dossiers via leur parent
+            self.inotify.add(dirpath, watch_self=dirpath == root)
+        return dir_id
+
+    def _known_directory(self, dirpath: str):
+        """Numéro d'un dossier suivi, ou None."""
+        dir_id = self.inodes_map.dir_ids.get(os.path.join(dirpath, ""))
+        return dir_id if dir_id in self.entries else None
+
+    def _add_file(self, dir_id: int, name: str, column: str, st):
+        self._remove_file(dir_id, name)
+        # Le stat le plus récent fait foi pour tous les liens de l'inode
+        self.inodes_map.add(dir_id, name, column, st.st_dev, st.st_ino, st.st_nlink, st.st_size)
+        key = inode_key(st.st_dev, st.st_ino)
+        self.entries[dir_id][name] = key
+        self.file_count += 1
+        self.touched.add(key)
+
+    def _remove_file(self, dir_id: int, name: str):
+        key = self.entries.get(dir_id, {}).pop(name, None)
+        if key is None:
+            return False
+        dev, ino = key >> INO_BITS, key & INO_MASK
+        nlink = self.inodes_map.nlinks[self.inodes_map.lookup(dev, ino)]
+        remaining = self.inodes_map.remove(dir_id, name, dev, ino)
+        if remaining:
+            # Le lien supprimé faisait partie du compte, sans nouveau stat des liens restants
+            self.inodes_map.set_nlink(self.inodes_map.lookup(dev, ino), max(nlink - 1, remaining))
+        self.file_count -= 1
+        self.touched.add(key)
+        return True
+
+    def _forget_tree(self, dirpath: str):
+        """Oublie tous les fichiers suivis sous un dossier."""
+        prefix = os.path.join(dirpath, "")
+        dirs = self.inodes_map.dirs
+        for dir_id in [d for d in self.entries if dirs[d].startswith(prefix)]:
+            for name in list(self.entries[dir_id]):
+                self._remove_file(dir_id, name)
+            del self.entries[dir_id]
+            self.inotify.remove(dirs[dir_id])
+
+    def _scan_tree(self, dirpath: str, root: str, column: str, workers: int = 1):
+        """(Re)lit un sous-arbre et remplace ce qui était connu de lui."""
+        self._forget_tree(dirpath)
+        depth = self._depth(root, dirpath)
+        if self.max_depth >= 0 and depth > self.max_depth:
+            return
+        max_depth = self.max_depth - depth if self.max_depth >= 0 else -1
+        for subdir, _, files in walk_tree([(dirpath, column)], max_depth, self.errors, with_stat=True, workers=workers):
+            dir_id = self._directory(subdir, root)
+            for name, _, _, st in files:
+                self._add_file(dir_id, name, column, st)
+
+    def _apply_change(self, change: Change, path: str):
+        """Applique un événement unitaire à la map d'inodes."""
+        path = os.path.normpath(path)
+        root, column = self._column_for(path)
+        if root is None:
+            return
+
+        dirpath, name = os.path.split(path)
+        dir_id = self._known_directory(dirpath)
+        if change == Change.deleted:
+            # Un fichier ou un dossier entier a disparu (ou a été renommé ailleurs)
+            if not self._remove_file(dir_id, name) and self._known_directory(path) is not None:
+                self._forget_tree(path)
+            return
+
+        if dir_id is None and path != root:
+            # Dossier parent non suivi : au-delà de la profondeur max, ou atteint par un
+            # lien symbolique vers un dossier (le scan n'y descend pas)
+            return
+
+        try:
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                # Comme le scan : un lien symbolique compte pour l'inode de sa cible
+                st = os.stat(path)
+                if stat.S_ISDIR(st.st_mode):
+                    # On ne descend pas dans un lien vers un dossier
+                    self._remove_file(dir_id, name)
+                    return
+            elif stat.S_ISDIR(st.st_mode):
+                # Un dossier arrivé d'un bloc (déplacement) ne génère pas d'événement pour son contenu.
+                # Une simple modification d'attributs d'un dossier ne change rien aux liens.
+                if change == Change.added:
+                    self._scan_tree(path, root, column)
+                return
+        except FileNotFoundError:
+            # Déjà supprimé (ou lien cassé) : l'événement "deleted" suivra ou a déjà été traité
+            self._remove_file(dir_id, name)
+            return
+        except OSError as e:
+            logger.warning(f"❌ Surveillance {self.tab_id}: impossible de lire {path}: {e}")
+            return
+
+        self._add_file(dir_id, name, column, st)
+
+    def _full_scan(self):
+        """Relit toutes les racines ; les événements survenus pendant la lecture sont gardés."""
+        check_devices(self.paths_a, self.paths_b)
+        if self.inotify is not None:
+            self.inotify.close()
+        self.inotify = Inotify()
+        self.inodes_map = InodeMap()
+        self.entries.clear()
+        self.file_count = 0
+        self.classified.clear()
+        self.errors.clear()
+        for root, column in self.roots:
+            self._scan_tree(root, root, column, self.workers)
+
+    def _publish(self):
+        """Reclasse les inodes touchés depuis le dernier appel ; appelé avec le verrou tenu."""
+        inodes_map = self.inodes_map
+        for key in self.touched:
+            dev, ino = key >> INO_BITS, key & INO_MASK
+            entry = inodes_map.get(dev, ino)
+            if entry is None:
+                self.classified.pop(key, None)
+            else:
+                if not (entry["A"] and entry["B"]):
+                    # Orphelin ou lié hors des racines : nlink décide, le relire sur un lien restant
+                    path = (entry["A"] or entry["B"])[0]
+                    try:
+                        st = os.stat(path)
+                        if (st.st_dev, st.st_ino) == (dev, ino):
+                            inodes_map.set_nlink(inodes_map.lookup(dev, ino), st.st_nlink)
+                            entry["nlink"] = st.st_nlink
+                    except OSError:
+                        pass
+                category, items = classify_inode(entry)
+                self.classified[key] = (category, items, entry["size"])
+        self.touched.clear()
+
+        # Les liens retirés restent dans les tableaux de la map jusqu'à la compaction
+        if len(inodes_map.link_name) - self.file_count > max(self.file_count, WATCH_COMPACT_LINKS):
+            inodes_map.compact()
+
+        # Listes reconstruites à la prochaine lecture (voir get_results)
+        self.results = None
+        self.folder_results = {}
+        self.updated_at = time.time()
+        self.dirty = True
+
+    def _notify(self, force: bool = False):
+        """Transmet l'état à on_publish s'il a changé, au plus toutes les WATCH_PUBLISH_SECONDS."""
+        if self.on_publish is None or not self.dirty:
+            return
+        if not force and time.monotonic() - self.published_at < WATCH_PUBLISH_SECONDS:
+            return
+        self.dirty = False
+        self.published_at = time.monotonic()
+        try:
+            self.on_publish(self, self.get_status())
+        except Exception as e:
+            logger.error(f"❌ Surveillance {self.tab_id}: impossible de publier l'état: {e}")
+
+    def _send_payload(self):
+        """Transmet le contenu à on_payload s'il a changé et qu'un lecteur l'a demandé."""
+        if self.on_payload is None or self.payload_updated_at == self.updated_at:
+            return
+        try:
+            if self.payload_wanted is not None and not self.payload_wanted(self):
+                return
+            snapshot = self.get_results(self.check_column)
+            if snapshot is None:
+                return
+            self.on_payload(self, snapshot)
+        except Exception as e:
+            logger.error(f"❌ Surveillance {self.tab_id}: impossible de transmettre le contenu: {e}")
+            return
+        self.payload_updated_at = snapshot["updated_at"]
+        self.payload_sent_at = time.time()
+        # Les lecteurs attendent l'état qui annonce ce contenu
+        self.dirty = True
+        self._notify(force=True)
+
+    def _retract(self):
+        """Signale à on_publish que l'état transmis n'est plus valable."""
+        self.dirty = False
+        if self.on_publish is not None:
+            try:
+                self.on_publish(self, None)
+            except Exception as e:
+                logger.error(f"❌ Surveillance {self.tab_id}: impossible de retirer l'état publié: {e}")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                logger.info(f"👀 Surveillance de l'onglet {self.tab_id}: scan initial de {len(self.roots)} racine(s)")
+                with self.lock:
+                    self._full_scan()
+                    self._publish()
+                    self.ready = True
+                logger.info(f"👀 Onglet {self.tab_id} surveillé: {self.file_count} fichiers suivis")
+                self._notify(force=True)
+
+                # Un lot vide toutes les WATCH_POLL_SECONDS transmet les changements en retard
+                # et le contenu demandé par un lecteur
+                while not self.stop_event.is_set():
+                    try:
+                        changes = self.inotify.read(WATCH_POLL_SECONDS)
+                    except (InotifyOverflow, OSError) as e:
+                        # Des événements ont été perdus : relecture complète, l'état reste servi entre-temps
+                        logger.warning(f"⚠️ Surveillance {self.tab_id}: {e}, relecture complète")
+                        with self.lock:
+                            self._full_scan()
+                            self._publish()
+                        logger.info(f"👀 Onglet {self.tab_id} relu: {self.file_count} fichiers suivis")
+                        self._notify(force=True)
+                        continue
+                    if changes:
+                        with self.lock:
+                            for change, path in changes:
+                                self._apply_change(change, path)
+                            self._publish()
+                        logger.debug(f"👀 Onglet {self.tab_id}: {len(changes)} changement(s) appliqué(s)")
+                    self._notify()
+                    self._send_payload()
+            except Exception as e:
+                # Limite de watches atteinte, racine démontée... : relecture complète au redémarrage
+                logger.error(f"❌ Surveillance de l'onglet {self.tab_id} interrompue: {e}")
+                with self.lock:
+                    self.ready = False
+                    self.payload_updated_at = None
+                self._retract()
+                self.stop_event.wait(WATCH_RETRY_SECONDS)
+        with self.lock:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+        self._retract()
+        logger.info(f"👀 Surveillance de l'onglet {self.tab_id} arrêtée")
+
+class WatchManager:
+    """Démarre et arrête les surveillances selon l'option "watch" des onglets."""
+
+    def __init__(self, on_publish=None, on_payload=None, payload_wanted=None):
+        self.on_publish = on_publish
+        self.on_payload = on_payload
+        self.payload_wanted = payload_wanted
+        self.watchers = {}
+        self.lock = threading.Lock()
+
+    def sync(self, tabs: list[dict]):
+        """Aligne les surveillances actives sur la configuration."""
+        wanted = {tab["id"]: tab for tab in tabs if tab.get("watch") and tab.get("paths_a") and tab.get("paths_b")}
+        with self.lock:
+            for tab_id in list(self.watchers):
+                watcher = self.watchers[tab_id]
+                tab = wanted.get(tab_id)
+                if tab is None or watch_signature(tab) != watcher.signature:
+                    watcher.stop()
+                    del self.watchers[tab_id]
+            for tab_id, tab in wanted.items():
+                if tab_id not in self.watchers:
+                    watcher = TabWatcher(tab, self.on_publish, self.on_payload, self.payload_wanted)
+                    watcher.start()
+                    self.watchers[tab_id] = watcher
+
+    def stop_all(self, timeout: float = 2.0):
+        """Arrête toutes les surveillances et attend la fin de leurs threads."""
+        with self.lock:
+            watchers = list(self.watchers.values())
+            self.watchers.clear()
+        for watcher in watchers:
+            watcher.stop()
+        for watcher in watchers:
+            watcher.thread.join(timeout)
+
+    def get_results(self, tab_id: str, check_column: str = None, watch_id: str = None):
+        """
+        Retourne l'instantané de la surveillance de l'onglet, ou None si indisponible
+        (ou si watch_id ne désigne pas la surveillance en cours).
+        """
+        watcher = self.watchers.get(tab_id)
+        if watcher is None or (watch_id is not None and watcher.watch_id != watch_id):
+            return None
+        return watcher.get_results(check_column)
@@ -80,6 +80,9 @@ envsubst '${WEBUI_PORT}' < /etc/nginx/conf.d/default.conf.template > /etc/nginx/
 
 echo "Configuration Nginx avec le port ${WEBUI_PORT}"
 
+# Nombre de workers de l'API, lu par supervisord.conf
+export API_WORKERS=${API_WORKERS:-2}
+
 # Lance le processus principal (Supervisor)
 # Supervisord doit rester en tant que root pour pouvoir lancer nginx
 exec /usr/bin/supervisord
\ No newline at end of file